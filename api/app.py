@@ -1,12 +1,13 @@
 # api/main2.py
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import time
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, List
 import mlflow.sklearn
 import mlflow
 mlflow.set_tracking_uri("file:///mlruns")
@@ -53,6 +54,36 @@ def log_prediction_to_mlflow(input_data, prediction, confidence, processing_time
         print(f"⚠️ Erreur logging MLflow (non critique) : {e}")
         pass
 
+# 🔬 Logging d'un lot de prédictions (un seul run MLflow par lot)
+def log_batch_to_mlflow(prices, confidences, processing_time=None):
+    """
+    Log un résumé agrégé d'un lot de prédictions dans MLflow
+    Un run par lot au lieu d'un run par véhicule
+    """
+    try:
+        with mlflow.start_run(run_name=f"batch_prediction_{datetime.now().strftime('%H%M%S')}"):
+            confidence_scores = {"high": 1.0, "medium": 0.5, "low": 0.1}
+            scores = [confidence_scores.get(c, 0.0) for c in confidences]
+
+            mlflow.log_metrics({
+                "batch_size": len(prices),
+                "avg_predicted_price": float(np.mean(prices)),
+                "min_predicted_price": float(np.min(prices)),
+                "max_predicted_price": float(np.max(prices)),
+                "avg_confidence_score": float(np.mean(scores)),
+            })
+            if processing_time:
+                mlflow.log_metric("processing_time_ms", processing_time)
+
+            mlflow.log_param("deployment_env", "huggingface_spaces")
+            mlflow.log_param("timestamp", datetime.now().isoformat())
+            mlflow.set_tag("type", "production_batch_prediction")
+
+            print(f"📊 Lot de {len(prices)} prédictions loggé dans MLflow")
+
+    except Exception as e:
+        print(f"⚠️ Erreur logging MLflow (non critique) : {e}")
+
 # Schéma pour les données d'entrée avec validation Pydantic
 class CarFeatures(BaseModel):
     """
@@ -135,6 +166,32 @@ class PricePrediction(BaseModel):
     status: str = Field(default="success", description="Statut de la prédiction")
     model_confidence: str = Field(description="Niveau de confiance du modèle")
 
+# 📦 Réponse pour les prédictions par lot
+class BatchPricePrediction(BaseModel):
+    """
+    Modèle de réponse pour la prédiction de prix d'un lot de véhicules
+    """
+    predictions: List[PricePrediction] = Field(description="Prédictions dans l'ordre des véhicules envoyés")
+    count: int = Field(description="Nombre de véhicules traités")
+    processing_time_ms: float = Field(description="Temps de traitement du lot en millisecondes")
+    status: str = Field(default="success", description="Statut de la prédiction")
+
+# 🧮 Règles de validation des prix appliquées sur un tableau de prédictions
+def apply_price_rules(raw_prices):
+    """
+    Version vectorisée de la logique de validation de /predict :
+    - prix < 1 : remplacé par 30, confiance "low"
+    - prix > 1000 : plafonné à 1000, confiance "medium"
+    - sinon : confiance "high"
+    """
+    raw_prices = np.asarray(raw_prices, dtype=np.float64)
+    too_low = raw_prices < 1
+    too_high = raw_prices > 1000
+
+    prices = np.where(too_low, 30.0, np.minimum(raw_prices, 1000.0))
+    confidences = np.where(too_low, "low", np.where(too_high, "medium", "high"))
+    return np.round(prices, 2), confidences
+
 
 def get_latest_run_id(experiment_name="price_prediction_local"):
     client = mlflow.tracking.MlflowClient()
@@ -756,6 +813,65 @@ async def predict(features: CarFeatures):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erreur interne lors de la prédiction: {str(e)}")
 
+# 📦 Endpoint de prédiction par lot (vectorisé)
+@app.post("/predict/batch", response_model=BatchPricePrediction)
+async def predict_batch(features_list: List[CarFeatures]):
+    """
+    Prédiction du prix de location journalier pour un lot de véhicules
+    
+    **Paramètres:**
+    - features_list: Liste de caractéristiques de véhicules (schéma CarFeatures)
+    
+    **Retourne:**
+    - predictions: Une prédiction par véhicule, dans l'ordre d'envoi
+    - count: Nombre de véhicules traités
+    - processing_time_ms: Temps de traitement du lot
+    
+    **Performance:**
+    - Un seul DataFrame et un seul appel au modèle pour tout le lot
+    - Règles de prix appliquées en une opération vectorisée
+    - Un seul run MLflow de synthèse pour le lot
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    if not features_list:
+        raise HTTPException(status_code=422, detail="Le lot doit contenir au moins un véhicule")
+
+    print(f"📥 Requête reçue dans /predict/batch ({len(features_list)} véhicules)")
+    start_time = time.time()
+
+    try:
+        input_df = pd.DataFrame([features.model_dump() for features in features_list])
+
+        # Une seule prédiction pour tout le lot
+        raw_prices = loaded_model.predict(input_df)
+        prices, confidences = apply_price_rules(raw_prices)
+
+        processing_time = (time.time() - start_time) * 1000  # en ms
+
+        # 🔬 Logging agrégé du lot dans MLflow
+        log_batch_to_mlflow(prices, confidences, processing_time)
+
+        predictions = [
+            PricePrediction(rental_price=price, model_confidence=confidence)
+            for price, confidence in zip(prices.tolist(), confidences.tolist())
+        ]
+
+        print(f"✅ Lot prédit : {len(predictions)} véhicules en {processing_time:.1f} ms")
+
+        return BatchPricePrediction(
+            predictions=predictions,
+            count=len(predictions),
+            processing_time_ms=round(processing_time, 2)
+        )
+
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors de la prédiction par lot :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de la prédiction par lot: {str(e)}")
+
 
 # ✅ Endpoint d'exemple (mis à jour pour HF)
 @app.get("/predict-example")
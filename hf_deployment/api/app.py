@@ -1,20 +1,41 @@
 # app.py - Version Hugging Face adaptée de main2.py
 # 🚀 À placer dans hf_deployment/api/
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Query, Header, Body
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from starlette.requests import ClientDisconnect
 from contextlib import asynccontextmanager
-from pydantic import BaseModel, Field
-from typing import Literal
-import mlflow
-import mlflow.sklearn
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, Literal, List, Optional, Union
 import pickle
 import tempfile
-import json
+import os
+import asyncio
+import csv
+import random
+import threading
+import functools
 from pathlib import Path
 from datetime import datetime
 import time
+from columnar_validation import ColumnarValidator
+from comparables import ComparablesIndex
+from explainer import PriceExplainer
+from prediction_logger import PredictionLogger
+from prediction_store import PredictionStore
+from market_index import MarketPriceIndex
+from micro_batcher import MicroBatcher
+from model_loader import MODEL_ARTIFACTS, apply_price_rules, build_fast_predictor, compute_model_version, find_pricing_dataset, load_local_model
+from option_optimizer import N_COMBINATIONS, added_options, current_combinations, option_raw_prices, ranked_options, upgrade_plan
+from prediction_cache import PredictionCache, make_cache_key
+from price_index import PriceLookupIndex
+from tree_engine import ArrayForestModel, ARRAYS_FILENAME
+from monitoring import MetricsRegistry, PredictionStats
+from model_watcher import ModelFileWatcher
+from shadow_scoring import ShadowScorer
+from stream_scoring import BodyStreamingResponse, DEFAULT_MAX_LINE_BYTES, MEDIA_TYPES, detect_format, iter_rows, format_results
+from worker_stats import WorkerStatsPublisher, prepare_stats_dir, read_worker_snapshots, request_reset
 
 # 🔬 Configuration MLflow léger pour HF
 def setup_mlflow_hf():
@@ -22,6 +43,9 @@ def setup_mlflow_hf():
     Configure MLflow pour fonctionner sur Hugging Face Spaces
     Version légère avec stockage temporaire
     """
+    # Import différé : mlflow coûte plusieurs secondes, le modèle est servi sans lui
+    import mlflow
+
     # Dossier temporaire pour MLflow sur HF
     mlflow_dir = Path(tempfile.gettempdir()) / "mlruns"
     mlflow_dir.mkdir(exist_ok=True)
@@ -41,30 +65,70 @@ def setup_mlflow_hf():
     mlflow.set_experiment("hf_production_monitoring")
     return str(mlflow_dir)
 
+def ensure_mlflow():
+    """
+    Initialise MLflow une seule fois (thread-safe) et retourne le module
+    """
+    global mlflow_dir, mlflow_status
+    with mlflow_lock:
+        if mlflow_dir is None:
+            mlflow_status = "initializing"
+            try:
+                mlflow_dir = setup_mlflow_hf()
+                mlflow_status = "active"
+            except Exception:
+                mlflow_status = "error"
+                raise
+    import mlflow
+    return mlflow
+
+def init_mlflow_monitoring():
+    """
+    Initialisation MLflow en arrière-plan, après le chargement du modèle :
+    tracking local, run api_startup, puis activation des synthèses du logger
+    """
+    start = time.perf_counter()
+    try:
+        mlflow = ensure_mlflow()
+    except Exception as e:
+        print(f"⚠️ MLflow indisponible (non critique) : {e}")
+        return
+
+    # 🎯 Log du démarrage dans MLflow (un seul run en mode multi-workers, pas à la relance d'un worker)
+    restarted = os.getenv("GETAROUND_WORKER_RESTARTED") == "1"
+    if loaded_model and current_worker_id() in (None, "0") and not restarted:
+        try:
+            with mlflow.start_run(run_name="api_startup"):
+                mlflow.log_param("startup_time", datetime.now().isoformat())
+                mlflow.log_param("model_type", type(loaded_model).__name__)
+                mlflow.log_param("model_source", model_source)
+                mlflow.log_param("deployment", "huggingface_spaces")
+                if model_metadata.get('run_id'):
+                    mlflow.log_param("original_run_id", model_metadata['run_id'])
+                mlflow.set_tag("event", "api_startup")
+                print("📊 Démarrage API loggé dans MLflow")
+        except:  # noqa: E722
+            pass
+
+    if prediction_logger is not None:
+        prediction_logger.summary_interval = MLFLOW_SUMMARY_INTERVAL
+        print(f"📝 Synthèse MLflow des prédictions toutes les {MLFLOW_SUMMARY_INTERVAL:g}s")
+    metrics_registry.observe("mlflow_init", time.perf_counter() - start)
+    print(f"🔬 MLflow prêt en arrière-plan ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
 # 🔄 Fonction hybride pour charger le modèle (pickle prioritaire + MLflow fallback)
-def load_model_intelligent():
+def load_model_intelligent(use_arrays=True):
     """
     Chargement intelligent du modèle :
-    1. Priorité : pickle exporté depuis MLflow
+    0. Priorité : forêt NumPy exportée (sans xgboost / sklearn / pandas), si use_arrays
+    1. Sinon : pickle exporté depuis MLflow
     2. Fallback : run_id MLflow si disponible  
     3. Informations : métadonnées du modèle
     """
-    print("📥 Chargement du modèle...")
-    
-    # Option 1 : Charger depuis pickle (PRIORITÉ pour HF)
-    model_path = Path("trained_model.pkl")
-    if model_path.exists():
-        try:
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            print(f"✅ Modèle chargé depuis pickle : {model_path}")
-            
-            # Charger les métadonnées si disponibles
-            metadata = load_model_metadata()
-            return model, "pickle", metadata
-            
-        except Exception as e:
-            print(f"⚠️ Erreur pickle : {e}")
+    # Options 0 et 1 : forêt NumPy (si à jour) puis pickle, dans le dossier courant
+    model, source, metadata = load_local_model(use_arrays)
+    if model is not None:
+        return model, source, metadata
     
     # Option 2 : Fallback MLflow si run_id disponible
     run_id_file = Path("run_id.txt")
@@ -76,6 +140,8 @@ def load_model_intelligent():
             print(f"📋 Run ID trouvé : {run_id}")
             
             # Essayer de charger depuis MLflow (si tracking URI accessible)
+            ensure_mlflow()
+            import mlflow.sklearn
             model_uri = f"runs:/{run_id}/model"
             model = mlflow.sklearn.load_model(model_uri)
             print(f"✅ Modèle chargé depuis MLflow : {run_id}")
@@ -89,60 +155,176 @@ def load_model_intelligent():
     print("❌ Aucune méthode de chargement disponible")
     return None, "none", {}
 
-def load_model_metadata():
+def build_price_index(predictor):
     """
-    Charge les métadonnées du modèle exporté
+    Construit l'index de prix compilé (GETAROUND_LOOKUP_INDEX=1)
+    Retourne None si désactivé ou si l'encodeur rapide n'est pas disponible
     """
-    metadata_path = Path("model_metadata.json")
-    if metadata_path.exists():
-        try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            print(f"📋 Métadonnées chargées : Run {metadata.get('run_id', 'Unknown')}")
-            return metadata
-        except Exception as e:
-            print(f"⚠️ Erreur métadonnées : {e}")
-    
-    return {}
+    if predictor is None or not LOOKUP_INDEX_ENABLED:
+        return None
+    try:
+        index = PriceLookupIndex(predictor, max_combinations=LOOKUP_INDEX_MAX_COMBINATIONS)
+        print(f"🗺️ Index de prix compilé : grille {index.grid_shape[0]} x {index.grid_shape[1]} (mileage x engine_power)")
+        return index
+    except Exception as e:
+        print(f"⚠️ Index de prix indisponible : {e}")
+        return None
 
-# 🔬 Fonction de logging des prédictions (IDENTIQUE à la version complète)
+# 🔁 Modèle servi : modèle + composants dérivés, remplacés d'un seul bloc au rechargement
+class ServingModel:
+    """
+    Modèle prêt à servir (encodeur rapide, index compilé) et sa version
+    Les requêtes en cours gardent leur référence : un rechargement ne les interrompt pas
+    """
+
+    def __init__(self, model, source, metadata, artifact=None):
+        self.model = model
+        self.source = source
+        self.metadata = metadata
+        self.fast_predictor = build_fast_predictor(model)
+        self.price_index = build_price_index(self.fast_predictor)
+        self.version = compute_model_version(source, metadata, artifact) if model is not None else None
+        self.loaded_at = datetime.now().isoformat()
+
+    @property
+    def predictor(self):
+        return self.price_index if self.price_index is not None else self.fast_predictor
+
+def predict_raw_prices(records, registry=None, serving=None):
+    """
+    Prédictions brutes du modèle pour une liste de dictionnaires CarFeatures
+    Utilise l'index compilé ou l'encodeur rapide si disponibles, sinon le Pipeline sur un DataFrame
+    registry : registre des latences par étape (metrics_registry par défaut)
+    serving : modèle à utiliser (modèle actif par défaut)
+    """
+    registry = registry or metrics_registry
+    serving = serving or serving_model
+    loaded_model = serving.model
+    predictor = serving.predictor
+    if predictor is not None:
+        with registry.time("preprocessing"):
+            encoded = predictor.encoder.encode_records(records, reuse_buffer=True)
+        with registry.time("inference"):
+            return predictor.predict_encoded(encoded)
+
+    # Import différé : pandas n'est nécessaire que pour le Pipeline sklearn
+    import pandas as pd
+    with registry.time("dataframe"):
+        input_df = pd.DataFrame(records)
+
+    # Pipeline sklearn : preprocessing et régresseur chronométrés séparément
+    if hasattr(loaded_model, 'steps'):
+        with registry.time("preprocessing"):
+            transformed = loaded_model[:-1].transform(input_df)
+        with registry.time("inference"):
+            return loaded_model.steps[-1][1].predict(transformed)
+
+    with registry.time("inference"):
+        return loaded_model.predict(input_df)
+
+def predict_raw_prices_columns(columns, n_rows, serving=None):
+    """
+    Prédictions brutes pour des données colonnaires {feature: tableau} (requêtes colonnaires)
+    Pas de dictionnaire par véhicule : les colonnes vont directement à l'encodeur
+    """
+    serving = serving or serving_model
+    predictor = serving.predictor
+    if predictor is not None:
+        with metrics_registry.time("preprocessing"):
+            encoded = predictor.encoder.encode_columns(columns, n_rows=n_rows, reuse_buffer=True)
+        with metrics_registry.time("inference"):
+            return predictor.predict_encoded(encoded)
+
+    import pandas as pd
+    with metrics_registry.time("inference"):
+        return serving.model.predict(pd.DataFrame(columns))
+
+def sweep_values(field, sweep):
+    """
+    Valeurs entières d'une plage (ordre conservé, doublons retirés)
+    Lève ValueError si la plage sort des bornes de CarFeatures
+    """
+    low, high = columnar_validator.ranges[field]
+    if not (low <= min(sweep.start, sweep.stop) and max(sweep.start, sweep.stop) <= high):
+        raise ValueError(f"{field} : plage hors de l'intervalle [{low:g}, {high:g}]")
+    values = np.round(np.linspace(sweep.start, sweep.stop, sweep.steps)).astype(np.int64)
+    return np.asarray(list(dict.fromkeys(values.tolist())), dtype=np.int64)
+
+def predict_price_surface(base, axes, serving=None):
+    """
+    Prix de tous les points de la grille des axes {champ: valeurs} en un seul appel au modèle
+    Les autres champs gardent la valeur du véhicule de base
+    """
+    grids = np.meshgrid(*axes.values(), indexing="ij")
+    n_points = grids[0].size
+    columns = {field: [value] * n_points for field, value in base.items()}
+    for field, grid in zip(axes, grids):
+        columns[field] = grid.ravel()
+    prices, _ = apply_price_rules(predict_raw_prices_columns(columns, n_points, serving))
+    return prices.reshape(grids[0].shape)
+
+def predict_option_prices(records, serving=None):
+    """
+    Prix (règles de /predict appliquées) des 128 combinaisons d'options de chaque véhicule :
+    matrice véhicules x 128, scorée en un seul appel au modèle
+    """
+    serving = serving or serving_model
+    columns = {feature: [record[feature] for record in records] for feature in records[0]}
+    with metrics_registry.time("inference"):
+        raw_prices = option_raw_prices(columns, len(records), serving.predictor, serving.model)
+    prices, _ = apply_price_rules(raw_prices)
+    return prices, current_combinations(columns)
+
+def predict_raw_prices_cached(records, serving=None):
+    """
+    Prédictions brutes avec cache : seuls les véhicules absents du cache sont prédits
+    """
+    serving = serving or serving_model
+    keys = [make_cache_key(record, serving.version) for record in records]
+    raw_prices = np.empty(len(records), dtype=np.float64)
+
+    missing = []
+    for position, key in enumerate(keys):
+        cached = prediction_cache.get(key)
+        if cached is None:
+            missing.append(position)
+        else:
+            raw_prices[position] = cached
+
+    if missing:
+        predicted = predict_raw_prices([records[position] for position in missing], serving=serving)
+        for position, price in zip(missing, predicted):
+            raw_prices[position] = price
+            prediction_cache.put(keys[position], float(price))
+
+    return raw_prices
+
+def activate_model(serving):
+    """
+    Installe un modèle préparé pour le service : swap du modèle actif et cache invalidé
+    """
+    global serving_model, loaded_model, model_source, model_metadata, fast_predictor, price_index
+    # Une seule affectation suffit aux prédictions ; les autres globals servent aux endpoints d'info
+    serving_model = serving
+    loaded_model, model_source, model_metadata = serving.model, serving.source, serving.metadata
+    fast_predictor, price_index = serving.fast_predictor, serving.price_index
+    prediction_cache.clear()
+    explanation_cache.clear()
+    # Index des comparables encodé avec l'ancien preprocessor : reconstruit en arrière-plan
+    if comparables_index is not None and comparables_index.model_version != serving.version:
+        start_comparables_build(serving)
+
+# 🔬 Fonction de logging des prédictions (asynchrone, hors du chemin de la requête)
 def log_prediction_to_mlflow(input_data, prediction, confidence, processing_time=None):
     """
-    Log chaque prédiction dans MLflow pour monitoring en production
+    Met à jour les statistiques en mémoire puis dépose la prédiction dans la file du logger MLflow
+    Les prédictions sont écrites par fenêtre (un run MLflow par fenêtre) en arrière-plan
     Cette fonction ne fait pas échouer l'API si MLflow a un problème
     """
-    try:
-        with mlflow.start_run(run_name=f"prediction_{datetime.now().strftime('%H%M%S')}"):
-            # 📊 Log des paramètres d'entrée
-            mlflow.log_params(input_data)
-            
-            # 📈 Log des métriques de prédiction
-            mlflow.log_metric("predicted_price", prediction)
-            
-            # 📊 Log du niveau de confiance
-            confidence_scores = {"high": 1.0, "medium": 0.5, "low": 0.1}
-            mlflow.log_metric("confidence_score", confidence_scores.get(confidence, 0.0))
-            
-            # ⏱️ Log du temps de traitement
-            if processing_time:
-                mlflow.log_metric("processing_time_ms", processing_time)
-            
-            # 🏷️ Log de métadonnées
-            mlflow.log_param("deployment_env", "huggingface_spaces")
-            mlflow.log_param("model_version", "hf_production")
-            mlflow.log_param("timestamp", datetime.now().isoformat())
-            
-            # 🎯 Tags pour recherche
-            mlflow.set_tag("type", "production_prediction")
-            mlflow.set_tag("fuel_type", input_data.get("fuel", "unknown"))
-            mlflow.set_tag("brand", input_data.get("model_key", "unknown"))
-            
-            print(f"📊 Prédiction loggée dans MLflow : {prediction}€")
-            
-    except Exception as e:
-        # ⚠️ Logging non critique - ne fait pas échouer la prédiction
-        print(f"⚠️ Erreur logging MLflow (non critique) : {e}")
-        pass
+    prediction_stats.update(input_data, prediction, confidence)
+    if prediction_logger is None:
+        return
+    prediction_logger.log(input_data, prediction, confidence, processing_time)
 
 # ✅ GARDÉES IDENTIQUES : Tes classes Pydantic restent exactement pareilles
 class CarFeatures(BaseModel):
@@ -224,52 +406,804 @@ class PricePrediction(BaseModel):
     period: str = Field(default="per_day", description="Période de location")
     status: str = Field(default="success", description="Statut de la prédiction")
     model_confidence: str = Field(description="Niveau de confiance du modèle")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle ayant servi la prédiction")
+
+# 📦 Réponse pour les prédictions par lot
+class BatchPricePrediction(BaseModel):
+    """
+    Modèle de réponse pour la prédiction de prix d'un lot de véhicules
+    """
+    predictions: List[PricePrediction] = Field(description="Prédictions dans l'ordre des véhicules envoyés")
+    count: int = Field(description="Nombre de véhicules traités")
+    processing_time_ms: float = Field(description="Temps de traitement du lot en millisecondes")
+    status: str = Field(default="success", description="Statut de la prédiction")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle ayant servi le lot")
+
+# 🧱 Requêtes colonnaires : un tableau par champ de CarFeatures
+class ColumnarRowError(BaseModel):
+    """
+    Erreur de validation d'une ligne d'une requête colonnaire
+    """
+    row: int = Field(description="Index de la ligne dans les tableaux envoyés")
+    field: str = Field(description="Champ invalide")
+    error: str = Field(description="Raison du rejet")
+
+class ColumnarPricePrediction(BaseModel):
+    """
+    Réponse colonnaire : prix et confiance alignés sur les lignes envoyées (null si ligne invalide)
+    """
+    rental_price: List[Optional[float]] = Field(description="Prix prédits en euros par jour, null pour une ligne invalide")
+    model_confidence: List[Optional[str]] = Field(description="Niveau de confiance par ligne, null pour une ligne invalide")
+    errors: List[ColumnarRowError] = Field(description="Erreurs de validation par ligne")
+    count: int = Field(description="Nombre de lignes reçues")
+    valid_count: int = Field(description="Nombre de lignes prédites")
+    processing_time_ms: float = Field(description="Temps de traitement en millisecondes")
+    status: str = Field(default="success", description="Statut de la prédiction")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle ayant servi la requête")
+
+columnar_validator = ColumnarValidator(CarFeatures)
+
+# 📉 Surface de prix "what-if" : balayage de mileage et/ou engine_power pour un véhicule
+SURFACE_MAX_STEPS = 200
+
+class SweepRange(BaseModel):
+    """
+    Plage balayée pour un champ numérique (bornes incluses)
+    """
+    start: int = Field(description="Première valeur")
+    stop: int = Field(description="Dernière valeur (incluse)")
+    steps: int = Field(default=50, ge=2, le=SURFACE_MAX_STEPS, description="Nombre de points")
+
+class SurfaceRequest(BaseModel):
+    """
+    Véhicule de base + plages de mileage et/ou engine_power (au moins une)
+    """
+    car: CarFeatures
+    mileage: Optional[SweepRange] = None
+    engine_power: Optional[SweepRange] = None
+
+class PriceSurface(BaseModel):
+    """
+    Courbe (un champ balayé) ou grille (deux champs : prices[i][j] pour mileage[i], engine_power[j])
+    """
+    mileage: Optional[List[int]] = Field(default=None, description="Valeurs de mileage balayées")
+    engine_power: Optional[List[int]] = Field(default=None, description="Valeurs de engine_power balayées")
+    prices: Union[List[float], List[List[float]]] = Field(description="Prix prédits (règles de /predict appliquées)")
+    points: int = Field(description="Nombre de points prédits")
+    min_price: float = Field(description="Prix minimal de la surface")
+    max_price: float = Field(description="Prix maximal de la surface")
+    processing_time_ms: float = Field(description="Temps de traitement en millisecondes")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle")
+
+SURFACE_FIELDS = ("mileage", "engine_power")
+
+# 🧰 Optimiseur d'équipements : gain de prix de chaque option ajoutée
+class OptionUpgrade(BaseModel):
+    """
+    Prix du véhicule avec une option en plus
+    """
+    option: str = Field(description="Option ajoutée")
+    price: float = Field(description="Prix avec cette option")
+    uplift: float = Field(description="Gain de prix journalier (euros)")
+
+class OptionOptimization(BaseModel):
+    """
+    Options ajoutables classées par gain et meilleure combinaison atteignable
+    """
+    current_price: float = Field(description="Prix avec les options actuelles (comme /predict)")
+    upgrades: List[OptionUpgrade] = Field(description="Options absentes, triées par gain décroissant")
+    best_options: List[str] = Field(description="Options à ajouter pour atteindre le meilleur prix")
+    best_price: float = Field(description="Meilleur prix atteignable en ajoutant des options")
+    best_uplift: float = Field(description="Gain de la meilleure combinaison")
+    combinations_scored: int = Field(description="Combinaisons d'options scorées")
+    processing_time_ms: float = Field(description="Temps de traitement en millisecondes")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle")
+
+# 📊 Position d'un prix dans son segment de marché
+class MarketPositionRequest(BaseModel):
+    """
+    Véhicule et prix envisagé (prix prédit par le modèle si absent)
+    """
+    car: CarFeatures
+    price: Optional[float] = Field(default=None, gt=0, description="Prix journalier envisagé (euros)")
+
+class MarketDistribution(BaseModel):
+    """
+    Distribution des prix du segment
+    """
+    min: float
+    p10: float
+    p25: float
+    median: float
+    p75: float
+    p90: float
+    max: float
+
+class MarketPosition(BaseModel):
+    """
+    Percentile du prix parmi les annonces du segment
+    """
+    price: float = Field(description="Prix positionné")
+    price_source: Literal["proposed", "predicted"] = Field(description="Prix envisagé par le propriétaire ou prédit par le modèle")
+    percentile: float = Field(description="Percentile du prix dans le segment (0-100, ex aequo comptés pour moitié)")
+    cheaper_listings: int = Field(description="Annonces du segment moins chères")
+    pricier_listings: int = Field(description="Annonces du segment plus chères")
+    segment: Dict[str, str] = Field(description="Segment utilisé (vide : tout le marché)")
+    segment_size: int = Field(description="Nombre d'annonces du segment")
+    fallback_level: int = Field(description="0 : marque x type x carburant ; plus élevé : segment plus large")
+    distribution: MarketDistribution
+    model_version: Optional[str] = Field(default=None, description="Version du modèle (prix prédit)")
+
+# 🔎 Annonces comparables (plus proches voisins dans l'espace encodé)
+class ComparableListing(BaseModel):
+    """
+    Annonce du dataset de pricing proche du véhicule demandé
+    """
+    listing_id: Optional[str] = Field(default=None, description="Identifiant de l'annonce dans le dataset")
+    distance: float = Field(description="Distance dans l'espace encodé du modèle")
+    rental_price_per_day: float = Field(description="Prix journalier de l'annonce (euros)")
+    car: Dict[str, Any] = Field(description="Caractéristiques de l'annonce")
+
+class ComparableListings(BaseModel):
+    """
+    Prix prédit et annonces comparables qui le justifient
+    """
+    rental_price: float = Field(description="Prix de location prédit en euros par jour")
+    comparables: List[ComparableListing] = Field(description="Annonces les plus proches, de la plus proche à la plus lointaine")
+    median_price: float = Field(description="Prix médian des annonces comparables")
+    segment: Dict[str, str] = Field(description="Filtre exact appliqué avant la recherche (vide : tout le dataset)")
+    fallback_level: int = Field(description="0 : marque x type x carburant ; plus élevé : filtre plus large")
+    processing_time_ms: float = Field(description="Temps de traitement en millisecondes")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle")
+
+# 🧾 Explications : contributions TreeSHAP du booster XGBoost par champ CarFeatures
+class PriceExplanation(BaseModel):
+    """
+    Prix d'un véhicule et contribution de chaque champ à ce prix
+    """
+    rental_price: float = Field(description="Prix de location prédit en euros par jour")
+    model_confidence: str = Field(description="Niveau de confiance du modèle")
+    base_value: float = Field(description="Prix moyen du modèle avant prise en compte du véhicule")
+    contributions: Dict[str, float] = Field(description="Contribution de chaque champ CarFeatures au prix brut (euros)")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle expliqué")
+
+class BatchPriceExplanation(BaseModel):
+    """
+    Explications d'un lot de véhicules
+    """
+    explanations: List[PriceExplanation] = Field(description="Explications dans l'ordre des véhicules envoyés")
+    count: int = Field(description="Nombre de véhicules expliqués")
+    processing_time_ms: float = Field(description="Temps de traitement du lot en millisecondes")
+    model_version: Optional[str] = Field(default=None, description="Version du modèle expliqué")
+
+# 🔥 Warm-up : véhicule d'exemple (/predict-example) + échantillons du dataset de pricing
+EXAMPLE_CAR = {
+    "model_key": "Renault",
+    "mileage": 75000,
+    "engine_power": 110,
+    "fuel": "diesel",
+    "paint_color": "white",
+    "car_type": "hatchback",
+    "private_parking_available": True,
+    "has_gps": True,
+    "has_air_conditioning": True,
+    "automatic_car": False,
+    "has_getaround_connect": True,
+    "has_speed_regulator": True,
+    "winter_tires": False
+}
+
+def load_market_index():
+    """
+    Construit l'index des prix du marché par segment à partir du dataset de pricing
+    """
+    global market_index
+    csv_path = find_pricing_dataset()
+    if csv_path is None:
+        print("⚠️ Dataset de pricing introuvable : /market/percentile indisponible")
+        return
+    try:
+        market_index = MarketPriceIndex.from_csv(csv_path, min_segment_size=MARKET_MIN_SEGMENT_SIZE)
+        print(f"📊 Index de marché : {market_index.n_rows} annonces en {market_index.build_ms} ms")
+    except Exception as e:
+        print(f"⚠️ Index de marché indisponible : {e}")
+
+def load_comparables_index(serving=None):
+    """
+    Encode le dataset de pricing avec l'encodeur du modèle servi et construit la recherche par segment
+    L'index est étiqueté avec la version du modèle dont il utilise l'encodeur
+    Une seule construction à la fois ; rien à faire si l'index du modèle existe déjà
+    """
+    global comparables_index
+    serving = serving or serving_model
+    with comparables_build_lock:
+        if comparables_index is not None and comparables_index.model_version == serving.version:
+            return
+        csv_path = find_pricing_dataset()
+        if csv_path is None or serving.predictor is None:
+            print("⚠️ Dataset de pricing ou encodeur rapide indisponible : /predict/comparables indisponible")
+            return
+        try:
+            index = ComparablesIndex.from_csv(csv_path, serving.predictor.encoder, model_version=serving.version)
+            comparables_index = index
+            print(f"🔎 Index des comparables pour le modèle {serving.version} : {len(index.listings)} annonces "
+                  f"en {index.build_ms} ms ({index.backend})")
+        except Exception as e:
+            print(f"⚠️ Index des comparables indisponible : {e}")
+
+def refresh_comparables_index(serving):
+    """
+    Construit l'index pour serving, puis recommence si le modèle a encore changé pendant la construction
+    """
+    while True:
+        load_comparables_index(serving)
+        if serving_model is serving:
+            return
+        serving = serving_model
+
+def start_comparables_build(serving):
+    """
+    Lance la construction de l'index des comparables dans un thread (une seule à la fois)
+    """
+    global comparables_thread
+    with comparables_lock:
+        if comparables_thread is not None and comparables_thread.is_alive():
+            return
+        comparables_thread = threading.Thread(
+            target=refresh_comparables_index, args=(serving,), name="comparables-index", daemon=True
+        )
+        comparables_thread.start()
+
+def get_comparables_index(serving):
+    """
+    Index des comparables du modèle servi, construit au premier appel (appelé hors de la boucle d'événements)
+    None (et reconstruction lancée en arrière-plan) si l'index existant date d'un autre modèle
+    """
+    index = comparables_index
+    if index is not None and index.model_version == serving.version:
+        return index
+    if index is None:
+        load_comparables_index(serving)
+        index = comparables_index
+        return index if index is not None and index.model_version == serving.version else None
+    start_comparables_build(serving)
+    return None
+
+def load_warmup_samples(csv_path, n_samples, seed=42):
+    """
+    Tire n_samples véhicules valides du dataset (lecture csv, sans pandas)
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    rng = random.Random(seed)
+    samples = []
+    for row in rng.sample(rows, min(n_samples * 2, len(rows))):
+        try:
+            car = CarFeatures(**{field: row[field] for field in CarFeatures.model_fields})
+        except Exception:
+            continue
+        samples.append(car.model_dump())
+        if len(samples) == n_samples:
+            break
+    return samples
+
+def warm_up_model(serving=None):
+    """
+    Prédictions à blanc avant le trafic : imports différés, encodeur, arbres, grilles de l'index
+    Retourne les latences par payload (ms)
+    """
+    serving = serving or serving_model
+    start = time.perf_counter()
+    payloads = [("example", [CarFeatures(**EXAMPLE_CAR).model_dump()])]
+
+    dataset_path = find_pricing_dataset()
+    if dataset_path is not None:
+        samples = load_warmup_samples(dataset_path, max(WARMUP_BATCH_SIZES, default=0))
+        payloads += [(f"batch_{size}", samples[:size]) for size in WARMUP_BATCH_SIZES if size <= len(samples)]
+    else:
+        print("⚠️ Dataset de pricing introuvable : warm-up sur le véhicule d'exemple uniquement")
+
+    latencies = {}
+    for name, records in payloads:
+        payload_start = time.perf_counter()
+        # Registre jetable : les latences à froid ne faussent pas les percentiles de /metrics
+        raw_prices = predict_raw_prices(records, registry=MetricsRegistry(), serving=serving)
+        apply_price_rules(np.asarray(raw_prices, dtype=np.float64))
+        latencies[name] = round((time.perf_counter() - payload_start) * 1000, 2)
+
+    return {
+        "dataset": str(dataset_path) if dataset_path else None,
+        "latencies_ms": latencies,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+async def run_warmup():
+    """
+    Warm-up en arrière-plan puis passage à l'état prêt (/ready)
+    """
+    global model_ready, warmup_info
+    if loaded_model is None:
+        warmup_info = {"status": "no_model"}
+        return
+
+    if WARMUP_ENABLED:
+        print("🔥 Warm-up du modèle...")
+        try:
+            warmup_info = {"status": "success", **await asyncio.to_thread(warm_up_model)}
+            metrics_registry.observe("warmup", warmup_info["duration_ms"] / 1000)
+            print(f"🔥 Warm-up terminé en {warmup_info['duration_ms']:.0f} ms : {warmup_info['latencies_ms']}")
+        except Exception as e:
+            warmup_info = {"status": "error", "error": str(e)}
+            print(f"⚠️ Erreur pendant le warm-up (non bloquant) : {e}")
+    else:
+        warmup_info = {"status": "disabled"}
+
+    model_ready = True
+
+# 🔁 Rechargement à chaud : chargement + warm-up en arrière-plan, canary, puis swap atomique
+MODEL_FILES = [ARRAYS_FILENAME, "trained_model.pkl", "model_metadata.json", "run_id.txt"]
+
+def check_canary(candidate, current=None):
+    """
+    Prédit le véhicule d'exemple avec le nouveau modèle (et l'actuel pour comparaison)
+    Refuse un prix non fini ou trop éloigné du modèle actuel (GETAROUND_CANARY_MAX_DRIFT)
+    """
+    registry = MetricsRegistry()
+    new_price = float(predict_raw_prices([EXAMPLE_CAR], registry=registry, serving=candidate)[0])
+    result = {"payload": "predict-example", "new_price": round(new_price, 2)}
+    if not np.isfinite(new_price):
+        return False, {**result, "reason": "prix non fini"}
+
+    if current is not None and current.model is not None:
+        old_price = float(predict_raw_prices([EXAMPLE_CAR], registry=registry, serving=current)[0])
+        drift = abs(new_price - old_price) / max(abs(old_price), 1.0)
+        result.update({"current_price": round(old_price, 2), "relative_drift": round(drift, 4)})
+        if drift > CANARY_MAX_DRIFT:
+            return False, {**result, "reason": f"écart > {CANARY_MAX_DRIFT:.0%} avec le modèle actuel"}
+
+    return True, result
+
+def reload_model(changed_files=None, force=False):
+    """
+    Charge et prépare le modèle depuis les fichiers, le chauffe, vérifie le canary et l'active
+    Les prédictions continuent sur l'ancien modèle pendant toute la préparation
+    """
+    global last_reload
+    with model_reload_lock:
+        start = time.perf_counter()
+        previous = serving_model
+        changed_files = changed_files or []
+        print(f"🔁 Rechargement du modèle ({', '.join(changed_files) or 'manuel'})...")
+
+        result = {"changed_files": changed_files, "previous_version": previous.version if previous else None}
+        try:
+            # Artefact NumPy servi seulement si son empreinte correspond au trained_model.pkl présent
+            candidate = ServingModel(*load_model_intelligent())
+            if candidate.model is None:
+                raise RuntimeError("aucun modèle chargeable")
+
+            if previous is not None and candidate.version == previous.version and not force:
+                result.update({"status": "unchanged", "version": candidate.version})
+            else:
+                warmup = warm_up_model(candidate) if WARMUP_ENABLED else None
+                accepted, canary = check_canary(candidate, previous)
+                result.update({"version": candidate.version, "warmup": warmup, "canary": canary})
+                if accepted:
+                    activate_model(candidate)
+                    result["status"] = "reloaded"
+                    metrics_registry.increment("model_reloads", status="success")
+                    print(f"✅ Modèle {candidate.version} actif (précédent : {result['previous_version']})")
+                else:
+                    result["status"] = "rejected"
+                    metrics_registry.increment("model_reloads", status="rejected")
+                    print(f"❌ Canary refusé, le modèle {result['previous_version']} reste actif : {canary['reason']}")
+        except Exception as e:
+            result.update({"status": "failed", "error": str(e)})
+            metrics_registry.increment("model_reloads", status="failed")
+            print(f"❌ Rechargement échoué, le modèle actuel reste actif : {e}")
+
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        result["timestamp"] = datetime.now().isoformat()
+        last_reload = result
+        return result
+
+# 🧾 Explicateur construit au premier appel (xgboost importé seulement à ce moment)
+def get_explainer(serving=None):
+    """
+    Explicateur du modèle servi, reconstruit quand la version du modèle change
+    Modèle pickle : son propre booster ; forêt NumPy : booster de trained_model.pkl,
+    vérifié sur le véhicule d'exemple (les explications doivent porter sur le modèle servi)
+    Lève ValueError si aucun booster cohérent n'est disponible
+    """
+    global price_explainer, price_explainer_version
+    serving = serving or serving_model
+    with price_explainer_lock:
+        if price_explainer is not None and price_explainer_version == serving.version:
+            return price_explainer
+
+        if hasattr(serving.model, "steps"):
+            pipeline = serving.model
+        else:
+            model_path = Path(MODEL_ARTIFACTS["pickle"])
+            if not model_path.exists():
+                raise ValueError(f"{model_path} introuvable : booster XGBoost nécessaire aux explications")
+            with open(model_path, 'rb') as f:
+                pipeline = pickle.load(f)
+
+        candidate = PriceExplainer.from_pipeline(pipeline)
+        expected = float(predict_raw_prices([EXAMPLE_CAR], registry=MetricsRegistry(), serving=serving)[0])
+        explained = candidate.explain_records([EXAMPLE_CAR])[0]["raw_price"]
+        if abs(explained - expected) > 1e-2:
+            raise ValueError(f"Booster différent du modèle servi ({explained:.4f} vs {expected:.4f} sur le véhicule d'exemple)")
+
+        price_explainer, price_explainer_version = candidate, serving.version
+        print(f"🧾 Explicateur prêt pour le modèle {serving.version}")
+        return candidate
+
+def explain_cars(records, serving=None, approximate=False):
+    """
+    Explications (base, prix brut, contributions) avec cache : seuls les véhicules absents sont expliqués,
+    en un seul appel au booster
+    """
+    serving = serving or serving_model
+    prefix = "approx:" if approximate else ""
+    keys = [prefix + make_cache_key(record, serving.version) for record in records]
+    explanations = [explanation_cache.get(key) for key in keys]
+
+    missing = [position for position, explanation in enumerate(explanations) if explanation is None]
+    if missing:
+        explainer = get_explainer(serving)
+        with metrics_registry.time("explain"):
+            computed = explainer.explain_records([records[position] for position in missing], approximate=approximate)
+        for position, explanation in zip(missing, computed):
+            explanations[position] = explanation
+            explanation_cache.put(keys[position], explanation)
+    return explanations
+
+def build_explanations(records, serving, approximate=False):
+    """
+    Réponses PriceExplanation : prix servi (mêmes règles que /predict) + contributions arrondies
+    """
+    explanations = explain_cars(records, serving, approximate)
+    raw_prices = predict_raw_prices_cached(records, serving)
+    prices, confidences = apply_price_rules(raw_prices)
+    return [
+        PriceExplanation(
+            rental_price=price,
+            model_confidence=confidence,
+            base_value=round(explanation["base_value"], 4),
+            contributions={field: round(value, 4) for field, value in explanation["contributions"].items()},
+            model_version=serving.version
+        )
+        for explanation, price, confidence in zip(explanations, prices.tolist(), confidences.tolist())
+    ]
+
+# 🕶️ Modèles challengers scorés en fantôme (un fichier .npz ou .pkl par modèle)
+def load_challengers(directory):
+    """
+    Charge les challengers d'un dossier : tableaux NumPy (.npz) ou Pipeline picklé (.pkl)
+    Le nom du challenger est le nom du fichier
+    """
+    challengers = {}
+    directory = Path(directory)
+    if not directory.is_dir():
+        return challengers
+
+    for path in sorted(directory.iterdir()):
+        try:
+            if path.suffix == ".npz":
+                model, source = ArrayForestModel.load(path), "arrays"
+            elif path.suffix == ".pkl":
+                with open(path, 'rb') as f:
+                    model, source = pickle.load(f), "pickle"
+            else:
+                continue
+            challengers[path.stem] = ServingModel(model, source, {"run_id": path.stem}, artifact=path)
+            print(f"🕶️ Challenger chargé : {path.stem} ({type(model).__name__})")
+        except Exception as e:
+            print(f"⚠️ Challenger {path.name} ignoré : {e}")
+    return challengers
+
+def submit_to_shadow(records, raw_prices):
+    """
+    Dépose un échantillon des prédictions servies pour le scoring fantôme (non bloquant)
+    """
+    if shadow_scorer is None or random.random() >= SHADOW_SAMPLE_RATE:
+        return
+    shadow_scorer.submit(records, raw_prices)
+
+# 👷 Mode multi-workers : préchargement dans le maître et agrégation des stats des workers
+def preload_for_workers():
+    """
+    Appelé par prefork.py dans le processus maître, avant le fork :
+    modèle chargé une seule fois (partagé copy-on-write), journal initialisé une fois
+    """
+    os.environ["GETAROUND_STATS_DIR"] = str(prepare_stats_dir(WORKER_STATS_DIR or DEFAULT_WORKER_STATS_DIR))
+    activate_model(ServingModel(*load_model_intelligent()))
+    load_market_index()
+    load_comparables_index()
+    try:
+        PredictionStore(PREDICTION_STORE_PATH).close()
+    except Exception as e:
+        print(f"⚠️ Journal des prédictions indisponible : {e}")
+
+def current_worker_id():
+    """
+    Identifiant du worker (None hors mode pre-fork)
+    Lu à chaque appel : prefork.py ne le définit qu'après le fork, une fois app.py importé
+    """
+    return os.getenv("GETAROUND_WORKER_ID")
+
+def worker_snapshot():
+    """
+    Instantané publié par ce worker pour les autres (agrégats + compteurs de santé)
+    """
+    logger_stats = prediction_logger.stats() if prediction_logger else {}
+    cache_stats = prediction_cache.stats()
+    return {
+        "worker_id": current_worker_id(),
+        "model_version": serving_model.version,
+        "ready": model_ready,
+        "prediction_stats": prediction_stats.to_dict(),
+        "counters": {
+            "predictions": prediction_stats.prices.count,
+            "logged": logger_stats.get("written", 0),
+            "log_dropped": logger_stats.get("dropped", 0),
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "micro_batches": micro_batcher.batches if micro_batcher else 0,
+        },
+    }
+
+def other_worker_snapshots():
+    """
+    Instantanés des autres workers (liste vide en mode mono-processus)
+    """
+    if stats_dir is None:
+        return []
+    return read_worker_snapshots(stats_dir, exclude_pid=os.getpid())
+
+def aggregated_prediction_stats():
+    """
+    Agrégats de ce worker fusionnés avec ceux des autres workers
+    """
+    snapshots = other_worker_snapshots()
+    if not snapshots:
+        return prediction_stats
+    merged = PredictionStats.from_dict(prediction_stats.to_dict())
+    for snapshot in snapshots:
+        merged.merge(PredictionStats.from_dict(snapshot["prediction_stats"]))
+    return merged
+
+def workers_view():
+    """
+    Vue /health de tous les workers : compteurs par worker et totaux
+    """
+    workers = [{"pid": os.getpid(), "updated_at": time.time(), **worker_snapshot()}] + other_worker_snapshots()
+    totals = {}
+    per_worker = []
+    for snapshot in workers:
+        for name, value in snapshot["counters"].items():
+            totals[name] = totals.get(name, 0) + value
+        per_worker.append({
+            "pid": snapshot["pid"],
+            "worker_id": snapshot["worker_id"],
+            "model_version": snapshot["model_version"],
+            "ready": snapshot["ready"],
+            "updated_at": datetime.fromtimestamp(snapshot["updated_at"]).isoformat(),
+            **snapshot["counters"],
+        })
+    return {"count": len(workers), "totals": totals, "workers": per_worker}
 
 # Variables globales pour stocker le modèle et ses infos
 loaded_model = None
 model_source = None
 model_metadata = {}
 mlflow_dir = None
+mlflow_status = "disabled"
+mlflow_lock = threading.Lock()
+mlflow_task = None
+fast_predictor = None
+price_index = None
+prediction_logger = None
+prediction_store = None
+micro_batcher = None
+serving_model = ServingModel(None, "none", {})
+model_watcher = None
+shadow_scorer = None
+stats_publisher = None
+stats_dir = None
+shadow_metrics = MetricsRegistry()
+price_explainer = None
+price_explainer_version = None
+price_explainer_lock = threading.Lock()
+market_index = None
+comparables_index = None
+comparables_thread = None
+comparables_lock = threading.Lock()
+comparables_build_lock = threading.Lock()
+model_reload_lock = threading.Lock()
+last_reload = None
+model_ready = False
+warmup_info = {"status": "pending"}
+warmup_task = None
+
+# 📦 Configuration du micro-batching des requêtes /predict concurrentes
+MICRO_BATCHING_ENABLED = os.getenv("GETAROUND_MICRO_BATCHING", "1") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.getenv("GETAROUND_BATCH_MAX_SIZE", "64"))
+MICRO_BATCH_WINDOW_MS = float(os.getenv("GETAROUND_BATCH_WINDOW_MS", "2"))
+
+# 🗺️ Index de prix compilé (grilles mileage x engine_power par combinaison, exact)
+LOOKUP_INDEX_ENABLED = os.getenv("GETAROUND_LOOKUP_INDEX", "0") == "1"
+LOOKUP_INDEX_MAX_COMBINATIONS = int(os.getenv("GETAROUND_LOOKUP_INDEX_SIZE", "512"))
+
+# 🔥 Warm-up au démarrage (GETAROUND_WARMUP=0 pour le désactiver)
+WARMUP_ENABLED = os.getenv("GETAROUND_WARMUP", "1") == "1"
+WARMUP_BATCH_SIZES = [int(size) for size in os.getenv("GETAROUND_WARMUP_BATCH_SIZES", "1,8,64,512").split(",") if size]
+
+# 🔁 Rechargement à chaud (GETAROUND_MODEL_WATCH_INTERVAL=0 pour désactiver la surveillance)
+MODEL_WATCH_INTERVAL = float(os.getenv("GETAROUND_MODEL_WATCH_INTERVAL", "10"))
+CANARY_MAX_DRIFT = float(os.getenv("GETAROUND_CANARY_MAX_DRIFT", "0.5"))
+ADMIN_TOKEN = os.getenv("GETAROUND_ADMIN_TOKEN")
+
+# 🕶️ Scoring fantôme des challengers (dossier vide ou absent : désactivé)
+CHALLENGERS_DIR = os.getenv("GETAROUND_CHALLENGERS_DIR", "challengers")
+SHADOW_SAMPLE_RATE = float(os.getenv("GETAROUND_SHADOW_SAMPLE_RATE", "1.0"))
+SHADOW_BATCH_SIZE = int(os.getenv("GETAROUND_SHADOW_BATCH_SIZE", "256"))
+
+# 🌊 Scoring en flux : nombre de véhicules prédits (et renvoyés) à la fois
+STREAM_CHUNK_SIZE = int(os.getenv("GETAROUND_STREAM_CHUNK_SIZE", "1000"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("GETAROUND_STREAM_MAX_LINE_BYTES", str(DEFAULT_MAX_LINE_BYTES)))
+
+# 📊 Index de marché : taille minimale d'un segment avant repli sur un segment plus large
+MARKET_MIN_SEGMENT_SIZE = int(os.getenv("GETAROUND_MARKET_MIN_SEGMENT", "20"))
+
+# 👷 Mode multi-workers (GETAROUND_WORKERS > 1, voir prefork.py)
+WORKERS = int(os.getenv("GETAROUND_WORKERS", "1"))
+WORKER_STATS_DIR = os.getenv("GETAROUND_STATS_DIR")
+DEFAULT_WORKER_STATS_DIR = Path(tempfile.gettempdir()) / "getaround_worker_stats"
+WORKER_STATS_INTERVAL = float(os.getenv("GETAROUND_STATS_INTERVAL", "2"))
+
+# 🗄️ Journal local des prédictions (SQLite) et période des synthèses MLflow
+PREDICTION_STORE_PATH = os.getenv(
+    "GETAROUND_PREDICTION_STORE",
+    str(Path(tempfile.gettempdir()) / "getaround_predictions.sqlite")
+)
+MLFLOW_SUMMARY_INTERVAL = float(os.getenv("GETAROUND_MLFLOW_SUMMARY_INTERVAL", "300"))
+
+# 🔬 Monitoring MLflow (GETAROUND_MLFLOW=0 : ni import ni run MLflow)
+MLFLOW_ENABLED = os.getenv("GETAROUND_MLFLOW", "1") == "1"
+
+# ⏱️ Latences par étape et compteurs exposés sur /metrics
+metrics_registry = MetricsRegistry()
+
+# 📈 Agrégats incrémentaux des prédictions servis par /mlflow-stats
+prediction_stats = PredictionStats()
+
+# 🗃️ Cache des prédictions (GETAROUND_CACHE_SIZE=0 pour le désactiver)
+prediction_cache = PredictionCache(
+    max_size=int(os.getenv("GETAROUND_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("GETAROUND_CACHE_TTL", "3600"))
+)
+
+# 🧾 Cache des explications (contributions par champ), même clé canonique que les prix
+explanation_cache = PredictionCache(
+    max_size=int(os.getenv("GETAROUND_EXPLAIN_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("GETAROUND_CACHE_TTL", "3600"))
+)
 
 # 🔄 Lifespan adapté pour le chargement hybride
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global loaded_model, model_source, model_metadata, mlflow_dir
+    global prediction_logger, prediction_store, micro_batcher, warmup_task, model_watcher, shadow_scorer
+    global mlflow_task, mlflow_status, stats_publisher, stats_dir
     print("🚀 Démarrage de l'API GetAround sur Hugging Face...")
 
-    # 🔬 Configuration MLflow léger
-    mlflow_dir = setup_mlflow_hf()
+    # 🗄️ Journal des prédictions + logger asynchrone
+    try:
+        prediction_store = PredictionStore(PREDICTION_STORE_PATH)
+        print(f"🗄️ Journal des prédictions : {PREDICTION_STORE_PATH} ({prediction_store.count()} prédictions)")
+    except Exception as e:
+        prediction_store = None
+        print(f"⚠️ Journal des prédictions indisponible : {e}")
+    # Synthèses MLflow activées une fois MLflow initialisé en arrière-plan
+    prediction_logger = PredictionLogger(
+        prediction_store,
+        "hf_production_monitoring",
+        summary_interval=None
+    )
+    prediction_logger.start()
     
-    # 📥 Chargement intelligent du modèle
-    loaded_model, model_source, model_metadata = load_model_intelligent()
+    # 📥 Chargement intelligent du modèle (déjà préchargé par le maître en mode pre-fork)
+    if serving_model.model is None:
+        activate_model(ServingModel(*load_model_intelligent()))
     
     if loaded_model:
         print(f"✅ Modèle chargé : {type(loaded_model).__name__}")
         print(f"📊 Source : {model_source}")
+        print(f"🏷️ Version : {serving_model.version}")
         
         if model_metadata:
             run_id = model_metadata.get('run_id', 'Unknown')
             r2_score = model_metadata.get('metrics', {}).get('R2', 'N/A')
-            print(f"📈 Performance : R² = {r2_score}")
-            print(f"🔗 MLflow Run : {run_id}")
-        
-        # 🎯 Log du démarrage dans MLflow
-        try:
-            with mlflow.start_run(run_name="api_startup"):
-                mlflow.log_param("startup_time", datetime.now().isoformat())
-                mlflow.log_param("model_type", type(loaded_model).__name__)
-                mlflow.log_param("model_source", model_source)
-                mlflow.log_param("deployment", "huggingface_spaces")
-                if model_metadata.get('run_id'):
-                    mlflow.log_param("original_run_id", model_metadata['run_id'])
-                mlflow.set_tag("event", "api_startup")
-                print("📊 Démarrage API loggé dans MLflow")
-        except:  # noqa: E722
-            pass
+            print(f"📈 Performance : R² = {r2_score}")
+            print(f"🔗 MLflow Run : {run_id}")
     else:
         print("❌ Échec du chargement du modèle.")
 
+    # 📊 Index des prix du marché (déjà construit par le maître en mode pre-fork)
+    if market_index is None:
+        load_market_index()
+
+    # 📦 Micro-batcher : regroupe les prédictions unitaires concurrentes
+    if MICRO_BATCHING_ENABLED:
+        micro_batcher = MicroBatcher(
+            lambda records, serving: predict_raw_prices(records, serving=serving),
+            max_batch_size=MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=MICRO_BATCH_WINDOW_MS
+        )
+        await micro_batcher.start()
+
+    # 🔬 MLflow importé et initialisé en arrière-plan, le modèle est déjà servi
+    if MLFLOW_ENABLED:
+        mlflow_status = "pending"
+        mlflow_task = asyncio.create_task(asyncio.to_thread(init_mlflow_monitoring))
+
+    # 🔥 Warm-up en arrière-plan : /health répond, /ready attend la fin du warm-up
+    warmup_task = asyncio.create_task(run_warmup())
+
+    # 👷 Publication des stats de ce worker pour /health et /mlflow-stats agrégés
+    stats_dir = os.getenv("GETAROUND_STATS_DIR")
+    if stats_dir:
+        stats_publisher = WorkerStatsPublisher(
+            stats_dir,
+            worker_snapshot,
+            on_reset=prediction_stats.reset,
+            interval=WORKER_STATS_INTERVAL
+        )
+        stats_publisher.start()
+
+    # 🕶️ Challengers : scorés par lots dans un thread, hors du chemin de la requête
+    challengers = load_challengers(CHALLENGERS_DIR)
+    if challengers:
+        shadow_scorer = ShadowScorer(
+            {
+                name: functools.partial(predict_raw_prices, registry=shadow_metrics, serving=challenger)
+                for name, challenger in challengers.items()
+            },
+            primary_fn=functools.partial(predict_raw_prices, registry=shadow_metrics),
+            batch_size=SHADOW_BATCH_SIZE
+        )
+        shadow_scorer.start()
+
+    # 👀 Surveillance des fichiers du modèle pour le rechargement à chaud
+    if MODEL_WATCH_INTERVAL > 0:
+        model_watcher = ModelFileWatcher(MODEL_FILES, reload_model, poll_interval=MODEL_WATCH_INTERVAL)
+        model_watcher.start()
+
     yield
+
+    if model_watcher is not None:
+        model_watcher.stop()
+    if shadow_scorer is not None:
+        shadow_scorer.stop()
+    if stats_publisher is not None:
+        stats_publisher.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+
+    if micro_batcher is not None:
+        await micro_batcher.stop()
+
+    # 🔬 Fin de l'initialisation MLflow (la synthèse finale en dépend)
+    if mlflow_task is not None:
+        await mlflow_task
+
+    # 📝 Écriture des dernières prédictions en attente
+    prediction_logger.stop()
+    if prediction_store is not None:
+        prediction_store.close()
     print("🛑 Arrêt de l'API GetAround")
 
 # ✅ Configuration FastAPI (mise à jour pour HF)
@@ -338,6 +1272,20 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# ⏱️ Chronométrage de chaque requête (point de départ de l'étape "validation")
+TOTAL_LATENCY_STAGES = {"/predict": "total", "/predict/batch": "total_batch", "/predict/columnar": "total_columnar"}
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    request.state.received_at = time.perf_counter()
+    response = await call_next(request)
+
+    stage = TOTAL_LATENCY_STAGES.get(request.url.path)
+    if stage is not None and request.method == "POST":
+        metrics_registry.observe(stage, time.perf_counter() - request.state.received_at)
+        metrics_registry.increment("requests", endpoint=request.url.path, status=response.status_code)
+    return response
+
 # ✅ Page d'accueil HTML (mise à jour pour HF + modèle info)
 @app.get("/", response_class=HTMLResponse)
 def root():
@@ -607,13 +1555,15 @@ def health():
     """
     Endpoint de vérification de l'état de l'API
     """
-    # Test de l'état MLflow
-    mlflow_status = "unknown"
-    try:
-        current_exp = mlflow.get_experiment_by_name("hf_production_monitoring")
-        mlflow_status = "active" if current_exp else "inactive"
-    except:  # noqa: E722
-        mlflow_status = "error"
+    # Test de l'état MLflow (sans l'importer s'il n'est pas encore initialisé)
+    mlflow_health = mlflow_status
+    if mlflow_status == "active":
+        try:
+            import mlflow
+            current_exp = mlflow.get_experiment_by_name("hf_production_monitoring")
+            mlflow_health = "active" if current_exp else "inactive"
+        except:  # noqa: E722
+            mlflow_health = "error"
     
     return {
         "status": "healthy" if loaded_model and hasattr(loaded_model, 'predict') else "degraded",
@@ -621,13 +1571,93 @@ def health():
         "model_type": type(loaded_model).__name__ if loaded_model else None,
         "model_source": model_source,
         "model_has_predict": hasattr(loaded_model, 'predict') if loaded_model else False,
+        "model_version": serving_model.version,
+        "model_loaded_at": serving_model.loaded_at,
+        "model_reload": {
+            "last_reload": last_reload,
+            "watcher": model_watcher.stats() if model_watcher else None
+        },
+        "fast_encoder": fast_predictor is not None,
+        "price_index": price_index.stats() if price_index else None,
         "api_version": "1.0.0",
         "deployment": "huggingface_spaces",
-        "mlflow_status": mlflow_status,
+        "mlflow_status": mlflow_health,
         "mlflow_dir": mlflow_dir,
+        "mlflow_logger": prediction_logger.stats() if prediction_logger else None,
+        "prediction_store": {
+            "path": prediction_store.path,
+            "predictions": prediction_store.count()
+        } if prediction_store else None,
+        "micro_batching": micro_batcher.stats() if micro_batcher else None,
+        "prediction_cache": prediction_cache.stats(),
+        "explanation_cache": explanation_cache.stats(),
+        "market_index": market_index.stats() if market_index else None,
+        "comparables_index": comparables_index.stats() if comparables_index else None,
+        "shadow_challengers": shadow_scorer.stats()["challengers"] if shadow_scorer else [],
+        "workers": workers_view() if stats_dir else None,
+        "ready": model_ready,
+        "warmup": warmup_info,
         "model_metadata": model_metadata
     }
 
+# 🔥 Endpoint readiness : prêt seulement après chargement et warm-up du modèle
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe : 200 une fois le warm-up terminé, 503 avant (ou sans modèle)
+    """
+    if not model_ready:
+        raise HTTPException(
+            status_code=503,
+            detail={"ready": False, "warmup": warmup_info}
+        )
+    return {"ready": True, "warmup": warmup_info}
+
+# ⏱️ Endpoint métriques au format texte Prometheus
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Latences par étape (p50/p90/p99) et compteurs au format d'exposition Prometheus
+    Étapes : validation, dataframe, preprocessing, inference, postprocessing, logging
+    """
+    gauges = {
+        "model_loaded": (1 if loaded_model is not None else 0, "Modèle chargé (1) ou non (0)"),
+    }
+
+    cache_stats = prediction_cache.stats()
+    gauges["prediction_cache_hit_ratio"] = (cache_stats["hit_ratio"], "Taux de succès du cache de prédictions")
+    gauges["prediction_cache_size"] = (cache_stats["size"], "Nombre d'entrées dans le cache de prédictions")
+
+    if prediction_logger is not None:
+        logger_stats = prediction_logger.stats()
+        gauges["mlflow_logger_queue_size"] = (logger_stats["queue_size"], "Prédictions en attente d'écriture MLflow")
+        gauges["mlflow_logger_dropped"] = (logger_stats["dropped"], "Prédictions ignorées (file pleine)")
+
+    if micro_batcher is not None:
+        batcher_stats = micro_batcher.stats()
+        gauges["micro_batch_avg_size"] = (batcher_stats["avg_batch_size"], "Taille moyenne des micro-lots")
+
+    return metrics_registry.render_prometheus(gauges)
+
+# 🕶️ Endpoint de comparaison des challengers sur le trafic fantôme
+@app.get("/shadow-stats")
+def shadow_stats():
+    """
+    Latence par véhicule et écarts au modèle principal (biais, MAE, RMSE, accord à 5%)
+    de chaque challenger, mesurés hors du chemin des requêtes
+    """
+    if shadow_scorer is None:
+        return {
+            "status": "disabled",
+            "message": f"Aucun challenger dans {CHALLENGERS_DIR}/ (fichiers .npz ou .pkl)"
+        }
+    return {
+        "status": "success",
+        "primary_version": serving_model.version,
+        "sample_rate": SHADOW_SAMPLE_RATE,
+        **shadow_scorer.stats()
+    }
+
 # ✅ Endpoint model-info (enrichi avec métadonnées)
 @app.get("/model-info")
 def model_info():
@@ -645,7 +1675,7 @@ def model_info():
         "model_ready": hasattr(loaded_model, 'predict'),
         "model_source": model_source,
         "metadata": model_metadata,
-        "mlflow_enabled": True
+        "mlflow_enabled": MLFLOW_ENABLED
     }
     
     # Informations spécifiques au modèle (identiques)
@@ -658,103 +1688,72 @@ def model_info():
     if hasattr(loaded_model, 'get_params'):
         info["model_parameters"] = loaded_model.get_params()
     
+    if isinstance(loaded_model, ArrayForestModel):
+        info["n_trees"] = loaded_model.n_trees
+        info["n_nodes"] = loaded_model.n_nodes
+        info["n_features_expected"] = loaded_model.encoder.n_features
+    
     return info
 
-# 🔬 Endpoint MLflow stats (IDENTIQUE à la version complète)
+# 🔬 Endpoint MLflow stats (agrégats en mémoire ou requête sur le journal)
 @app.get("/mlflow-stats")
-def get_mlflow_stats():
+def get_mlflow_stats(
+    since: Optional[datetime] = Query(None, description="Début de la fenêtre (ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="Fin de la fenêtre (ISO 8601, exclue)"),
+    fuel: Optional[str] = None,
+    model_key: Optional[str] = None,
+    car_type: Optional[str] = None,
+    bucket: Optional[Literal["1m", "5m", "1h"]] = Query(None, description="Taille de bucket de la série temporelle")
+):
     """
-    Statistiques des prédictions depuis MLflow
-    Endpoint unique pour monitoring de production
+    Statistiques des prédictions de production
+    Sans filtre : agrégats en mémoire depuis le démarrage, en O(1) (fusionnés entre workers)
+    Avec since / until / fuel / model_key / car_type : requête indexée sur le journal SQLite
+    (médiane lue dans les sketches de prix des buckets d'une minute, à 1 % près)
+    Avec bucket : ajoute la série temporelle (nombre, prix moyen, latences p50/p90/p99)
+    calculée sur les buckets pré-agrégés d'une minute, sur la même fenêtre [since, until) :
+    les minutes coupées par since ou until ne comptent que leurs prédictions de la fenêtre
     """
-    try:
-        client = mlflow.tracking.MlflowClient()
-        experiment = client.get_experiment_by_name("hf_production_monitoring")
-        
-        if not experiment:
-            return {
-                "status": "no_experiment",
-                "message": "Aucune expérience MLflow trouvée",
-                "total_predictions": 0
-            }
-        
-        # Récupération des runs (prédictions)
-        runs = client.search_runs(
-            experiment_ids=[experiment.experiment_id],
-            max_results=1000,
-            order_by=["start_time DESC"]
-        )
-        
-        if not runs:
-            return {
-                "status": "no_runs", 
-                "message": "Aucune prédiction enregistrée",
-                "total_predictions": 0
-            }
-        
-        # Analyse des prédictions
-        predictions = []
-        confidence_scores = []
-        fuel_types = {}
-        brands = {}
-        
-        for run in runs:
-            # Filtrer seulement les runs de prédiction
-            if run.data.tags.get("type") == "production_prediction":
-                if "predicted_price" in run.data.metrics:
-                    predictions.append(run.data.metrics["predicted_price"])
-                
-                if "confidence_score" in run.data.metrics:
-                    confidence_scores.append(run.data.metrics["confidence_score"])
-                
-                fuel = run.data.tags.get("fuel_type", "unknown")
-                fuel_types[fuel] = fuel_types.get(fuel, 0) + 1
-                
-                brand = run.data.tags.get("brand", "unknown")
-                brands[brand] = brands.get(brand, 0) + 1
-        
-        # Calcul des statistiques
-        if predictions:
-            stats = {
-                "status": "success",
-                "total_predictions": len(predictions),
-                "price_stats": {
-                    "avg_price": round(sum(predictions) / len(predictions), 2),
-                    "min_price": round(min(predictions), 2),
-                    "max_price": round(max(predictions), 2),
-                    "median_price": round(sorted(predictions)[len(predictions)//2], 2)
-                },
-                "confidence_stats": {
-                    "avg_confidence": round(sum(confidence_scores) / len(confidence_scores), 2) if confidence_scores else 0,
-                    "high_confidence_ratio": len([c for c in confidence_scores if c > 0.8]) / len(confidence_scores) if confidence_scores else 0
-                },
-                "fuel_distribution": fuel_types,
-                "brand_distribution": dict(sorted(brands.items(), key=lambda x: x[1], reverse=True)),
-                "last_updated": datetime.now().isoformat(),
-                "experiment_id": experiment.experiment_id,
-                "model_source": model_source,
-                "original_model": model_metadata.get('run_id', 'Unknown') if model_metadata else 'Unknown'
-            }
-        else:
-            stats = {
-                "status": "no_predictions",
-                "message": "Aucune prédiction de type 'production_prediction' trouvée",
-                "total_predictions": 0,
-                "total_runs": len(runs)
-            }
-        
-        return stats
-        
-    except Exception as e:
+    filters = {"fuel": fuel, "model_key": model_key, "car_type": car_type}
+    filtered = (since is not None or until is not None or bucket is not None
+                or any(v is not None for v in filters.values()))
+
+    if filtered:
+        if prediction_store is None:
+            raise HTTPException(status_code=503, detail="Journal des prédictions indisponible")
+        window = {
+            "since": since.timestamp() if since else None,
+            "until": until.timestamp() if until else None
+        }
+        stats = prediction_store.query_stats(**window, **filters)
+        if stats is not None and bucket is not None:
+            stats["bucket"] = bucket
+            stats["time_series"] = prediction_store.query_series(**window, bucket=bucket, **filters)
+        empty_message = "Aucune prédiction pour ces filtres"
+    else:
+        stats = aggregated_prediction_stats().snapshot()
+        empty_message = "Aucune prédiction enregistrée depuis le démarrage"
+
+    if stats is None:
         return {
-            "status": "error",
-            "message": f"Erreur lors de la récupération des stats MLflow : {str(e)}",
+            "status": "no_predictions",
+            "message": empty_message,
             "total_predictions": 0
         }
 
+    return {
+        "status": "success",
+        "source": "store" if filtered else "memory",
+        **stats,
+        "last_updated": datetime.now().isoformat(),
+        "experiment_name": prediction_logger.experiment_name if prediction_logger else None,
+        "model_source": model_source,
+        "original_model": model_metadata.get('run_id', 'Unknown') if model_metadata else 'Unknown'
+    }
+
 # 🔄 Endpoint de prédiction principal (IDENTIQUE avec ajout logging et timing)
 @app.post("/predict", response_model=PricePrediction)
-async def predict(features: CarFeatures):
+async def predict(features: CarFeatures, request: Request):
     """
     Prédiction du prix de location journalier avec logging MLflow automatique
     
@@ -771,28 +1770,47 @@ async def predict(features: CarFeatures):
     **Monitoring:**
     - Chaque prédiction est automatiquement enregistrée dans MLflow
     - Statistiques disponibles sur /mlflow-stats
+    
+    **Performance:**
+    - Les requêtes concurrentes sont regroupées en micro-lots (GETAROUND_BATCH_WINDOW_MS / GETAROUND_BATCH_MAX_SIZE)
     """
+    # ⏱️ Lecture du corps + parsing JSON + validation Pydantic
+    metrics_registry.observe("validation", time.perf_counter() - request.state.received_at)
+
     if loaded_model is None:
         raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
 
     print("📥 Requête reçue dans /predict")
     start_time = time.time()
+    serving = serving_model
+    model_version = serving.version
     
     try:
         # Préparation des données (IDENTIQUE à ton main2.py)
         input_dict = features.model_dump()
         print("🔍 Données d'entrée :", input_dict)
         
-        input_df = pd.DataFrame([input_dict])
-        
-        # Prédiction avec le modèle
-        prediction = loaded_model.predict(input_df)
-        predicted_price = float(prediction[0])
+        # 🗃️ Cache : une voiture déjà vue ne repasse pas par le modèle
+        cache_key = make_cache_key(input_dict, model_version)
+        predicted_price = prediction_cache.get(cache_key)
+
+        # Prédiction avec le modèle (micro-batch ou appel direct dans un thread)
+        if predicted_price is None:
+            if micro_batcher is not None and micro_batcher.running:
+                predicted_price = await micro_batcher.submit(input_dict, serving)
+            else:
+                prediction = await asyncio.to_thread(predict_raw_prices, [input_dict], None, serving)
+                predicted_price = float(prediction[0])
+            prediction_cache.put(cache_key, predicted_price)
+
+        # 🕶️ Scoring fantôme des challengers (file en arrière-plan)
+        submit_to_shadow([input_dict], [predicted_price])
         
         # Calcul du temps de traitement
         processing_time = (time.time() - start_time) * 1000  # en ms
 
         # Logique de validation des prix (IDENTIQUE)
+        postprocessing_start = time.perf_counter()
         if predicted_price < 1:
             predicted_price = 30
             confidence = "low"
@@ -803,9 +1821,12 @@ async def predict(features: CarFeatures):
             confidence = "high"
 
         final_price = round(predicted_price, 2)
+        metrics_registry.observe("postprocessing", time.perf_counter() - postprocessing_start)
 
         # 🔬 Logging de la prédiction dans MLflow
-        log_prediction_to_mlflow(input_dict, final_price, confidence, processing_time)
+        with metrics_registry.time("logging"):
+            log_prediction_to_mlflow(input_dict, final_price, confidence, processing_time)
+        metrics_registry.increment("predictions", endpoint="/predict")
 
         print(f"✅ Prédiction réussie : {final_price}€/jour (confiance: {confidence})")
 
@@ -814,7 +1835,8 @@ async def predict(features: CarFeatures):
             currency="EUR",
             period="per_day",
             status="success",
-            model_confidence=confidence
+            model_confidence=confidence,
+            model_version=model_version
         )
 
     except Exception as e:
@@ -823,6 +1845,520 @@ async def predict(features: CarFeatures):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erreur interne lors de la prédiction: {str(e)}")
 
+# 📦 Endpoint de prédiction par lot (vectorisé)
+@app.post("/predict/batch", response_model=BatchPricePrediction)
+async def predict_batch(features_list: List[CarFeatures], request: Request):
+    """
+    Prédiction du prix de location journalier pour un lot de véhicules
+    
+    **Paramètres:**
+    - features_list: Liste de caractéristiques de véhicules (schéma CarFeatures)
+    
+    **Retourne:**
+    - predictions: Une prédiction par véhicule, dans l'ordre d'envoi
+    - count: Nombre de véhicules traités
+    - processing_time_ms: Temps de traitement du lot
+    
+    **Performance:**
+    - Un seul encodage et un seul appel au modèle pour tout le lot
+    - Règles de prix appliquées en une opération vectorisée
+    - Prédictions loggées dans MLflow en arrière-plan
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    metrics_registry.observe("validation_batch", time.perf_counter() - request.state.received_at)
+
+    if not features_list:
+        raise HTTPException(status_code=422, detail="Le lot doit contenir au moins un véhicule")
+
+    print(f"📥 Requête reçue dans /predict/batch ({len(features_list)} véhicules)")
+    start_time = time.time()
+
+    try:
+        records = [features.model_dump() for features in features_list]
+        serving = serving_model
+
+        # Une seule prédiction pour les véhicules absents du cache, hors de la boucle d'événements
+        raw_prices = await asyncio.to_thread(predict_raw_prices_cached, records, serving)
+        submit_to_shadow(records, raw_prices)
+        with metrics_registry.time("postprocessing"):
+            prices, confidences = apply_price_rules(raw_prices)
+
+        processing_time = (time.time() - start_time) * 1000  # en ms
+
+        # 🔬 Logging asynchrone de chaque prédiction du lot
+        per_car_time = processing_time / len(records)
+        with metrics_registry.time("logging"):
+            for record, price, confidence in zip(records, prices.tolist(), confidences.tolist()):
+                log_prediction_to_mlflow(record, price, confidence, per_car_time)
+        metrics_registry.increment("predictions", value=len(records), endpoint="/predict/batch")
+
+        predictions = [
+            PricePrediction(rental_price=price, model_confidence=confidence, model_version=serving.version)
+            for price, confidence in zip(prices.tolist(), confidences.tolist())
+        ]
+
+        print(f"✅ Lot prédit : {len(predictions)} véhicules en {processing_time:.1f} ms")
+
+        return BatchPricePrediction(
+            predictions=predictions,
+            count=len(predictions),
+            processing_time_ms=round(processing_time, 2),
+            model_version=serving.version
+        )
+
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors de la prédiction par lot :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de la prédiction par lot: {str(e)}")
+
+# 📉 Endpoint de surface de prix (courbe 1-D ou grille 2-D)
+@app.post("/predict/surface", response_model=PriceSurface)
+async def predict_surface(request: SurfaceRequest):
+    """
+    Prix d'un véhicule en faisant varier mileage et/ou engine_power
+    
+    **Paramètres:**
+    - car: véhicule de base (schéma CarFeatures)
+    - mileage / engine_power: {start, stop, steps} (au moins une plage, 200 points max par plage)
+    
+    **Retourne:**
+    - Une plage : courbe prices[i] pour chaque valeur balayée
+    - Deux plages : grille prices[i][j] (mileage[i], engine_power[j]), jusqu'à 200 x 200
+    
+    **Performance:**
+    - Toute la grille est encodée et prédite en un seul appel vectorisé au modèle
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    sweeps = {field: getattr(request, field) for field in SURFACE_FIELDS if getattr(request, field) is not None}
+    if not sweeps:
+        raise HTTPException(status_code=422, detail="Au moins une plage (mileage ou engine_power) est requise")
+    try:
+        axes = {field: sweep_values(field, sweep) for field, sweep in sweeps.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    start_time = time.time()
+    serving = serving_model
+    try:
+        prices = await asyncio.to_thread(predict_price_surface, request.car.model_dump(), axes, serving)
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors du calcul de la surface :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors du calcul de la surface: {str(e)}")
+
+    metrics_registry.increment("surface_points", value=int(prices.size))
+    processing_time = (time.time() - start_time) * 1000
+    print(f"📉 Surface de prix : {' x '.join(str(len(values)) for values in axes.values())} points en {processing_time:.1f} ms")
+
+    return PriceSurface(
+        mileage=axes["mileage"].tolist() if "mileage" in axes else None,
+        engine_power=axes["engine_power"].tolist() if "engine_power" in axes else None,
+        prices=prices.tolist(),
+        points=int(prices.size),
+        min_price=float(prices.min()),
+        max_price=float(prices.max()),
+        processing_time_ms=round(processing_time, 2),
+        model_version=serving.version
+    )
+
+# 🧰 Endpoint de l'optimiseur d'équipements (2^7 combinaisons d'options)
+@app.post("/predict/options", response_model=OptionOptimization)
+async def predict_options(features: CarFeatures):
+    """
+    Gain de prix de chaque option que le véhicule n'a pas encore
+    
+    **Retourne:**
+    - current_price : prix avec les options actuelles
+    - upgrades : options absentes triées par gain décroissant (prix avec l'option seule en plus)
+    - best_options / best_price / best_uplift : meilleure combinaison obtenue en ajoutant des options
+    
+    **Performance:**
+    - Les 128 combinaisons des 7 options sont scorées en un seul appel au modèle
+      (le véhicule n'est encodé qu'une fois)
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    start_time = time.time()
+    serving = serving_model
+    try:
+        prices, current = await asyncio.to_thread(predict_option_prices, [features.model_dump()], serving)
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors de l'optimisation des options :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de l'optimisation des options: {str(e)}")
+
+    plan = upgrade_plan(prices, current)
+    metrics_registry.increment("option_combinations", value=int(prices.size))
+    processing_time = (time.time() - start_time) * 1000
+    print(f"🧰 {N_COMBINATIONS} combinaisons d'options scorées en {processing_time:.1f} ms")
+
+    return OptionOptimization(
+        current_price=float(plan["current_price"][0]),
+        upgrades=[
+            OptionUpgrade(option=option, price=price, uplift=round(uplift, 2))
+            for option, price, uplift in ranked_options(plan)
+        ],
+        best_options=added_options(int(plan["best_combination"][0]), int(current[0])),
+        best_price=float(plan["best_price"][0]),
+        best_uplift=round(float(plan["best_uplift"][0]), 2),
+        combinations_scored=int(prices.size),
+        processing_time_ms=round(processing_time, 2),
+        model_version=serving.version
+    )
+
+# 📊 Endpoint de positionnement sur le marché
+@app.post("/market/percentile", response_model=MarketPosition)
+async def market_percentile(request: MarketPositionRequest):
+    """
+    Position d'un prix parmi les annonces du segment du véhicule
+    
+    **Paramètres:**
+    - car: véhicule (schéma CarFeatures)
+    - price: prix envisagé ; absent : prix prédit par le modèle
+    
+    **Segments:** marque x type x carburant, puis marque x type, marque, type x carburant,
+    type et tout le marché, tant que le segment compte moins de GETAROUND_MARKET_MIN_SEGMENT annonces
+    
+    **Performance:**
+    - Tableaux de prix triés par segment construits au démarrage : recherche binaire par requête
+    """
+    if market_index is None:
+        raise HTTPException(status_code=503, detail="Index de marché indisponible - dataset de pricing introuvable")
+
+    car = request.car.model_dump()
+    model_version = None
+    if request.price is not None:
+        price, price_source = request.price, "proposed"
+    else:
+        if loaded_model is None:
+            raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+        serving = serving_model
+        prices, _ = apply_price_rules(await asyncio.to_thread(predict_raw_prices_cached, [car], serving))
+        price, price_source, model_version = float(prices[0]), "predicted", serving.version
+
+    metrics_registry.increment("market_percentiles")
+    return MarketPosition(
+        price=price,
+        price_source=price_source,
+        model_version=model_version,
+        **market_index.position(car, price)
+    )
+
+# 🔎 Endpoint des annonces comparables
+@app.post("/predict/comparables", response_model=ComparableListings)
+async def predict_comparables(features: CarFeatures, k: int = Query(10, ge=1, le=100, description="Nombre d'annonces")):
+    """
+    Prix prédit et k annonces du dataset les plus proches du véhicule
+    
+    **Recherche:**
+    - Filtre exact marque x type x carburant (replis : marque x type, marque, type x carburant,
+      type, tout le dataset) tant que le segment compte moins de k annonces
+    - Plus proches voisins dans l'espace encodé du modèle (colonnes standardisées et one-hot)
+    
+    **Performance:**
+    - Index construit au premier appel (avant le fork en mode pre-fork, reconstruit en arrière-plan
+      après un rechargement du modèle) : recherche limitée au segment, pas de parcours du dataset
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    start_time = time.time()
+    serving = serving_model
+    index = await asyncio.to_thread(get_comparables_index, serving)
+    if index is None:
+        raise HTTPException(status_code=503, detail=f"Index des comparables en cours de construction pour le modèle {serving.version}")
+    car = features.model_dump()
+    raw_prices = await asyncio.to_thread(predict_raw_prices_cached, [car], serving)
+    prices, _ = apply_price_rules(raw_prices)
+    segment, fallback_level, comparables = index.query(car, k=k)
+
+    metrics_registry.increment("comparables_queries")
+    processing_time = (time.time() - start_time) * 1000
+
+    return ComparableListings(
+        rental_price=float(prices[0]),
+        comparables=comparables,
+        median_price=float(np.median([comparable["rental_price_per_day"] for comparable in comparables])),
+        segment=segment,
+        fallback_level=fallback_level,
+        processing_time_ms=round(processing_time, 2),
+        model_version=serving.version
+    )
+
+# 🧾 Endpoints d'explication des prix
+@app.post("/predict/explain", response_model=PriceExplanation)
+async def predict_explain(features: CarFeatures, approximate: bool = False):
+    """
+    Prix d'un véhicule et contribution de chaque champ CarFeatures à ce prix
+    
+    **Retourne:**
+    - rental_price / model_confidence : comme /predict
+    - base_value : prix moyen du modèle
+    - contributions : valeurs SHAP exactes par champ (one-hot regroupés par champ d'origine),
+      base_value + somme des contributions = prix brut du modèle
+    
+    **Performance:**
+    - TreeSHAP natif du booster XGBoost ; explications mises en cache par véhicule
+    - approximate=true : approximation de Saabas, ~100x plus rapide pour les gros lots
+    """
+    response = await predict_explain_batch([features], approximate)
+    return response.explanations[0]
+
+@app.post("/predict/explain/batch", response_model=BatchPriceExplanation)
+async def predict_explain_batch(features_list: List[CarFeatures], approximate: bool = False):
+    """
+    Explications d'un lot de véhicules, calculées en un seul appel au booster
+    approximate=true : contributions de Saabas au lieu de TreeSHAP exact (~100x plus rapide)
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+    if not features_list:
+        raise HTTPException(status_code=422, detail="Le lot doit contenir au moins un véhicule")
+
+    start_time = time.time()
+    serving = serving_model
+    records = [features.model_dump() for features in features_list]
+
+    try:
+        explanations = await asyncio.to_thread(build_explanations, records, serving, approximate)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Explications indisponibles : {e}")
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors de l'explication :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de l'explication: {str(e)}")
+
+    metrics_registry.increment("explanations", value=len(records))
+    processing_time = (time.time() - start_time) * 1000
+    print(f"🧾 {len(records)} véhicules expliqués en {processing_time:.1f} ms")
+
+    return BatchPriceExplanation(
+        explanations=explanations,
+        count=len(explanations),
+        processing_time_ms=round(processing_time, 2),
+        model_version=serving.version
+    )
+
+# 🧱 Endpoint de prédiction colonnaire (validation vectorisée, sans objet Pydantic par ligne)
+@app.post("/predict/columnar", response_model=ColumnarPricePrediction)
+async def predict_columnar(
+    columns: Dict[str, Any] = Body(..., examples=[{field: [value] for field, value in EXAMPLE_CAR.items()}])
+):
+    """
+    Prédiction par lot au format colonnaire : un tableau par champ de CarFeatures
+    
+    **Paramètres:**
+    - columns: {"model_key": [...], "mileage": [...], ...}, tous les tableaux de même longueur
+    
+    **Retourne:**
+    - rental_price / model_confidence : une valeur par ligne (null si la ligne est invalide)
+    - errors : lignes rejetées avec leur index, le champ et la raison
+    
+    **Différence avec /predict/batch:**
+    - Les options doivent être de vrais booléens JSON : 1, 0, "true"... sont refusés
+      (CarFeatures les accepte). Les entiers sont acceptés comme par Pydantic, chaînes comprises
+    
+    **Performance:**
+    - Validation vectorisée colonne par colonne (intervalles, valeurs autorisées, booléens)
+      avec les règles du schéma CarFeatures, sans objet Pydantic par ligne
+    - Colonnes encodées directement, sans dictionnaire par véhicule
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    start_time = time.time()
+    try:
+        with metrics_registry.time("validation_columnar"):
+            valid, errors, values = columnar_validator.validate(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    n_rows = len(valid)
+    n_valid = int(valid.sum())
+    print(f"📥 Requête reçue dans /predict/columnar ({n_rows} lignes, {n_rows - n_valid} invalides)")
+    serving = serving_model
+
+    try:
+        prices = confidences = np.empty(0)
+        if n_valid:
+            valid_columns = {field: column[valid] for field, column in values.items()}
+            raw_prices = await asyncio.to_thread(predict_raw_prices_columns, valid_columns, n_valid, serving)
+            with metrics_registry.time("postprocessing"):
+                prices, confidences = apply_price_rules(raw_prices)
+
+            # Dictionnaires par véhicule seulement pour le journal et le scoring fantôme
+            fields = list(valid_columns)
+            records = [dict(zip(fields, row)) for row in zip(*(valid_columns[field].tolist() for field in fields))]
+            submit_to_shadow(records, raw_prices)
+
+            processing_time = (time.time() - start_time) * 1000
+            per_car_time = processing_time / n_valid
+            with metrics_registry.time("logging"):
+                for record, price, confidence in zip(records, prices.tolist(), confidences.tolist()):
+                    log_prediction_to_mlflow(record, price, confidence, per_car_time)
+            metrics_registry.increment("predictions", value=n_valid, endpoint="/predict/columnar")
+
+        price_values, confidence_values = iter(prices.tolist()), iter(confidences.tolist())
+        is_valid = valid.tolist()
+        processing_time = (time.time() - start_time) * 1000
+
+        print(f"✅ Lot colonnaire prédit : {n_valid}/{n_rows} lignes en {processing_time:.1f} ms")
+
+        return ColumnarPricePrediction(
+            rental_price=[next(price_values) if ok else None for ok in is_valid],
+            model_confidence=[next(confidence_values) if ok else None for ok in is_valid],
+            errors=errors,
+            count=n_rows,
+            valid_count=n_valid,
+            processing_time_ms=round(processing_time, 2),
+            model_version=serving.version
+        )
+
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors de la prédiction colonnaire :", repr(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erreur interne lors de la prédiction colonnaire: {str(e)}")
+
+# 🌊 Scoring en flux (NDJSON / CSV) pour les très grandes flottes
+def validation_message(error):
+    """
+    Message court d'une ValidationError Pydantic : "champ: raison; ..."
+    """
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+def score_stream_chunk(entries, serving):
+    """
+    Prédit les véhicules valides d'un lot du flux et retourne les résultats dans l'ordre d'entrée
+    entries : [(numéro de ligne, record ou None, erreur ou None)]
+    """
+    valid = [(row, record) for row, record, error in entries if error is None]
+    priced = {}
+    if valid:
+        start_time = time.time()
+        records = [record for _, record in valid]
+        raw_prices = predict_raw_prices(records, serving=serving)
+        submit_to_shadow(records, raw_prices)
+        with metrics_registry.time("postprocessing"):
+            prices, confidences = apply_price_rules(raw_prices)
+
+        per_car_time = (time.time() - start_time) * 1000 / len(records)
+        with metrics_registry.time("logging"):
+            for record, price, confidence in zip(records, prices.tolist(), confidences.tolist()):
+                log_prediction_to_mlflow(record, price, confidence, per_car_time)
+        metrics_registry.increment("predictions", value=len(records), endpoint="/predict/stream")
+        priced = {row: (price, confidence) for (row, _), price, confidence in zip(valid, prices.tolist(), confidences.tolist())}
+
+    results = []
+    for row, _, error in entries:
+        if error is None:
+            price, confidence = priced[row]
+            results.append({"row": row, "rental_price": price, "model_confidence": confidence})
+        else:
+            results.append({"row": row, "error": error})
+    return results
+
+async def stream_predictions(request, input_format, output_format, serving):
+    """
+    Générateur de la réponse : lit le corps par morceaux, prédit par lots de STREAM_CHUNK_SIZE
+    et renvoie chaque lot dès qu'il est prédit
+    """
+    start_time = time.time()
+    counts = {"rows": 0, "scored": 0, "errors": 0}
+    entries = []
+    header = output_format == "csv"
+
+    async def flush():
+        nonlocal entries, header
+        results = await asyncio.to_thread(score_stream_chunk, entries, serving)
+        entries = []
+        counts["scored"] += sum(1 for result in results if "error" not in result)
+        counts["errors"] += sum(1 for result in results if "error" in result)
+        text = format_results(results, output_format, header=header)
+        header = False
+        return text
+
+    try:
+        async for row, fields, error in iter_rows(request.stream(), input_format, max_line_bytes=STREAM_MAX_LINE_BYTES):
+            counts["rows"] += 1
+            record = None
+            if error is None:
+                try:
+                    # Colonnes supplémentaires du dataset (index, rental_price_per_day) ignorées
+                    record = CarFeatures(**{field: fields[field] for field in CarFeatures.model_fields if field in fields}).model_dump()
+                except ValidationError as e:
+                    error = validation_message(e)
+            entries.append((row, record, error))
+            if len(entries) >= STREAM_CHUNK_SIZE:
+                yield await flush()
+        if entries or header:
+            yield await flush()
+    except ClientDisconnect:
+        print(f"⚠️ Client déconnecté pendant le flux ({counts['rows']} lignes lues)")
+        return
+    except Exception as e:
+        import traceback
+        print("❌ Erreur lors du scoring en flux :", repr(e))
+        traceback.print_exc()
+        if output_format == "ndjson":
+            yield format_results([{"status": "error", "detail": str(e), **counts}], "ndjson")
+        return
+
+    processing_time = (time.time() - start_time) * 1000
+    print(f"✅ Flux prédit : {counts['scored']} véhicules ({counts['errors']} lignes en erreur) en {processing_time:.1f} ms")
+    if output_format == "ndjson":
+        yield format_results([{
+            "status": "completed",
+            **counts,
+            "processing_time_ms": round(processing_time, 2),
+            "model_version": serving.version
+        }], "ndjson")
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    input_format: Optional[Literal["ndjson", "csv"]] = Query(None, alias="format", description="Format du corps (défaut : déduit du Content-Type)"),
+    output_format: Optional[Literal["ndjson", "csv"]] = Query(None, alias="output", description="Format de la réponse (défaut : celui de l'entrée)")
+):
+    """
+    Prédiction en flux pour de très grandes flottes (NDJSON ou CSV, envoi chunked accepté)
+    
+    **Corps:**
+    - NDJSON : un objet CarFeatures par ligne (Content-Type: application/x-ndjson)
+    - CSV : colonnes de data/get_around_pricing_project.csv avec en-tête (Content-Type: text/csv)
+    
+    **Retourne (en flux):**
+    - Une ligne par véhicule, dans l'ordre d'envoi : row, rental_price, model_confidence
+    - Les lignes invalides (JSON/CSV, UTF-8, plus de GETAROUND_STREAM_MAX_LINE_BYTES octets) donnent row + error sans interrompre le flux
+    - NDJSON : une dernière ligne status=completed avec les compteurs
+    
+    **Performance:**
+    - Corps lu par morceaux et prédit par lots de GETAROUND_STREAM_CHUNK_SIZE véhicules
+    - Mémoire constante quelle que soit la taille de l'envoi ; premiers résultats avant la fin de l'envoi
+    """
+    if loaded_model is None:
+        raise HTTPException(status_code=503, detail="Service temporairement indisponible - modèle ML non chargé")
+
+    input_format = input_format or detect_format(request.headers.get("content-type"))
+    output_format = output_format or input_format
+    serving = serving_model
+    print(f"📥 Requête reçue dans /predict/stream ({input_format} -> {output_format})")
+
+    return BodyStreamingResponse(
+        stream_predictions(request, input_format, output_format, serving),
+        media_type=MEDIA_TYPES[output_format],
+        headers={"X-Model-Version": serving.version or ""}
+    )
+
 # ✅ Endpoint d'exemple (mis à jour pour HF)
 @app.get("/predict-example")
 def predict_example():
@@ -833,21 +2369,7 @@ def predict_example():
         "description": "Exemple de données à envoyer à /predict",
         "method": "POST",
         "url": "/predict",
-        "example_data": {
-            "model_key": "Renault",
-            "mileage": 75000,
-            "engine_power": 110,
-            "fuel": "diesel",
-            "paint_color": "white",
-            "car_type": "hatchback",
-            "private_parking_available": True,
-            "has_gps": True,
-            "has_air_conditioning": True,
-            "automatic_car": False,
-            "has_getaround_connect": True,
-            "has_speed_regulator": True,
-            "winter_tires": False
-        },
+        "example_data": dict(EXAMPLE_CAR),
         "curl_example": """
 curl -X POST "https://ton-username-getaround-api.hf.space/predict" \\
      -H "Content-Type: application/json" \\
@@ -874,18 +2396,51 @@ curl -X POST "https://ton-username-getaround-api.hf.space/predict" \\
         }
     }
 
+# 🔁 Endpoint d'administration : rechargement à chaud du modèle
+@app.post("/admin/reload-model")
+async def admin_reload_model(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Recharge le modèle depuis les fichiers (pickle, tableaux NumPy, métadonnées, run_id)
+    Le nouveau modèle est chauffé et vérifié (canary) avant le swap ; les requêtes en cours
+    terminent sur l'ancien. force=true recharge même si la version n'a pas changé.
+    Protégé par l'en-tête X-Admin-Token si GETAROUND_ADMIN_TOKEN est défini.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+    result = await asyncio.to_thread(reload_model, None, force)
+    if model_watcher is not None:
+        model_watcher.acknowledge()
+    if result["status"] in ("failed", "rejected"):
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
 # 🔬 NOUVEAU : Endpoint pour reset/clear des stats MLflow (utile pour demo)
 @app.post("/mlflow-reset")
 def reset_mlflow_stats():
     """
     Reset des statistiques MLflow (pour démo propre)
-    ⚠️ À utiliser avec précaution - efface l'historique des prédictions
+    ⚠️ À utiliser avec précaution - remet à zéro les statistiques en mémoire
+    (l'historique reste interrogeable via /mlflow-stats?since=...)
     """
+    if not MLFLOW_ENABLED:
+        return {
+            "status": "error",
+            "message": "Monitoring MLflow désactivé (GETAROUND_MLFLOW=0)"
+        }
+
     try:
+        mlflow = ensure_mlflow()
+
         # Créer une nouvelle expérience avec timestamp
         new_exp_name = f"hf_production_monitoring_{int(time.time())}"
         mlflow.create_experiment(new_exp_name)
         mlflow.set_experiment(new_exp_name)
+        if prediction_logger is not None:
+            prediction_logger.experiment_name = new_exp_name
+        prediction_stats.reset()
+        if stats_dir:
+            request_reset(stats_dir)
         
         return {
             "status": "success",
@@ -913,4 +2468,10 @@ if __name__ == "__main__":
         print("💡 Assure-toi d'avoir uploadé tous les fichiers depuis hf_deployment/api/")
     
     # Démarrage sur le port standard HF (7860)
-    uvicorn.run("app:app", host="0.0.0.0", port=7860, reload=False)
\ No newline at end of file
+    if WORKERS > 1:
+        # 👷 Modèle chargé une fois dans le maître, workers forkés sur une socket partagée
+        import app as app_module
+        from prefork import serve_prefork
+        serve_prefork(app_module, host="0.0.0.0", port=7860, workers=WORKERS)
+    else:
+        uvicorn.run("app:app", host="0.0.0.0", port=7860, reload=False)
\ No newline at end of file
@@ -0,0 +1,131 @@
+# benchmark_startup.py - Mesure du démarrage à froid de l'API
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Chaque mesure tourne dans un nouveau processus Python :
+# - temps d'import de app.py (et modules lourds chargés au passage)
+# - temps jusqu'à la première prédiction /predict réussie et jusqu'à /ready,
+#   serveur uvicorn lancé depuis zéro
+# Comparaison avec le monitoring MLflow actif (initialisé en arrière-plan) et désactivé.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent
+HEAVY_MODULES = ("mlflow", "pandas", "sklearn", "xgboost", "scipy")
+
+EXAMPLE_CAR = {
+    "model_key": "Renault", "mileage": 75000, "engine_power": 110, "fuel": "diesel",
+    "paint_color": "white", "car_type": "hatchback", "private_parking_available": True,
+    "has_gps": True, "has_air_conditioning": True, "automatic_car": False,
+    "has_getaround_connect": True, "has_speed_regulator": True, "winter_tires": False,
+}
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def child_env(**overrides):
+    """
+    Environnement du processus mesuré : journal temporaire, pas de surveillance des fichiers
+    """
+    env = dict(os.environ)
+    env.update({
+        "GETAROUND_PREDICTION_STORE": str(Path(tempfile.mkdtemp()) / "predictions.sqlite"),
+        "GETAROUND_MODEL_WATCH_INTERVAL": "0",
+        "PYTHONPATH": str(API_DIR),
+    })
+    env.update(overrides)
+    return env
+
+
+def measure_import(module, env):
+    """
+    Temps d'import d'un module dans un processus neuf
+    """
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", IMPORT_SNIPPET.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _request(url, payload=None, timeout=2.0):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def measure_first_prediction(env, port, timeout=120.0):
+    """
+    Lance uvicorn et mesure le temps jusqu'à la première prédiction réussie puis jusqu'à /ready
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_prediction = ready = None
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Le serveur s'est arrêté au démarrage (code {server.returncode})")
+            try:
+                if first_prediction is None and _request(f"{base_url}/predict", EXAMPLE_CAR) == 200:
+                    first_prediction = time.perf_counter() - start
+                if first_prediction is not None and _request(f"{base_url}/ready") == 200:
+                    ready = time.perf_counter() - start
+                    break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+        return {"first_prediction": first_prediction, "ready": ready}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def median(values):
+    values = [v for v in values if v is not None]
+    return round(statistics.median(values) * 1000, 1) if values else None
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 7961
+
+    sys.stdout.reconfigure(line_buffering=True)
+    print(f"⏱️ Démarrage à froid de l'API ({runs} mesures par configuration, médianes en ms)")
+
+    mlflow_import = [measure_import("mlflow", child_env())["seconds"] for _ in range(runs)]
+    print(f"📦 import mlflow seul : {median(mlflow_import)} ms (évité sur le chemin critique)")
+
+    for label, overrides in [("MLflow en arrière-plan", {}), ("MLflow désactivé", {"GETAROUND_MLFLOW": "0"})]:
+        imports, first_predictions, readies = [], [], []
+        heavy = []
+        for _ in range(runs):
+            result = measure_import("app", child_env(**overrides))
+            imports.append(result["seconds"])
+            heavy = result["heavy"]
+            timings = measure_first_prediction(child_env(**overrides), port)
+            first_predictions.append(timings["first_prediction"])
+            readies.append(timings["ready"])
+
+        print(f"\n🔬 {label}")
+        print(f"   import app            : {median(imports)} ms (modules lourds chargés : {heavy or 'aucun'})")
+        print(f"   première prédiction   : {median(first_predictions)} ms après le lancement du serveur")
+        print(f"   /ready                : {median(readies)} ms après le lancement du serveur")
@@ -0,0 +1,208 @@
+# columnar_validation.py - Validation vectorisée des requêtes colonnaires
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Un client batch envoie un tableau par champ de CarFeatures au lieu d'une
+# liste d'objets. Les règles (intervalles de mileage / engine_power, valeurs
+# autorisées des champs catégoriels, y compris le pattern de model_key,
+# booléens des options) sont lues dans le schéma Pydantic puis appliquées
+# colonne par colonne avec NumPy : aucun objet Pydantic par ligne. Les lignes
+# invalides sont signalées avec leur index sans bloquer les autres.
+#
+# Entiers : chaque valeur est acceptée comme par Pydantic (mode lax), quelles que
+# soient les autres lignes : nombre entier, flottant sans partie décimale,
+# booléen, ou chaîne entière ("5000", " 5_000 ", "5000.0").
+# Écart volontaire avec Pydantic : les options doivent être de vrais booléens
+# JSON (true / false). 1, 0, "true", "yes"... sont refusés ici alors que
+# CarFeatures les accepte sur /predict et /predict/batch.
+
+import re
+import typing
+from itertools import repeat
+
+import numpy as np
+
+# Pattern d'alternatives simples : ^(a|b|c)$
+ALTERNATIVES_PATTERN = re.compile(r"^\^\(([^()\[\]\\*+?{}.]*)\)\$$")
+
+# Chaîne entière acceptée par Pydantic pour un champ int : signe, chiffres ASCII séparés par _, .0 optionnel
+INTEGER_STRING_PATTERN = re.compile(r"^\s*[+-]?[0-9]+(?:_[0-9]+)*(?:\.0+)?\s*$")
+
+
+def choices_from_pattern(pattern):
+    """
+    Valeurs autorisées d'un pattern ^(a|b|c)$ ; None pour un pattern plus général
+    """
+    match = ALTERNATIVES_PATTERN.match(pattern or "")
+    return match.group(1).split("|") if match else None
+
+
+def _is_allowed(lookup, raw):
+    """
+    Appartenance à l'ensemble autorisé via dict.get appelé en C (map) : pas de tableau unicode
+    """
+    try:
+        return np.fromiter(map(lookup.get, raw, repeat(False)), dtype=bool, count=len(raw))
+    except TypeError:
+        # Valeur non hachable (liste, objet JSON) : refusée
+        return np.fromiter((isinstance(value, str) and lookup.get(value, False) for value in raw), dtype=bool, count=len(raw))
+
+
+def _as_number(value):
+    """
+    Valeur JSON d'un champ entier -> float (NaN si Pydantic la refuse comme entier)
+    """
+    if isinstance(value, (bool, int, float)):
+        try:
+            return float(value)
+        except OverflowError:
+            return np.inf
+    if isinstance(value, str) and INTEGER_STRING_PATTERN.match(value):
+        return float(value.strip().split(".")[0].replace("_", ""))
+    return np.nan
+
+
+class ColumnarValidator:
+    """
+    Validateur vectorisé construit à partir d'un modèle Pydantic (CarFeatures)
+    validate(columns) -> (masque des lignes valides, erreurs par ligne, colonnes NumPy)
+    Plus strict que Pydantic sur les booléens : seuls true / false sont acceptés
+    """
+
+    def __init__(self, model_cls):
+        self.fields = list(model_cls.model_fields)
+        self.ranges = {}
+        self.choices = {}
+        self.patterns = {}
+        self.flags = []
+
+        for name, info in model_cls.model_fields.items():
+            annotation = info.annotation
+            if typing.get_origin(annotation) is typing.Literal:
+                self.choices[name] = dict.fromkeys(typing.get_args(annotation), True)
+            elif annotation is bool:
+                self.flags.append(name)
+            elif annotation is int:
+                bounds = {key: getattr(item, key) for item in info.metadata for key in ("ge", "le") if hasattr(item, key)}
+                self.ranges[name] = (bounds.get("ge", -np.inf), bounds.get("le", np.inf))
+            elif annotation is str:
+                pattern = next((item.pattern for item in info.metadata if getattr(item, "pattern", None)), None)
+                choices = choices_from_pattern(pattern)
+                if choices is not None:
+                    self.choices[name] = dict.fromkeys(choices, True)
+                elif pattern is not None:
+                    self.patterns[name] = re.compile(pattern)
+            else:
+                raise ValueError(f"Type de champ non supporté pour la validation colonnaire : {name} ({annotation})")
+
+    def validate(self, columns):
+        """
+        Valide un corps colonnaire {champ: [valeurs]}
+        Lève ValueError si la structure est invalide (colonne manquante, longueurs différentes)
+        """
+        missing = [field for field in self.fields if field not in columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+        not_lists = [field for field in self.fields if not isinstance(columns[field], list)]
+        if not_lists:
+            raise ValueError(f"Un tableau est attendu pour : {', '.join(not_lists)}")
+        lengths = {len(columns[field]) for field in self.fields}
+        if len(lengths) != 1:
+            raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+
+        n_rows = lengths.pop()
+        valid = np.ones(n_rows, dtype=bool)
+        errors = []
+        values = {}
+
+        def reject(field, invalid, message):
+            for row in np.flatnonzero(invalid).tolist():
+                errors.append({"row": row, "field": field, "error": message})
+            valid[invalid] = False
+
+        for field, (low, high) in self.ranges.items():
+            raw = columns[field]
+            try:
+                numbers = np.asarray(raw)
+            except (TypeError, ValueError):
+                numbers = None
+            if numbers is not None and numbers.ndim == 1 and numbers.dtype.kind in "biuf":
+                numbers = numbers.astype(np.float64)
+            else:
+                # Chaînes, None ou objets dans la colonne : même décision, valeur par valeur, que Pydantic
+                numbers = np.fromiter((_as_number(value) for value in raw), dtype=np.float64, count=n_rows)
+            not_integer = ~np.isfinite(numbers) | (numbers != np.floor(numbers))
+            reject(field, not_integer, "nombre entier attendu")
+            reject(field, ~not_integer & ((numbers < low) | (numbers > high)), f"hors de l'intervalle [{low:g}, {high:g}]")
+            values[field] = np.where(not_integer, 0, numbers).astype(np.int64)
+
+        for field, allowed in self.choices.items():
+            reject(field, ~_is_allowed(allowed, columns[field]), "valeur non autorisée")
+            values[field] = np.asarray(columns[field], dtype=object)
+
+        for field, pattern in self.patterns.items():
+            raw = columns[field]
+            matches = np.fromiter((isinstance(value, str) and pattern.match(value) is not None for value in raw),
+                                  dtype=bool, count=n_rows)
+            reject(field, ~matches, "format invalide")
+            values[field] = np.asarray(raw, dtype=object)
+
+        for field in self.flags:
+            raw = columns[field]
+            try:
+                flags = np.asarray(raw)
+            except (TypeError, ValueError):
+                flags = None
+            # Chemin rapide : tableau 1-D de vrais booléens ; sinon vérification valeur par valeur
+            if flags is None or flags.ndim != 1 or flags.dtype != bool:
+                is_bool = np.fromiter((value is True or value is False for value in raw), dtype=bool, count=n_rows)
+                reject(field, ~is_bool, "booléen attendu")
+                flags = np.fromiter((value is True for value in raw), dtype=bool, count=n_rows)
+            values[field] = flags
+
+        errors.sort(key=lambda error: error["row"])
+        return valid, errors, values
+
+
+# 🧪 Comparaison avec la validation Pydantic ligne par ligne
+if __name__ == "__main__":
+    import csv
+    import sys
+    import time
+
+    from app import CarFeatures, find_pricing_dataset
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else find_pricing_dataset()
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f)) * copies
+
+    # Types JSON : entiers et booléens comme un client les enverrait
+    records = [
+        {field: (int(row[field]) if field in ("mileage", "engine_power")
+                 else row[field] == "True" if row[field] in ("True", "False") else row[field])
+         for field in CarFeatures.model_fields}
+        for row in rows
+    ]
+    columns = {field: [record[field] for record in records] for field in CarFeatures.model_fields}
+    validator = ColumnarValidator(CarFeatures)
+
+    start = time.perf_counter()
+    expected = []
+    for record in records:
+        try:
+            CarFeatures(**record)
+            expected.append(True)
+        except Exception:
+            expected.append(False)
+    pydantic_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    valid, errors, _ = validator.validate(columns)
+    columnar_seconds = time.perf_counter() - start
+
+    print(f"🧪 {len(records)} lignes : Pydantic {pydantic_seconds * 1000:.0f} ms, colonnaire {columnar_seconds * 1000:.0f} ms "
+          f"(x{pydantic_seconds / columnar_seconds:.0f}), {int((~valid).sum())} lignes invalides")
+    if not np.array_equal(valid, np.asarray(expected)):
+        print("❌ Lignes valides différentes de la validation Pydantic")
+        sys.exit(1)
+    print("✅ Mêmes lignes valides que la validation Pydantic")
@@ -0,0 +1,208 @@
+# comparables.py - Annonces comparables : plus proches voisins dans l'espace encodé du modèle
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Les annonces du dataset de pricing sont encodées une fois avec l'encodeur du
+# modèle servi (mêmes colonnes standardisées et one-hot que le preprocessor du
+# Pipeline), puis réparties par segment exact (marque x type x carburant, avec
+# les mêmes replis que market_index.py). Une requête filtre d'abord par segment
+# puis cherche les k voisins dans ce segment seulement. Par défaut, la recherche
+# est exhaustive en NumPy dans le segment : l'API n'importe pas scikit-learn pour
+# cet index. Un KD-tree par segment (sklearn.neighbors.KDTree, recherche en
+# O(log n)) est utilisé si scikit-learn est déjà chargé dans le processus, ou sur
+# demande (kdtree=True) pour les gros datasets.
+
+import csv
+import sys
+import time
+
+import numpy as np
+
+from market_index import PRICE_COLUMN, SEGMENT_LEVELS
+
+# Colonne identifiant l'annonce dans get_around_pricing_project.csv
+LISTING_ID_COLUMN = ""
+LEAF_SIZE = 40
+
+
+class BruteForceNeighbors:
+    """
+    Recherche exhaustive NumPy, même interface que KDTree.query (repli sans scikit-learn)
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.squared_norms = np.einsum("ij,ij->i", self.points, self.points)
+
+    def query(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float64)
+        squared = (np.einsum("ij,ij->i", queries, queries)[:, None]
+                   - 2 * queries @ self.points.T + self.squared_norms)
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(squared, nearest, axis=1).argsort(axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        distances = np.sqrt(np.maximum(np.take_along_axis(squared, nearest, axis=1), 0))
+        return distances, nearest
+
+
+def build_tree(points, kdtree=None):
+    """
+    Structure de recherche des points d'un segment
+    kdtree : None = KD-tree seulement si scikit-learn est déjà importé, True = KD-tree si disponible,
+    False = recherche exhaustive NumPy
+    """
+    if kdtree is None:
+        kdtree = "sklearn" in sys.modules
+    if kdtree:
+        try:
+            from sklearn.neighbors import KDTree
+        except ImportError:
+            return BruteForceNeighbors(points)
+        return KDTree(points, leaf_size=LEAF_SIZE)
+    return BruteForceNeighbors(points)
+
+
+def parse_listing(row, fields):
+    """
+    Ligne csv -> annonce typée (entiers, booléens), comme un client l'enverrait
+    """
+    listing = {}
+    for field in fields:
+        value = row[field]
+        if value in ("True", "False"):
+            listing[field] = value == "True"
+        else:
+            try:
+                listing[field] = int(value)
+            except ValueError:
+                listing[field] = value
+    return listing
+
+
+class ComparablesIndex:
+    """
+    Index des annonces : une structure de recherche par segment exact, dans l'espace encodé de l'encodeur du modèle
+    model_version : version du modèle dont l'encodeur a servi (l'index est à reconstruire quand elle change)
+    kdtree : voir build_tree
+    """
+
+    def __init__(self, rows, encoder, model_version=None, kdtree=None):
+        start_time = time.time()
+        self.encoder = encoder
+        self.model_version = model_version
+        self.fields = encoder.numeric_features + encoder.categorical_features
+
+        self.listings = []
+        self.listing_ids = []
+        prices = []
+        for row in rows:
+            try:
+                price = float(row[PRICE_COLUMN])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.listings.append(parse_listing(row, self.fields))
+            self.listing_ids.append(row.get(LISTING_ID_COLUMN))
+            prices.append(price)
+        if not self.listings:
+            raise ValueError("Aucune annonce avec un prix dans le dataset")
+        self.prices = np.asarray(prices, dtype=np.float64)
+
+        encoded = self.encoder.encode_records(self.listings).astype(np.float64)
+
+        # 🗂️ Positions des annonces par segment exact, puis un arbre par segment
+        self.segments = {level: {} for level in SEGMENT_LEVELS}
+        for level, groups in self.segments.items():
+            positions = {}
+            for position, listing in enumerate(self.listings):
+                positions.setdefault(tuple(str(listing[field]) for field in level), []).append(position)
+            for key, members in positions.items():
+                members = np.asarray(members, dtype=np.int64)
+                groups[key] = (members, build_tree(encoded[members], kdtree))
+
+        self.backend = type(self.segments[()][()][1]).__name__
+        self.build_ms = round((time.time() - start_time) * 1000, 2)
+
+    @classmethod
+    def from_csv(cls, csv_path, encoder, model_version=None, kdtree=None):
+        """
+        Index construit à partir du dataset de pricing (lecture csv, sans pandas)
+        """
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            return cls(csv.DictReader(f), encoder, model_version=model_version, kdtree=kdtree)
+
+    def query(self, car, k=10):
+        """
+        k annonces les plus proches dans le segment exact le plus fin contenant au moins k annonces
+        Retourne (segment, niveau de repli, [{"listing_id", "distance", "rental_price_per_day", "car"}])
+        """
+        encoded = self.encoder.encode_records([car]).astype(np.float64)
+        for fallback_level, level in enumerate(SEGMENT_LEVELS):
+            key = tuple(str(car[field]) for field in level)
+            entry = self.segments[level].get(key)
+            if entry is not None and (len(entry[0]) >= k or not level):
+                break
+
+        members, tree = entry
+        distances, neighbours = tree.query(encoded, k=min(k, len(members)))
+        positions = members[neighbours[0]]
+        comparables = [
+            {
+                "listing_id": self.listing_ids[position],
+                "distance": round(distance, 4),
+                PRICE_COLUMN: float(self.prices[position]),
+                "car": self.listings[position],
+            }
+            for position, distance in zip(positions.tolist(), distances[0].tolist())
+        ]
+        return dict(zip(level, key)), fallback_level, comparables
+
+    def stats(self):
+        return {
+            "listings": len(self.listings),
+            "segments": {" x ".join(level) or "all": len(groups) for level, groups in self.segments.items()},
+            "backend": self.backend,
+            "model_version": self.model_version,
+            "build_ms": self.build_ms,
+        }
+
+
+# 🧪 Comparaison avec une recherche exhaustive et temps par requête
+if __name__ == "__main__":
+    from pathlib import Path
+
+    from model_loader import build_fast_predictor, find_pricing_dataset, load_local_model
+
+    api_dir = Path(__file__).resolve().parent
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else find_pricing_dataset(api_dir)
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    rows = [dict(row, **{LISTING_ID_COLUMN: f"{copy}-{row[LISTING_ID_COLUMN]}"}) for copy in range(copies) for row in rows]
+
+    model, _, _ = load_local_model(directory=api_dir)
+    encoder = build_fast_predictor(model).encoder
+    index = ComparablesIndex(rows, encoder, kdtree=True)
+    print(f"🗂️ {len(rows)} annonces indexées en {index.build_ms} ms ({index.backend})")
+
+    rng = np.random.default_rng(0)
+    cars = [index.listings[position] for position in rng.choice(len(index.listings), 200, replace=False)]
+    all_points = index.encoder.encode_records(index.listings).astype(np.float64)
+
+    start = time.perf_counter()
+    results = [index.query(car, k=10) for car in cars]
+    index_us = (time.perf_counter() - start) / len(cars) * 1e6
+
+    start = time.perf_counter()
+    mismatches = 0
+    for car, (segment, _, comparables) in zip(cars, results):
+        in_segment = np.fromiter((all(str(listing[field]) == value for field, value in segment.items())
+                                  for listing in index.listings), dtype=bool, count=len(index.listings))
+        distances = np.sqrt(((all_points - index.encoder.encode_records([car])) ** 2).sum(axis=1))
+        expected = np.sort(distances[in_segment])[:len(comparables)]
+        mismatches += not np.allclose(expected, [comparable["distance"] for comparable in comparables], atol=1e-3)
+    scan_us = (time.perf_counter() - start) / len(cars) * 1e6
+
+    print(f"⏱️ Index : {index_us:.0f} µs par requête ; parcours complet : {scan_us:.0f} µs")
+    if mismatches:
+        print(f"❌ {mismatches} requêtes avec des voisins différents de la recherche exhaustive")
+        sys.exit(1)
+    print(f"✅ Mêmes distances que la recherche exhaustive sur {len(cars)} véhicules")
@@ -0,0 +1,74 @@
+# explainer.py - Explication des prix : contributions TreeSHAP natives du booster XGBoost
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# booster.predict(..., pred_contribs=True) calcule les valeurs SHAP exactes de
+# tout un lot en une fois, dans le code natif de XGBoost. Les contributions des
+# 55 colonnes encodées sont ensuite regroupées par champ CarFeatures d'origine
+# (somme des colonnes one-hot d'une catégorie) par un produit matriciel.
+# Prix brut = valeur de base + somme des contributions.
+# TreeSHAP exact coûte ~1 ms par véhicule et par cœur (100 arbres, profondeur 6) ;
+# approximate=True utilise l'approximation de Saabas (approx_contribs), ~100x plus rapide.
+
+import numpy as np
+
+from fast_encoder import FastPredictor
+
+
+class PriceExplainer:
+    """
+    Contributions par champ CarFeatures, calculées par lot dans le booster
+    """
+
+    def __init__(self, encoder, booster, iteration_range=(0, 0)):
+        self.encoder = encoder
+        self.booster = booster
+        self.iteration_range = iteration_range
+        self.fields = encoder.numeric_features + encoder.categorical_features
+
+        # 🗂️ Matrice colonne encodée -> champ d'origine (one-hot regroupés)
+        self.groups = np.zeros((encoder.n_features, len(self.fields)), dtype=np.float64)
+        for position, feature in enumerate(encoder.numeric_features):
+            self.groups[position, self.fields.index(feature)] = 1.0
+        for feature, lookup in encoder.category_columns.items():
+            for column in lookup.values():
+                self.groups[column, self.fields.index(feature)] = 1.0
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Explicateur du Pipeline entraîné (encodeur compilé + booster XGBoost)
+        Lève ValueError si le régresseur n'est pas un modèle XGBoost
+        """
+        predictor = FastPredictor.from_pipeline(pipeline)
+        return cls(predictor.encoder, predictor.booster, predictor.iteration_range)
+
+    def explain_encoded(self, encoded, approximate=False):
+        """
+        Explique une matrice encodée : (contributions par champ, valeurs de base, prix bruts)
+        """
+        import xgboost as xgb
+
+        contributions = self.booster.predict(
+            xgb.DMatrix(encoded), pred_contribs=True, approx_contribs=approximate,
+            iteration_range=self.iteration_range
+        ).astype(np.float64)
+        base_values = contributions[:, -1]
+        field_contributions = contributions[:, :-1] @ self.groups
+        return field_contributions, base_values, contributions.sum(axis=1)
+
+    def explain_records(self, records, approximate=False):
+        """
+        Explique une liste de dictionnaires CarFeatures :
+        liste de {"base_value", "raw_price", "contributions": {champ: contribution}}
+        """
+        field_contributions, base_values, raw_prices = self.explain_encoded(
+            self.encoder.encode_records(records), approximate=approximate
+        )
+        return [
+            {
+                "base_value": base_value,
+                "raw_price": raw_price,
+                "contributions": dict(zip(self.fields, row)),
+            }
+            for row, base_value, raw_price in zip(field_contributions.tolist(), base_values.tolist(), raw_prices.tolist())
+        ]
@@ -0,0 +1,247 @@
+# fast_encoder.py - Encodage NumPy compilé pour l'inférence rapide
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Reproduit exactement le preprocessing du Pipeline créé par create_pipeline()
+# (train_model.py) sans passer par pandas ni par le ColumnTransformer :
+# SimpleImputer(mean) + StandardScaler sur les colonnes numériques,
+# OneHotEncoder(drop='first', handle_unknown='ignore') sur les catégorielles.
+#
+# Tampons : chaque thread garde sa matrice float64 intermédiaire et, sur demande
+# (reuse_buffer=True), sa matrice encodée, agrandies au plus gros lot vu. Le
+# chemin de prédiction de l'API encode ainsi sans allouer ; les appelants qui
+# conservent la matrice (index des comparables, explications) gardent une copie.
+
+import threading
+
+import numpy as np
+
+# Colonnes identiques à train_model.py (l'ordre définit l'ordre des features)
+NUMERIC_FEATURES = ['mileage', 'engine_power', 'private_parking_available', 'has_gps',
+                    'has_air_conditioning', 'automatic_car', 'has_getaround_connect',
+                    'has_speed_regulator', 'winter_tires']
+CATEGORICAL_FEATURES = ['model_key', 'fuel', 'paint_color', 'car_type']
+
+
+class FastEncoder:
+    """
+    Encodeur NumPy construit à partir des paramètres appris du preprocessor
+    Transforme des dictionnaires CarFeatures en matrice float32 pour XGBoost
+    """
+
+    def __init__(self, numeric_features, impute_values, means, scales,
+                 categorical_features, categories, drop_idx):
+        self.numeric_features = list(numeric_features)
+        self.categorical_features = list(categorical_features)
+        self.impute_values = np.asarray(impute_values, dtype=np.float64)
+        self.means = np.asarray(means, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+
+        # 🗂️ Table de correspondance catégorie -> colonne de sortie
+        # La catégorie supprimée (drop='first') et les inconnues n'ont pas de colonne
+        self.category_columns = {}
+        self.categories = {}
+        self.drop_idx = {}
+        offset = len(self.numeric_features)
+        for feature, feature_categories, dropped in zip(self.categorical_features, categories, drop_idx):
+            feature_categories = [str(c) for c in feature_categories]
+            lookup = {}
+            for position, category in enumerate(feature_categories):
+                if dropped is not None and position == dropped:
+                    continue
+                lookup[category] = offset
+                offset += 1
+            self.category_columns[feature] = lookup
+            self.categories[feature] = feature_categories
+            self.drop_idx[feature] = None if dropped is None else int(dropped)
+
+        self.n_features = offset
+        self._buffers = threading.local()
+
+    def _buffer(self, name, n_rows, n_columns, dtype):
+        """
+        Tampon du thread courant, réalloué seulement si le lot dépasse sa taille
+        """
+        buffer = getattr(self._buffers, name, None)
+        if buffer is None or len(buffer) < n_rows:
+            buffer = np.empty((n_rows, n_columns), dtype=dtype)
+            setattr(self._buffers, name, buffer)
+        return buffer[:n_rows]
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Extrait les paramètres appris d'un Pipeline create_pipeline() + régresseur
+        Lève ValueError si la structure ne correspond pas à celle attendue
+        """
+        try:
+            preprocessor = pipeline.named_steps['preprocessor']
+            num_pipeline = preprocessor.named_transformers_['num']
+            cat_pipeline = preprocessor.named_transformers_['cat']
+            imputer = num_pipeline.named_steps['imputer']
+            scaler = num_pipeline.named_steps['scaler']
+            onehot = cat_pipeline.named_steps['onehot']
+        except (AttributeError, KeyError) as e:
+            raise ValueError(f"Structure de pipeline non supportée : {e}")
+
+        columns = {name: list(cols) for name, _, cols in preprocessor.transformers_}
+        if columns.get('num') != NUMERIC_FEATURES or columns.get('cat') != CATEGORICAL_FEATURES:
+            raise ValueError("Colonnes du preprocessor différentes de train_model.py")
+
+        if getattr(imputer, 'strategy', None) != 'mean':
+            raise ValueError("Seul l'imputer numérique 'mean' est supporté")
+
+        drop_idx = onehot.drop_idx_
+        if drop_idx is None:
+            drop_idx = [None] * len(onehot.categories_)
+
+        n_numeric = len(NUMERIC_FEATURES)
+        means = scaler.mean_ if scaler.with_mean else np.zeros(n_numeric)
+        scales = scaler.scale_ if scaler.with_std else np.ones(n_numeric)
+
+        return cls(
+            numeric_features=NUMERIC_FEATURES,
+            impute_values=imputer.statistics_,
+            means=means,
+            scales=scales,
+            categorical_features=CATEGORICAL_FEATURES,
+            categories=onehot.categories_,
+            drop_idx=drop_idx,
+        )
+
+    def encode_columns(self, columns, n_rows=None, reuse_buffer=False):
+        """
+        Encode des données colonnaires {feature: liste de valeurs} en matrice float32
+        reuse_buffer : écrit dans le tampon du thread, écrasé par son prochain appel
+        """
+        if n_rows is None:
+            n_rows = len(columns[self.numeric_features[0]])
+
+        # Mêmes opérations et même ordre que StandardScaler (float64) puis cast float32
+        numeric = self._buffer("numeric", n_rows, len(self.numeric_features), np.float64)
+        for position, feature in enumerate(self.numeric_features):
+            numeric[:, position] = np.asarray(columns[feature], dtype=np.float64)
+        missing = np.isnan(numeric)
+        if missing.any():
+            numeric[missing] = np.broadcast_to(self.impute_values, numeric.shape)[missing]
+        numeric -= self.means
+        numeric /= self.scales
+
+        if reuse_buffer:
+            encoded = self._buffer("encoded", n_rows, self.n_features, np.float32)
+            encoded.fill(0.0)
+        else:
+            encoded = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        encoded[:, :len(self.numeric_features)] = numeric
+
+        rows = np.arange(n_rows)
+        for feature in self.categorical_features:
+            lookup = self.category_columns[feature]
+            target = np.fromiter((lookup.get(str(value), -1) for value in columns[feature]),
+                                 dtype=np.int64, count=n_rows)
+            known = target >= 0
+            encoded[rows[known], target[known]] = 1.0
+
+        return encoded
+
+    def encode_records(self, records, reuse_buffer=False):
+        """
+        Encode une liste de dictionnaires CarFeatures en matrice float32
+        """
+        features = self.numeric_features + self.categorical_features
+        columns = {feature: [record[feature] for record in records] for feature in features}
+        return self.encode_columns(columns, n_rows=len(records), reuse_buffer=reuse_buffer)
+
+
+class FastPredictor:
+    """
+    Encodeur compilé + booster XGBoost : remplace Pipeline.predict à l'inférence
+    """
+
+    def __init__(self, encoder, booster, iteration_range=(0, 0)):
+        self.encoder = encoder
+        self.booster = booster
+        self.iteration_range = iteration_range
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Construit le prédicteur rapide depuis le Pipeline entraîné
+        Lève ValueError si le régresseur n'est pas un modèle XGBoost
+        """
+        encoder = FastEncoder.from_pipeline(pipeline)
+        regressor = pipeline.steps[-1][1]
+        if not hasattr(regressor, 'get_booster'):
+            raise ValueError(f"Régresseur non supporté : {type(regressor).__name__}")
+
+        booster = regressor.get_booster()
+        if booster.num_features() != encoder.n_features:
+            raise ValueError(
+                f"Nombre de features incohérent : booster={booster.num_features()}, encodeur={encoder.n_features}"
+            )
+
+        # Même plage d'arbres que XGBRegressor.predict (early stopping éventuel)
+        best_iteration = getattr(regressor, 'best_iteration', None)
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        return cls(encoder, booster, iteration_range)
+
+    def predict_encoded(self, encoded):
+        """
+        Prédiction directe du booster sur une matrice déjà encodée
+        """
+        return self.booster.inplace_predict(encoded, iteration_range=self.iteration_range)
+
+    def predict_records(self, records):
+        """
+        Prédiction pour une liste de dictionnaires CarFeatures
+        """
+        return self.predict_encoded(self.encoder.encode_records(records))
+
+    def predict_columns(self, columns, n_rows=None):
+        """
+        Prédiction pour des données colonnaires {feature: valeurs}
+        """
+        return self.predict_encoded(self.encoder.encode_columns(columns, n_rows=n_rows))
+
+
+# 🧪 Vérification de parité avec Pipeline.predict
+def check_parity(pipeline, csv_path, chunk_size=None):
+    """
+    Compare FastPredictor et Pipeline.predict sur tout le dataset de pricing
+    Retourne un dictionnaire avec l'écart maximal et le nombre de lignes comparées
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    X = df.drop(columns=[c for c in ['rental_price_per_day', 'Unnamed: 0'] if c in df.columns])
+
+    predictor = FastPredictor.from_pipeline(pipeline)
+    expected = pipeline.predict(X)
+    columns = {feature: X[feature].to_numpy() for feature in X.columns}
+    actual = predictor.predict_columns(columns, n_rows=len(X))
+
+    diff = np.abs(np.asarray(expected, dtype=np.float64) - np.asarray(actual, dtype=np.float64))
+    return {
+        "rows": int(len(X)),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "n_mismatch": int((diff > 0).sum()),
+        "identical": bool((diff == 0).all()),
+    }
+
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+    from pathlib import Path
+
+    model_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("trained_model.pkl")
+    csv_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("../../data/get_around_pricing_project.csv")
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+
+    result = check_parity(model, csv_path)
+    print(f"🧪 Parité FastPredictor vs Pipeline.predict : {result}")
+    if not result["identical"]:
+        print("❌ Écart détecté entre l'encodeur rapide et le Pipeline")
+        sys.exit(1)
+    print("✅ Prédictions identiques sur tout le dataset")
@@ -0,0 +1,126 @@
+# fingerprint_index.py - Index des empreintes des annonces pour le repricing incrémental
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Pour chaque annonce (identifiant), l'index SQLite conserve l'empreinte de sa
+# ligne de features nettoyée, la version du modèle qui l'a pricée et le prix
+# brut obtenu. Un repricing ne rescore que les annonces nouvelles, modifiées
+# ou pricées par une autre version du modèle ; les autres reprennent leur prix
+# en cache. Les empreintes sont calculées en vectorisé (hash_pandas_object).
+
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from fast_encoder import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    listing_id TEXT PRIMARY KEY,
+    fingerprint INTEGER NOT NULL,
+    model_version TEXT,
+    raw_price REAL NOT NULL,
+    priced_at REAL NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS lookup_ids (
+    position INTEGER PRIMARY KEY,
+    listing_id TEXT NOT NULL
+);
+"""
+
+
+def row_fingerprints(features):
+    """
+    Empreinte 64 bits de chaque ligne de features (après nettoyage)
+    Types normalisés avant hachage : une colonne lue en int ou en float donne la même empreinte
+    """
+    normalized = pd.DataFrame({
+        **{feature: features[feature].astype(np.float64) for feature in NUMERIC_FEATURES},
+        **{feature: features[feature].astype(str) for feature in CATEGORICAL_FEATURES},
+    })
+    # uint64 vu en int64 : stockable tel quel dans une colonne INTEGER SQLite
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy().view(np.int64)
+
+
+class FingerprintIndex:
+    """
+    Index SQLite {annonce: (empreinte, version du modèle, prix brut)}
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def lookup(self, listing_ids):
+        """
+        Entrées de l'index alignées sur listing_ids : (trouvée, empreinte, version, prix brut)
+        Jointure sur une table temporaire : une requête par morceau, quelle que soit sa taille
+        """
+        n_rows = len(listing_ids)
+        found = np.zeros(n_rows, dtype=bool)
+        fingerprints = np.zeros(n_rows, dtype=np.int64)
+        versions = np.full(n_rows, None, dtype=object)
+        raw_prices = np.full(n_rows, np.nan, dtype=np.float64)
+
+        with self._connection:
+            self._connection.execute("DELETE FROM lookup_ids")
+            self._connection.executemany(
+                "INSERT INTO lookup_ids (position, listing_id) VALUES (?, ?)",
+                enumerate(str(listing_id) for listing_id in listing_ids)
+            )
+            rows = self._connection.execute(
+                "SELECT l.position, f.fingerprint, f.model_version, f.raw_price "
+                "FROM lookup_ids l JOIN fingerprints f ON f.listing_id = l.listing_id"
+            ).fetchall()
+
+        if rows:
+            positions, row_hashes, row_versions, row_prices = zip(*rows)
+            positions = np.asarray(positions, dtype=np.int64)
+            found[positions] = True
+            fingerprints[positions] = row_hashes
+            versions[positions] = row_versions
+            raw_prices[positions] = row_prices
+        return found, fingerprints, versions, raw_prices
+
+    def stale_rows(self, listing_ids, fingerprints, model_version):
+        """
+        Lignes à rescorer (absentes, modifiées ou pricées par une autre version)
+        et prix bruts en cache (NaN pour les lignes à rescorer)
+        """
+        found, indexed_fingerprints, versions, raw_prices = self.lookup(listing_ids)
+        stale = ~found | (indexed_fingerprints != fingerprints) | (versions != model_version)
+        raw_prices[stale] = np.nan
+        return stale, raw_prices
+
+    def upsert(self, listing_ids, fingerprints, model_version, raw_prices):
+        """
+        Enregistre les annonces rescorées (la dernière occurrence d'un identifiant l'emporte)
+        """
+        priced_at = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO fingerprints (listing_id, fingerprint, model_version, raw_price, priced_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (listing_id) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                "model_version = excluded.model_version, raw_price = excluded.raw_price, "
+                "priced_at = excluded.priced_at",
+                [
+                    (str(listing_id), int(fingerprint), model_version, float(price), priced_at)
+                    for listing_id, fingerprint, price in zip(listing_ids, fingerprints, raw_prices)
+                ]
+            )
+
+    def stats(self):
+        """
+        Nombre d'annonces indexées par version du modèle
+        """
+        rows = self._connection.execute(
+            "SELECT model_version, COUNT(*) FROM fingerprints GROUP BY model_version"
+        ).fetchall()
+        return {"listings": sum(count for _, count in rows), "by_model_version": dict(rows)}
@@ -0,0 +1,149 @@
+# market_index.py - Position d'un prix dans son segment de marché (index de prix triés)
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Au chargement, les rental_price_per_day de get_around_pricing_project.csv sont
+# regroupés par segment (marque x type x carburant, puis segments plus larges)
+# dans des tableaux NumPy triés, avec leurs quartiles précalculés. À la requête,
+# le segment est trouvé par lecture de dictionnaire et le rang du prix par deux
+# recherches binaires (searchsorted) : aucun DataFrame, aucun groupby.
+
+import csv
+import time
+
+import numpy as np
+
+# Segments du plus fin au plus large : le premier assez peuplé est utilisé
+SEGMENT_LEVELS = [
+    ("model_key", "car_type", "fuel"),
+    ("model_key", "car_type"),
+    ("model_key",),
+    ("car_type", "fuel"),
+    ("car_type",),
+    (),
+]
+
+PRICE_COLUMN = "rental_price_per_day"
+DEFAULT_MIN_SEGMENT_SIZE = 20
+
+
+class MarketPriceIndex:
+    """
+    Prix du marché triés par segment : {niveau: {valeurs du segment: (prix triés, quartiles)}}
+    """
+
+    def __init__(self, rows, min_segment_size=DEFAULT_MIN_SEGMENT_SIZE):
+        start_time = time.time()
+        self.min_segment_size = min_segment_size
+        self.segments = {level: {} for level in SEGMENT_LEVELS}
+
+        grouped = {level: {} for level in SEGMENT_LEVELS}
+        n_rows = 0
+        for row in rows:
+            try:
+                price = float(row[PRICE_COLUMN])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not np.isfinite(price):
+                continue
+            n_rows += 1
+            for level, groups in grouped.items():
+                groups.setdefault(tuple(row[field] for field in level), []).append(price)
+
+        for level, groups in grouped.items():
+            for key, prices in groups.items():
+                sorted_prices = np.sort(np.asarray(prices, dtype=np.float64))
+                self.segments[level][key] = (sorted_prices, np.quantile(sorted_prices, [0.1, 0.25, 0.5, 0.75, 0.9]))
+
+        self.n_rows = n_rows
+        self.build_ms = round((time.time() - start_time) * 1000, 2)
+
+    @classmethod
+    def from_csv(cls, csv_path, min_segment_size=DEFAULT_MIN_SEGMENT_SIZE):
+        """
+        Index construit à partir du dataset de pricing (lecture csv, sans pandas)
+        """
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            return cls(csv.DictReader(f), min_segment_size=min_segment_size)
+
+    def segment_for(self, car):
+        """
+        Segment le plus fin contenant au moins min_segment_size annonces : (niveau, clé, prix triés, quartiles)
+        """
+        for level in SEGMENT_LEVELS:
+            key = tuple(str(car[field]) for field in level)
+            entry = self.segments[level].get(key)
+            if entry is not None and (len(entry[0]) >= self.min_segment_size or not level):
+                return (level, key, *entry)
+        raise ValueError("Index de marché vide")
+
+    def position(self, car, price):
+        """
+        Position d'un prix dans le segment du véhicule :
+        percentile (rang moyen des ex aequo, 0-100), segment utilisé et distribution du segment
+        """
+        level, key, sorted_prices, quantiles = self.segment_for(car)
+        below = int(np.searchsorted(sorted_prices, price, side="left"))
+        not_above = int(np.searchsorted(sorted_prices, price, side="right"))
+        size = len(sorted_prices)
+        return {
+            "percentile": round(100.0 * (below + not_above) / (2 * size), 2),
+            "cheaper_listings": below,
+            "pricier_listings": size - not_above,
+            "segment": dict(zip(level, key)),
+            "segment_size": size,
+            "fallback_level": SEGMENT_LEVELS.index(level),
+            "distribution": {
+                "min": float(sorted_prices[0]),
+                "p10": round(float(quantiles[0]), 2),
+                "p25": round(float(quantiles[1]), 2),
+                "median": round(float(quantiles[2]), 2),
+                "p75": round(float(quantiles[3]), 2),
+                "p90": round(float(quantiles[4]), 2),
+                "max": float(sorted_prices[-1]),
+            },
+        }
+
+    def stats(self):
+        return {
+            "listings": self.n_rows,
+            "segments": {" x ".join(level) or "all": len(groups) for level, groups in self.segments.items()},
+            "min_segment_size": self.min_segment_size,
+            "build_ms": self.build_ms,
+        }
+
+
+# 🧪 Comparaison avec un groupby pandas et temps par requête
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    import pandas as pd
+
+    from model_loader import find_pricing_dataset
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else find_pricing_dataset(Path(__file__).resolve().parent)
+    index = MarketPriceIndex.from_csv(csv_path)
+    print(f"🗂️ Index construit en {index.build_ms} ms : {index.stats()['segments']}")
+
+    df = pd.read_csv(csv_path)
+    cars = df.sample(500, random_state=0).to_dict("records")
+    mismatches = 0
+    for car in cars:
+        price = car[PRICE_COLUMN] * 1.1
+        result = index.position(car, price)
+        segment = df
+        for field, value in result["segment"].items():
+            segment = segment[segment[field].astype(str) == value]
+        expected = 100 * ((segment[PRICE_COLUMN] < price).sum() + (segment[PRICE_COLUMN] <= price).sum()) / (2 * len(segment))
+        mismatches += abs(expected - result["percentile"]) > 0.01
+
+    start = time.perf_counter()
+    for car in cars:
+        index.position(car, car[PRICE_COLUMN])
+    per_call_us = (time.perf_counter() - start) / len(cars) * 1e6
+
+    print(f"⏱️ {per_call_us:.1f} µs par requête")
+    if mismatches:
+        print(f"❌ {mismatches} percentiles différents du calcul pandas")
+        sys.exit(1)
+    print(f"✅ Percentiles identiques au calcul pandas sur {len(cars)} véhicules")
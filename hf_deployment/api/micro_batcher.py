@@ -0,0 +1,148 @@
+# micro_batcher.py - Regroupement dynamique des requêtes /predict concurrentes
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Les requêtes qui arrivent dans une même fenêtre (ex : 2 ms ou 64 véhicules)
+# sont regroupées en un seul appel vectorisé au modèle, exécuté dans un thread
+# pour ne pas bloquer la boucle d'événements. Chaque appelant récupère son
+# résultat via un future asyncio. Chaque requête porte le modèle qu'elle a
+# capturé : un lot est découpé par modèle, pour qu'un rechargement à chaud ne
+# fasse pas prédire une requête par un autre modèle que celui de sa version.
+
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Collecte les prédictions unitaires et les exécute par lots dans un thread
+    predict_fn(records, model) reçoit une liste de dictionnaires et le modèle passé à submit(),
+    et retourne un tableau de prix
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        # Requêtes sorties de la file et pas encore résolues (lot en collecte ou en cours de prédiction)
+        self._batch = []
+
+        # 📊 Compteurs exposés dans /health
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Démarre la tâche de collecte sur la boucle d'événements courante
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        print(f"📦 Micro-batching actif (fenêtre : {self.max_wait * 1000:g} ms / {self.max_batch_size} véhicules)")
+
+    async def stop(self):
+        """
+        Arrête la tâche de collecte ; les appelants en attente reçoivent une erreur,
+        y compris ceux du lot en cours de prédiction (le thread n'est pas interrompu)
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        pending = self._batch
+        self._batch = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher arrêté"))
+
+    async def submit(self, record, model=None):
+        """
+        Ajoute une prédiction au prochain lot et attend son résultat (prix brut)
+        model : modèle capturé par l'appelant, passé tel quel à predict_fn
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record, model, future))
+        return await future
+
+    def stats(self):
+        """
+        État du micro-batcher pour le monitoring
+        """
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "max_observed_batch": self.max_observed_batch,
+        }
+
+    async def _collect(self):
+        """
+        Attend une première requête puis complète le lot jusqu'à la taille ou au délai maximal
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Requêtes déjà arrivées : pas d'attente
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """
+        Boucle séquentielle : collecte d'un lot, puis prédiction dans un thread ;
+        les requêtes arrivées pendant la prédiction attendent dans la file le lot suivant
+        """
+        while True:
+            batch = await self._collect()
+
+            # Un sous-lot par modèle (un rechargement peut survenir pendant la collecte)
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[1]), []).append(item)
+
+            for group in groups.values():
+                records = [record for record, _, _ in group]
+                try:
+                    prices = await asyncio.to_thread(self.predict_fn, records, group[0][1])
+                except Exception as e:
+                    for _, _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self.batches += 1
+                self.items += len(group)
+                self.max_observed_batch = max(self.max_observed_batch, len(group))
+
+                for (_, _, future), price in zip(group, prices):
+                    # L'appelant a pu être annulé (client déconnecté)
+                    if not future.done():
+                        future.set_result(float(price))
+            self._batch = []
@@ -0,0 +1,151 @@
+# model_loader.py - Chargement du modèle local et règles de prix, sans dépendance à l'API
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Partagé par app.py, les jobs batch (reprice_fleet.py, option_optimizer.py) et
+# les vérifications en ligne de commande des index (comparables.py, market_index.py) :
+# les processus de scoring importent ce module au lieu de app.py, sans FastAPI,
+# pydantic ni l'état global de l'API. Les chemins sont résolus dans `directory`
+# (dossier courant par défaut, comme l'API), sans changer de répertoire courant.
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+from fast_encoder import FastPredictor
+from tree_engine import ArrayForestModel, ARRAYS_FILENAME
+
+PICKLE_FILENAME = "trained_model.pkl"
+METADATA_FILENAME = "model_metadata.json"
+
+MODEL_ARTIFACTS = {"arrays": ARRAYS_FILENAME, "pickle": PICKLE_FILENAME}
+
+# Emplacements connus du dataset de pricing, relatifs au dossier de l'API
+PRICING_DATASET_CANDIDATES = [
+    "get_around_pricing_project.csv",
+    "../get_around_pricing_project.csv",
+    "../../data/get_around_pricing_project.csv",
+]
+
+
+def load_model_metadata(directory=None):
+    """
+    Charge les métadonnées du modèle exporté
+    """
+    metadata_path = Path(directory or ".") / METADATA_FILENAME
+    if metadata_path.exists():
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            print(f"📋 Métadonnées chargées : Run {metadata.get('run_id', 'Unknown')}")
+            return metadata
+        except Exception as e:
+            print(f"⚠️ Erreur métadonnées : {e}")
+
+    return {}
+
+
+def load_local_model(use_arrays=True, directory=None):
+    """
+    Chargement du modèle depuis les fichiers exportés de `directory` :
+    0. Priorité : forêt NumPy exportée (sans xgboost / sklearn / pandas), si use_arrays
+       et si elle a été exportée depuis le trained_model.pkl présent (empreinte enregistrée)
+    1. Sinon : pickle exporté depuis MLflow
+    Retourne (None, "none", {}) si aucun fichier n'est chargeable
+    """
+    print("📥 Chargement du modèle...")
+    directory = Path(directory or ".")
+
+    # Option 0 : Artefact tableaux NumPy (démarrage rapide, indépendant des versions de librairies)
+    arrays_path = directory / ARRAYS_FILENAME
+    model_path = directory / PICKLE_FILENAME
+    if use_arrays and arrays_path.exists():
+        try:
+            model = ArrayForestModel.load(arrays_path)
+            if model_path.exists() and not model.matches_source(model_path):
+                print(f"⚠️ {arrays_path} n'a pas été exporté depuis le {model_path} actuel : chargement du pickle "
+                      f"(réexporter avec python tree_engine.py)")
+            else:
+                print(f"✅ Modèle chargé depuis tableaux NumPy : {arrays_path} ({model.n_trees} arbres)")
+                return model, "arrays", load_model_metadata(directory)
+        except Exception as e:
+            print(f"⚠️ Erreur artefact NumPy : {e}")
+
+    # Option 1 : Charger depuis pickle
+    if model_path.exists():
+        try:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            print(f"✅ Modèle chargé depuis pickle : {model_path}")
+            return model, "pickle", load_model_metadata(directory)
+        except Exception as e:
+            print(f"⚠️ Erreur pickle : {e}")
+
+    return None, "none", {}
+
+
+def find_pricing_dataset(directory=None):
+    """
+    Cherche le dataset de pricing (GETAROUND_PRICING_DATA puis emplacements connus)
+    """
+    directory = Path(directory or ".")
+    candidates = [os.getenv("GETAROUND_PRICING_DATA")] + [directory / candidate for candidate in PRICING_DATASET_CANDIDATES]
+    for candidate in candidates:
+        if candidate and Path(candidate).exists():
+            return Path(candidate)
+    return None
+
+
+# ⚡ Encodeur compilé : contourne pandas et le ColumnTransformer à l'inférence
+def build_fast_predictor(model):
+    """
+    Construit le FastPredictor à partir du Pipeline chargé
+    Retourne None si le modèle n'a pas la structure de train_model.py
+    """
+    if model is None:
+        return None
+    # La forêt NumPy embarque déjà son encodeur
+    if isinstance(model, ArrayForestModel):
+        return model
+    try:
+        predictor = FastPredictor.from_pipeline(model)
+        print(f"⚡ Encodeur rapide prêt : {predictor.encoder.n_features} features")
+        return predictor
+    except Exception as e:
+        print(f"⚠️ Encodeur rapide indisponible, fallback Pipeline.predict : {e}")
+        return None
+
+
+def compute_model_version(source, metadata, artifact=None, directory=None):
+    """
+    Version du modèle : run MLflow d'origine + empreinte du fichier servi
+    """
+    run_id = (metadata or {}).get("run_id", "unknown")[:8]
+    artifact = artifact or MODEL_ARTIFACTS.get(source)
+    if artifact is None:
+        return f"{run_id}-{source}"
+    artifact = Path(directory or ".") / artifact
+    if not artifact.exists():
+        return f"{run_id}-{source}"
+    digest = hashlib.sha1(artifact.read_bytes()).hexdigest()[:8]
+    return f"{run_id}-{digest}"
+
+
+# 🧮 Règles de validation des prix appliquées sur un tableau de prédictions
+def apply_price_rules(raw_prices):
+    """
+    Version vectorisée de la logique de validation de /predict :
+    - prix < 1 : remplacé par 30, confiance "low"
+    - prix > 1000 : plafonné à 1000, confiance "medium"
+    - sinon : confiance "high"
+    """
+    raw_prices = np.asarray(raw_prices, dtype=np.float64)
+    too_low = raw_prices < 1
+    too_high = raw_prices > 1000
+
+    prices = np.where(too_low, 30.0, np.minimum(raw_prices, 1000.0))
+    confidences = np.where(too_low, "low", np.where(too_high, "medium", "high"))
+    return np.round(prices, 2), confidences
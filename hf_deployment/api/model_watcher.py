@@ -0,0 +1,101 @@
+# model_watcher.py - Surveillance des fichiers du modèle pour le rechargement à chaud
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Un thread compare périodiquement la signature (mtime, taille) des fichiers
+# du modèle. Quand elle change et reste stable le temps d'une vérification
+# (fichier entièrement copié), le callback de rechargement est appelé avec la
+# liste des fichiers modifiés.
+
+import threading
+from pathlib import Path
+
+
+def files_signature(paths):
+    """
+    Signature {chemin: (mtime_ns, taille)} ; None pour un fichier absent
+    """
+    signature = {}
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            signature[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature[str(path)] = None
+    return signature
+
+
+class ModelFileWatcher:
+    """
+    Thread de polling sur les fichiers du modèle
+    on_change(changed_paths) est appelé dans le thread de surveillance
+    """
+
+    def __init__(self, paths, on_change, poll_interval=10.0, settle_seconds=1.0):
+        self.paths = [str(path) for path in paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self._signature = files_signature(self.paths)
+        self._stop = threading.Event()
+        self._thread = None
+
+        # 📊 Compteurs exposés dans /health
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Surveillance des fichiers du modèle toutes les {self.poll_interval:g}s")
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def acknowledge(self):
+        """
+        Prend la signature courante comme référence (après un rechargement manuel)
+        """
+        self._signature = files_signature(self.paths)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.checks += 1
+            signature = files_signature(self.paths)
+            if signature == self._signature:
+                continue
+
+            # Attendre que la copie soit terminée : signature stable entre deux lectures
+            if self._stop.wait(self.settle_seconds):
+                break
+            if files_signature(self.paths) != signature:
+                continue
+
+            changed = [path for path in self.paths if signature[path] != self._signature.get(path)]
+            self._signature = signature
+            self.changes += 1
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Erreur lors du rechargement du modèle : {e}")
+
+    def stats(self):
+        """
+        État de la surveillance pour le monitoring
+        """
+        return {
+            "running": self._thread is not None,
+            "poll_interval": self.poll_interval,
+            "files": self.paths,
+            "checks": self.checks,
+            "changes": self.changes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,348 @@
+# monitoring.py - Histogrammes de latence par étape et export Prometheus
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Chaque étape de /predict (validation, DataFrame, preprocessing, inférence,
+# post-traitement, logging) est chronométrée dans un sketch de quantiles en
+# mémoire. /metrics expose p50/p90/p99 et les compteurs au format texte
+# Prometheus, sans coût de stockage par requête.
+# PredictionStats tient les agrégats de prix servis par /mlflow-stats en O(1),
+# sérialisables pour être fusionnés entre workers.
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Quantiles exposés sur /metrics
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """
+    Sketch de quantiles à précision relative (buckets logarithmiques, type DDSketch)
+    Chaque quantile est exact à relative_accuracy près ; deux sketches se fusionnent
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, count=1):
+        """
+        Ajoute une observation, count fois (les valeurs <= min_value comptent comme zéro)
+        """
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q):
+        """
+        Estimation du quantile q (0 <= q <= 1), None si aucune observation
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Milieu (en relatif) du bucket ]gamma^(i-1), gamma^i]
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        """
+        Ajoute les observations d'un autre sketch de même précision
+        """
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        """
+        Représentation JSON-compatible (persistance / agrégation entre processus)
+        """
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reconstruit un sketch depuis to_dict()
+        """
+        sketch = cls(relative_accuracy=data["relative_accuracy"])
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"] if data["min"] is not None else math.inf
+        sketch.max = data["max"] if data["max"] is not None else -math.inf
+        return sketch
+
+
+class MetricsRegistry:
+    """
+    Registre thread-safe des latences par étape et des compteurs
+    """
+
+    def __init__(self, namespace="getaround"):
+        self.namespace = namespace
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds):
+        """
+        Enregistre la durée d'une étape en secondes
+        """
+        with self._lock:
+            sketch = self._stages.get(stage)
+            if sketch is None:
+                sketch = self._stages[stage] = QuantileSketch()
+            sketch.add(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """
+        Chronomètre un bloc : with metrics_registry.time("inference"): ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name, value=1, **labels):
+        """
+        Incrémente un compteur, éventuellement étiqueté (endpoint="/predict", ...)
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """
+        Résumé JSON des étapes et compteurs
+        """
+        with self._lock:
+            stages = {}
+            for stage, sketch in self._stages.items():
+                stages[stage] = {
+                    "count": sketch.count,
+                    "avg_ms": round(sketch.sum / sketch.count * 1000, 4) if sketch.count else None,
+                    **{f"p{int(q * 100)}_ms": round(sketch.quantile(q) * 1000, 4) for q in EXPORTED_QUANTILES},
+                }
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                label_text = ",".join(f"{k}={v}" for k, v in labels)
+                counters[f"{name}{{{label_text}}}" if labels else name] = value
+            return {"stages": stages, "counters": counters}
+
+    def render_prometheus(self, gauges=None):
+        """
+        Export au format texte Prometheus (summary par étape + compteurs + jauges)
+        gauges : {nom: (valeur, description)} calculées par l'appelant
+        """
+        prefix = self.namespace
+        lines = []
+
+        with self._lock:
+            metric = f"{prefix}_stage_latency_seconds"
+            lines.append(f"# HELP {metric} Latence par étape de traitement des prédictions")
+            lines.append(f"# TYPE {metric} summary")
+            for stage in sorted(self._stages):
+                sketch = self._stages[stage]
+                for q in EXPORTED_QUANTILES:
+                    lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {_format_value(sketch.quantile(q))}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {_format_value(sketch.sum)}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {sketch.count}')
+
+            by_name = {}
+            for (name, labels), value in self._counters.items():
+                by_name.setdefault(name, []).append((labels, value))
+            for name in sorted(by_name):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(by_name[name]):
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for name, (value, description) in sorted((gauges or {}).items()):
+            metric = f"{prefix}_{name}"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {_format_value(value)}")
+
+        lines.append(f"# TYPE {prefix}_uptime_seconds gauge")
+        lines.append(f"{prefix}_uptime_seconds {_format_value(time.time() - self.started_at)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """
+        Remet à zéro toutes les mesures
+        """
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in labels)
+    return "{" + escaped + "}"
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    return repr(float(value))
+
+
+# Score numérique associé à chaque niveau de confiance (identique au logging MLflow)
+CONFIDENCE_SCORES = {"high": 1.0, "medium": 0.5, "low": 0.1}
+
+
+class PredictionStats:
+    """
+    Agrégats incrémentaux des prédictions servies, mis à jour à chaque prédiction
+    Prix : count / somme / min / max + sketch de quantiles ; distributions carburant et marque
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Remet tous les agrégats à zéro
+        """
+        with self._lock:
+            self.prices = QuantileSketch(relative_accuracy=0.005)
+            self.confidence_sum = 0.0
+            self.high_confidence = 0
+            self.fuel_types = {}
+            self.brands = {}
+            self.since = time.time()
+            self.last_prediction = None
+
+    def update(self, input_data, prediction, confidence):
+        """
+        Ajoute une prédiction aux agrégats (O(1))
+        """
+        score = CONFIDENCE_SCORES.get(confidence, 0.0)
+        fuel = input_data.get("fuel", "unknown")
+        brand = input_data.get("model_key", "unknown")
+        with self._lock:
+            self.prices.add(float(prediction))
+            self.confidence_sum += score
+            if score > 0.8:
+                self.high_confidence += 1
+            self.fuel_types[fuel] = self.fuel_types.get(fuel, 0) + 1
+            self.brands[brand] = self.brands.get(brand, 0) + 1
+            self.last_prediction = time.time()
+
+    def merge(self, other):
+        """
+        Ajoute les agrégats d'un autre PredictionStats
+        """
+        with self._lock:
+            self.prices.merge(other.prices)
+            self.confidence_sum += other.confidence_sum
+            self.high_confidence += other.high_confidence
+            for fuel, count in other.fuel_types.items():
+                self.fuel_types[fuel] = self.fuel_types.get(fuel, 0) + count
+            for brand, count in other.brands.items():
+                self.brands[brand] = self.brands.get(brand, 0) + count
+            self.since = min(self.since, other.since)
+            if other.last_prediction is not None:
+                self.last_prediction = max(self.last_prediction or 0, other.last_prediction)
+
+    def to_dict(self):
+        """
+        Représentation JSON-compatible (agrégation entre workers)
+        """
+        with self._lock:
+            return {
+                "prices": self.prices.to_dict(),
+                "confidence_sum": self.confidence_sum,
+                "high_confidence": self.high_confidence,
+                "fuel_types": dict(self.fuel_types),
+                "brands": dict(self.brands),
+                "since": self.since,
+                "last_prediction": self.last_prediction,
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Reconstruit des agrégats depuis to_dict()
+        """
+        stats = cls()
+        stats.prices = QuantileSketch.from_dict(data["prices"])
+        stats.confidence_sum = data["confidence_sum"]
+        stats.high_confidence = data["high_confidence"]
+        stats.fuel_types = dict(data["fuel_types"])
+        stats.brands = dict(data["brands"])
+        stats.since = data["since"]
+        stats.last_prediction = data["last_prediction"]
+        return stats
+
+    def snapshot(self):
+        """
+        Statistiques au format de /mlflow-stats (None si aucune prédiction)
+        """
+        with self._lock:
+            count = self.prices.count
+            if count == 0:
+                return None
+            return {
+                "total_predictions": count,
+                "price_stats": {
+                    "avg_price": round(self.prices.sum / count, 2),
+                    "min_price": round(self.prices.min, 2),
+                    "max_price": round(self.prices.max, 2),
+                    "median_price": round(self.prices.quantile(0.5), 2),
+                    "p90_price": round(self.prices.quantile(0.9), 2),
+                    "p99_price": round(self.prices.quantile(0.99), 2),
+                },
+                "confidence_stats": {
+                    "avg_confidence": round(self.confidence_sum / count, 2),
+                    "high_confidence_ratio": self.high_confidence / count,
+                },
+                "fuel_distribution": dict(self.fuel_types),
+                "brand_distribution": dict(sorted(self.brands.items(), key=lambda x: x[1], reverse=True)),
+                "since": datetime.fromtimestamp(self.since).isoformat(),
+            }
@@ -0,0 +1,229 @@
+# option_optimizer.py - Optimiseur d'équipements : les 2^7 combinaisons d'options d'un véhicule
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Chaque véhicule est répété 128 fois, une fois par combinaison des 7 options
+# booléennes, et tout le lot est scoré en un seul appel au modèle. La combinaison
+# actuelle du véhicule est un masque de bits : le gain de chaque option ajoutée
+# et la meilleure combinaison atteignable en ajoutant des options (sans en
+# retirer) sont lus dans la matrice des prix (véhicules x 128), en vectorisé
+# pour toute une flotte.
+#
+# Usage (flotte) : python option_optimizer.py flotte.csv options.parquet [--chunk-size N] [--workers N]
+
+import argparse
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+# Options booléennes de CarFeatures (bit i de la combinaison = OPTION_FEATURES[i])
+OPTION_FEATURES = ['private_parking_available', 'has_gps', 'has_air_conditioning',
+                   'automatic_car', 'has_getaround_connect', 'has_speed_regulator',
+                   'winter_tires']
+
+N_COMBINATIONS = 2 ** len(OPTION_FEATURES)
+OPTION_BITS = 1 << np.arange(len(OPTION_FEATURES))
+COMBINATION_IDS = np.arange(N_COMBINATIONS)
+
+# Table (128 x 7) : options présentes dans chaque combinaison
+COMBINATIONS = (COMBINATION_IDS[:, None] & OPTION_BITS) != 0
+
+DEFAULT_FLEET_CHUNK_SIZE = 5_000
+
+
+def expand_encoded(encoder, encoded):
+    """
+    Matrice encodée de n véhicules -> n x 128 lignes (véhicule i sur les lignes i*128 .. i*128+127)
+    Le véhicule n'est encodé qu'une fois : seules les 7 colonnes d'options sont réécrites,
+    avec les mêmes opérations que FastEncoder (float64 standardisé puis cast float32)
+    """
+    expanded = np.repeat(encoded, N_COMBINATIONS, axis=0)
+    n_cars = len(encoded)
+    for bit, feature in enumerate(OPTION_FEATURES):
+        position = encoder.numeric_features.index(feature)
+        values = (COMBINATIONS[:, bit].astype(np.float64) - encoder.means[position]) / encoder.scales[position]
+        expanded[:, position] = np.tile(values.astype(np.float32), n_cars)
+    return expanded
+
+
+def expand_columns(columns, n_cars):
+    """
+    Colonnes {feature: tableau} de n véhicules -> n x 128 lignes (modèle sans encodeur rapide)
+    """
+    expanded = {feature: np.repeat(np.asarray(values), N_COMBINATIONS)
+                for feature, values in columns.items() if feature not in OPTION_FEATURES}
+    for bit, feature in enumerate(OPTION_FEATURES):
+        expanded[feature] = np.tile(COMBINATIONS[:, bit].astype(np.int64), n_cars)
+    return expanded
+
+
+def option_raw_prices(columns, n_cars, predictor=None, model=None):
+    """
+    Prix bruts des 128 combinaisons d'options de chaque véhicule, en un seul appel au modèle
+    predictor : encodeur rapide + moteur (FastPredictor, ArrayForestModel, PriceLookupIndex)
+    model : Pipeline scikit-learn, utilisé si predictor est None
+    """
+    if predictor is not None:
+        encoded = predictor.encoder.encode_columns(columns, n_rows=n_cars)
+        raw_prices = predictor.predict_encoded(expand_encoded(predictor.encoder, encoded))
+    else:
+        import pandas as pd
+        raw_prices = model.predict(pd.DataFrame(expand_columns(columns, n_cars)))
+    return np.asarray(raw_prices, dtype=np.float64).reshape(n_cars, N_COMBINATIONS)
+
+
+def current_combinations(columns):
+    """
+    Combinaison actuelle de chaque véhicule (masque de bits ; option absente ou NaN = non équipée)
+    """
+    combination = 0
+    for bit, feature in zip(OPTION_BITS.tolist(), OPTION_FEATURES):
+        flags = np.nan_to_num(np.asarray(columns[feature], dtype=np.float64)) > 0
+        combination = combination + flags * bit
+    return np.asarray(combination, dtype=np.int64)
+
+
+def upgrade_plan(prices, current):
+    """
+    Lit la matrice des prix (véhicules x 128) à partir de la combinaison actuelle de chaque véhicule
+    Retourne un dictionnaire de tableaux :
+    - current_price, option_prices / option_uplifts (véhicules x 7, NaN si l'option est déjà présente)
+    - best_combination, best_price, best_uplift : meilleure combinaison obtenue en ajoutant des options
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rows = np.arange(len(prices))
+    current_price = prices[rows, current]
+
+    owned = (current[:, None] & OPTION_BITS) != 0
+    option_prices = prices[rows[:, None], current[:, None] | OPTION_BITS]
+    option_prices[owned] = np.nan
+    option_uplifts = option_prices - current_price[:, None]
+
+    # Sur-ensembles de la combinaison actuelle : les options déjà présentes sont gardées
+    reachable = (COMBINATION_IDS & current[:, None]) == current[:, None]
+    best_combination = np.where(reachable, prices, -np.inf).argmax(axis=1)
+    best_price = prices[rows, best_combination]
+
+    return {
+        "current_price": current_price,
+        "option_prices": option_prices,
+        "option_uplifts": option_uplifts,
+        "best_combination": best_combination,
+        "best_price": best_price,
+        "best_uplift": best_price - current_price,
+    }
+
+
+def added_options(combination, current):
+    """
+    Noms des options présentes dans combination et absentes de current
+    """
+    return [feature for bit, feature in zip(OPTION_BITS.tolist(), OPTION_FEATURES)
+            if combination & bit and not current & bit]
+
+
+def ranked_options(plan, row=0):
+    """
+    Options ajoutables d'un véhicule triées par gain décroissant : [(option, prix, gain)]
+    """
+    uplifts = plan["option_uplifts"][row]
+    order = np.argsort(-uplifts, kind="stable")
+    return [
+        (OPTION_FEATURES[position], float(plan["option_prices"][row, position]), float(uplifts[position]))
+        for position in order.tolist() if not np.isnan(uplifts[position])
+    ]
+
+
+def score_option_chunk(features):
+    """
+    Prix bruts (véhicules x 128) d'un morceau nettoyé (exécuté dans un processus du pool de reprice_fleet)
+    """
+    import reprice_fleet
+
+    columns = {feature: features[feature].to_numpy() for feature in features.columns}
+    return option_raw_prices(columns, len(features), reprice_fleet._worker_predictor, reprice_fleet._worker_model)
+
+
+def optimize_fleet(input_path, output_path, chunk_size=DEFAULT_FLEET_CHUNK_SIZE, workers=None):
+    """
+    Optimiseur appliqué à chaque ligne d'un fichier d'annonces (CSV ou Parquet) -> Parquet
+    Colonnes ajoutées : current_price, uplift_<option> (NaN si déjà équipée), best_options,
+    best_price, best_uplift, model_version
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from model_loader import apply_price_rules
+    from reprice_fleet import clean_chunk, init_worker, iter_chunks, load_serving_model
+
+    workers = workers or os.cpu_count() or 1
+    _, source, model_version = load_serving_model()
+    print(f"🏷️ Modèle : {source} (version {model_version})")
+    print(f"🧰 Optimisation des options de {input_path} : morceaux de {chunk_size} véhicules "
+          f"({chunk_size * N_COMBINATIONS} combinaisons), {workers} processus")
+
+    start_time = time.time()
+    rows = 0
+    writer = None
+    pending = deque()
+
+    def submit_chunk(pool, chunk):
+        features = clean_chunk(chunk)
+        return pool.submit(score_option_chunk, features), current_combinations(features)
+
+    def write_result(chunk, job):
+        nonlocal writer, rows
+        future, current = job
+        prices, _ = apply_price_rules(future.result())
+        plan = upgrade_plan(prices, current)
+        output = chunk.assign(
+            current_price=plan["current_price"],
+            **{f"uplift_{feature}": np.round(plan["option_uplifts"][:, position], 2)
+               for position, feature in enumerate(OPTION_FEATURES)},
+            best_options=[",".join(added_options(best, owned))
+                          for best, owned in zip(plan["best_combination"].tolist(), current.tolist())],
+            best_price=plan["best_price"],
+            best_uplift=np.round(plan["best_uplift"], 2),
+            model_version=model_version,
+        )
+        if writer is None:
+            table = pa.Table.from_pandas(output, preserve_index=False)
+            writer = pq.ParquetWriter(output_path, table.schema)
+        else:
+            table = pa.Table.from_pandas(output, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        rows += len(output)
+        print(f"📦 {rows} véhicules optimisés ({rows / (time.time() - start_time):.0f} /s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for chunk in iter_chunks(input_path, chunk_size):
+                pending.append((chunk, submit_chunk(pool, chunk)))
+                while len(pending) >= 2 * workers:
+                    write_result(*pending.popleft())
+            while pending:
+                write_result(*pending.popleft())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.time() - start_time
+    print(f"✅ {rows} véhicules optimisés ({rows * N_COMBINATIONS} combinaisons) en {elapsed:.1f}s -> {output_path}")
+    return {"rows": rows, "combinations": rows * N_COMBINATIONS, "seconds": round(elapsed, 2),
+            "workers": workers, "model_version": model_version}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gain de prix de chaque option pour toute la flotte (CSV / Parquet -> Parquet)")
+    parser.add_argument("input", type=Path, help="Fichier des annonces (CSV ou Parquet)")
+    parser.add_argument("output", type=Path, help="Parquet de sortie")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_FLEET_CHUNK_SIZE,
+                        help="Véhicules par morceau (x128 lignes scorées)")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de scoring (défaut : tous les cœurs)")
+    args = parser.parse_args()
+
+    optimize_fleet(args.input.resolve(), args.output.resolve(), args.chunk_size, args.workers)
@@ -0,0 +1,110 @@
+# prediction_cache.py - Cache LRU + TTL des prédictions
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Les dashboards renvoient souvent les mêmes véhicules (exemples, valeurs par
+# défaut de la sidebar) : le prix brut du modèle est mis en cache sur un hash
+# canonique des caractéristiques validées et de la version du modèle, et vidé
+# à chaque changement de modèle.
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(features, model_version=None):
+    """
+    Hash canonique d'un dictionnaire de caractéristiques (ordre des clés indifférent)
+    Préfixé par la version du modèle : un prix d'un ancien modèle n'est jamais resservi
+    """
+    payload = json.dumps(features, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return f"{model_version}:{digest}" if model_version else digest
+
+
+class PredictionCache:
+    """
+    Cache borné : éviction LRU au-delà de max_size, expiration après ttl_seconds
+    Thread-safe (utilisé depuis la boucle d'événements et les threads de prédiction)
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 📊 Compteurs exposés dans /health
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """
+        Retourne la valeur en cache ou None (absente ou expirée)
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Ajoute ou rafraîchit une entrée, en évinçant la moins récemment utilisée si besoin
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Vide le cache (ex : nouveau modèle chargé)
+        """
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        État du cache pour le monitoring
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
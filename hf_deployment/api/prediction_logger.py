@@ -0,0 +1,282 @@
+# prediction_logger.py - Logging asynchrone et groupé des prédictions
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Les prédictions sont déposées dans une file bornée en mémoire ; un thread
+# d'écriture les regroupe par fenêtre (taille ou durée) et les ajoute au
+# journal local (PredictionStore, SQLite) en une transaction, hors du chemin
+# de la requête. MLflow ne reçoit plus qu'un run de synthèse périodique
+# (importé à la première synthèse seulement).
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+# Type des runs MLflow de synthèse périodique
+SUMMARY_RUN_TYPE = "production_summary"
+CONFIDENCE_SCORES = {"high": 1.0, "medium": 0.5, "low": 0.1}
+
+
+class PredictionLogger:
+    """
+    File bornée + thread d'écriture vers le journal des prédictions et MLflow
+    Le dépôt d'une prédiction ne bloque jamais : si la file est pleine, elle est ignorée
+    summary_interval=None : pas de synthèse MLflow (monitoring désactivé ou pas encore initialisé)
+    """
+
+    def __init__(self, store, experiment_name, max_queue_size=10000, flush_size=200,
+                 flush_interval=5.0, summary_interval=300.0):
+        self.store = store
+        self.experiment_name = experiment_name
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.summary_interval = summary_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._experiment_ids = {}
+        self._summary = None
+        self._summary_started = time.monotonic()
+
+        # 📊 Compteurs exposés dans /health
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush = None
+        self.summary_runs = 0
+
+    def start(self):
+        """
+        Démarre le thread d'écriture en arrière-plan
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="mlflow-prediction-logger", daemon=True)
+        self._thread.start()
+        summary = f"synthèse MLflow toutes les {self.summary_interval:g}s" if self.summary_interval else "sans synthèse MLflow"
+        print(f"📝 Logger asynchrone démarré (fenêtre : {self.flush_size} prédictions / {self.flush_interval}s, {summary})")
+
+    def stop(self, timeout=10.0):
+        """
+        Arrête le thread après avoir écrit les prédictions restantes
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._write_summary()
+        print(f"📝 Logger arrêté ({self.written} prédictions écrites, {self.dropped} ignorées)")
+
+    def log(self, input_data, prediction, confidence, processing_time=None):
+        """
+        Dépose une prédiction dans la file (non bloquant)
+        """
+        record = {
+            "input": input_data,
+            "prediction": float(prediction),
+            "confidence": confidence,
+            "processing_time": processing_time,
+            "timestamp": time.time(),
+        }
+        try:
+            self._queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        """
+        État du logger pour le monitoring
+        """
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "last_flush": self.last_flush,
+            "summary_runs": self.summary_runs,
+        }
+
+    def _run(self):
+        """
+        Boucle du thread : regroupe les prédictions et déclenche les écritures
+        La fenêtre démarre à la première prédiction reçue
+        """
+        pending = []
+        deadline = None
+
+        while True:
+            stopping = self._stop_event.is_set()
+            wait = 0.5 if deadline is None else deadline - time.monotonic()
+            if wait > 0 and not stopping:
+                try:
+                    pending.append(self._queue.get(timeout=min(wait, 0.5)))
+                except queue.Empty:
+                    pass
+
+            # Vider ce qui est déjà disponible sans attendre
+            while len(pending) < self.flush_size:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if pending and deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            window_full = len(pending) >= self.flush_size
+            window_expired = deadline is not None and time.monotonic() >= deadline
+            if pending and (window_full or window_expired or stopping):
+                self._flush(pending)
+                pending = []
+                deadline = None
+
+            if (self._summary is not None and self.summary_interval is not None
+                    and time.monotonic() - self._summary_started >= self.summary_interval):
+                self._write_summary()
+
+            if stopping and not pending and self._queue.empty():
+                break
+
+    def _experiment_id(self, client):
+        """
+        Identifiant de l'expérience courante (mis en cache par nom)
+        """
+        name = self.experiment_name
+        if name not in self._experiment_ids:
+            experiment = client.get_experiment_by_name(name)
+            if experiment is None:
+                experiment_id = client.create_experiment(name)
+            else:
+                experiment_id = experiment.experiment_id
+            self._experiment_ids[name] = experiment_id
+        return self._experiment_ids[name]
+
+    def _flush(self, records):
+        """
+        Ajoute une fenêtre de prédictions au journal et à la synthèse en cours
+        Une erreur d'écriture n'interrompt jamais le thread
+        """
+        try:
+            if self.store is not None:
+                self.store.append_many(records)
+            self.written += len(records)
+            self.flushes += 1
+            self.last_flush = datetime.now().isoformat()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Erreur écriture du journal des prédictions (non critique) : {e}")
+
+        if self._summary is None:
+            self._summary = new_summary()
+            self._summary_started = time.monotonic()
+        add_to_summary(self._summary, records)
+
+    def _write_summary(self):
+        """
+        Écrit la synthèse de la période écoulée dans un run MLflow
+        """
+        if self.summary_interval is None:
+            return
+        summary, self._summary = self._summary, None
+        if not summary or not summary["count"]:
+            return
+        try:
+            from mlflow.tracking import MlflowClient
+            client = MlflowClient()
+            write_summary_run(client, self._experiment_id(client), summary)
+            self.summary_runs += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Erreur logging MLflow (non critique) : {e}")
+
+
+def new_summary():
+    """
+    Agrégats vides d'une période de synthèse
+    """
+    return {
+        "count": 0, "price_sum": 0.0, "price_min": None, "price_max": None,
+        "confidence_sum": 0.0, "processing_time_sum": 0.0, "processing_time_count": 0,
+        "fuel_types": {}, "brands": {}, "first_timestamp": None, "last_timestamp": None,
+    }
+
+
+def add_to_summary(summary, records):
+    """
+    Ajoute une fenêtre de prédictions aux agrégats de la période
+    """
+    for record in records:
+        price = record["prediction"]
+        summary["count"] += 1
+        summary["price_sum"] += price
+        summary["price_min"] = price if summary["price_min"] is None else min(summary["price_min"], price)
+        summary["price_max"] = price if summary["price_max"] is None else max(summary["price_max"], price)
+        summary["confidence_sum"] += CONFIDENCE_SCORES.get(record["confidence"], 0.0)
+        if record["processing_time"]:
+            summary["processing_time_sum"] += record["processing_time"]
+            summary["processing_time_count"] += 1
+
+        fuel = record["input"].get("fuel", "unknown")
+        summary["fuel_types"][fuel] = summary["fuel_types"].get(fuel, 0) + 1
+        brand = record["input"].get("model_key", "unknown")
+        summary["brands"][brand] = summary["brands"].get(brand, 0) + 1
+
+        if summary["first_timestamp"] is None:
+            summary["first_timestamp"] = record["timestamp"]
+        summary["last_timestamp"] = record["timestamp"]
+
+
+def write_summary_run(client, experiment_id, summary):
+    """
+    Crée un run MLflow de synthèse pour une période de production
+    """
+    from mlflow.entities import Metric, Param, RunTag
+
+    window_start = datetime.fromtimestamp(summary["first_timestamp"])
+    window_end = datetime.fromtimestamp(summary["last_timestamp"])
+    count = summary["count"]
+
+    run = client.create_run(
+        experiment_id,
+        run_name=f"summary_{window_start.strftime('%H%M%S')}_{count}",
+        tags={"type": SUMMARY_RUN_TYPE},
+    )
+    run_id = run.info.run_id
+    now_ms = int(time.time() * 1000)
+
+    metrics = {
+        "n_predictions": count,
+        "avg_predicted_price": summary["price_sum"] / count,
+        "min_predicted_price": summary["price_min"],
+        "max_predicted_price": summary["price_max"],
+        "avg_confidence_score": summary["confidence_sum"] / count,
+    }
+    if summary["processing_time_count"]:
+        metrics["avg_processing_time_ms"] = summary["processing_time_sum"] / summary["processing_time_count"]
+
+    client.log_batch(
+        run_id,
+        metrics=[Metric(key, value, now_ms, 0) for key, value in metrics.items()],
+        params=[
+            Param("deployment_env", "huggingface_spaces"),
+            Param("model_version", "hf_production"),
+            Param("window_start", window_start.isoformat()),
+            Param("window_end", window_end.isoformat()),
+        ],
+        tags=[
+            RunTag("fuel_distribution", json.dumps(summary["fuel_types"], ensure_ascii=False)),
+            RunTag("brand_distribution", json.dumps(summary["brands"], ensure_ascii=False)),
+        ],
+    )
+    client.set_terminated(run_id)
+    print(f"📊 Synthèse de {count} prédictions loggée dans MLflow")
@@ -0,0 +1,380 @@
+# prediction_store.py - Journal local des prédictions (SQLite, mode WAL)
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Remplace le file store MLflow (un dossier de run par prédiction) comme journal
+# des prédictions : une table en ajout seul, indexée sur le temps, le carburant,
+# la marque et le type de véhicule. /mlflow-stats et les dashboards l'interrogent
+# avec des requêtes d'agrégats filtrées par fenêtre de temps.
+# Chaque écriture met aussi à jour des buckets d'une minute par segment
+# (nombre, somme des prix, sketches de prix et de latence) et le compteur total :
+# séries temporelles, médiane et total sont lus dans ces agrégats, sans relire
+# les prédictions brutes.
+
+import json
+import math
+import sqlite3
+import threading
+from datetime import datetime
+
+from monitoring import QuantileSketch
+
+# Colonnes d'entrée CarFeatures stockées telles quelles
+FEATURE_COLUMNS = ['model_key', 'mileage', 'engine_power', 'fuel', 'paint_color', 'car_type',
+                   'private_parking_available', 'has_gps', 'has_air_conditioning', 'automatic_car',
+                   'has_getaround_connect', 'has_speed_regulator', 'winter_tires']
+
+# Filtres de segment autorisés dans les requêtes
+SEGMENT_FILTERS = ('fuel', 'model_key', 'car_type')
+
+# Granularité des buckets pré-agrégés et tailles de bucket des séries temporelles
+BASE_BUCKET_SECONDS = 60
+BUCKET_SIZES = {"1m": 60, "5m": 300, "1h": 3600}
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+CONFIDENCE_SCORE_SQL = "CASE confidence WHEN 'high' THEN 1.0 WHEN 'medium' THEN 0.5 WHEN 'low' THEN 0.1 ELSE 0.0 END"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model_key TEXT,
+    mileage INTEGER,
+    engine_power INTEGER,
+    fuel TEXT,
+    paint_color TEXT,
+    car_type TEXT,
+    private_parking_available INTEGER,
+    has_gps INTEGER,
+    has_air_conditioning INTEGER,
+    automatic_car INTEGER,
+    has_getaround_connect INTEGER,
+    has_speed_regulator INTEGER,
+    winter_tires INTEGER,
+    predicted_price REAL NOT NULL,
+    confidence TEXT,
+    processing_time_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_fuel_ts ON predictions (fuel, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_model_key_ts ON predictions (model_key, ts);
+CREATE INDEX IF NOT EXISTS idx_predictions_car_type_ts ON predictions (car_type, ts);
+CREATE TABLE IF NOT EXISTS prediction_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prediction_buckets (
+    bucket_start INTEGER NOT NULL,
+    fuel TEXT NOT NULL,
+    model_key TEXT NOT NULL,
+    car_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    price_sum REAL NOT NULL,
+    latency_sketch TEXT NOT NULL,
+    price_sketch TEXT NOT NULL,
+    PRIMARY KEY (bucket_start, fuel, model_key, car_type)
+);
+"""
+
+# Prédictions relues par lot pour construire les buckets d'un journal existant
+BACKFILL_BATCH_SIZE = 50_000
+
+
+class PredictionStore:
+    """
+    Journal SQLite des prédictions (ajout seul, WAL : lectures concurrentes des écritures)
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._drop_outdated_buckets()
+        self._connection.executescript(SCHEMA)
+        self._connection.commit()
+        self._init_total()
+        self._backfill_buckets()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def append_many(self, records):
+        """
+        Ajoute une fenêtre de prédictions en une seule transaction
+        records : dictionnaires {input, prediction, confidence, processing_time, timestamp}
+        """
+        rows = [
+            (
+                record["timestamp"],
+                *(_to_sql(record["input"].get(column)) for column in FEATURE_COLUMNS),
+                record["prediction"],
+                record["confidence"],
+                record["processing_time"],
+            )
+            for record in records
+        ]
+        placeholders = ", ".join(["?"] * (len(FEATURE_COLUMNS) + 4))
+        columns = ", ".join(["ts", *FEATURE_COLUMNS, "predicted_price", "confidence", "processing_time_ms"])
+        buckets = aggregate_buckets(
+            (record["timestamp"], record["input"].get("fuel"), record["input"].get("model_key"),
+             record["input"].get("car_type"), record["prediction"], record["processing_time"])
+            for record in records
+        )
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(f"INSERT INTO predictions ({columns}) VALUES ({placeholders})", rows)
+                self._connection.execute("UPDATE prediction_totals SET count = count + ?", (len(rows),))
+                self._merge_buckets(buckets)
+
+    def _merge_buckets(self, buckets):
+        """
+        Fusionne des agrégats par bucket dans la table (dans la transaction en cours)
+        """
+        for key, (count, price_sum, latency_sketch, price_sketch) in buckets.items():
+            existing = self._connection.execute(
+                "SELECT count, price_sum, latency_sketch, price_sketch FROM prediction_buckets "
+                "WHERE bucket_start = ? AND fuel = ? AND model_key = ? AND car_type = ?",
+                key,
+            ).fetchone()
+            if existing is not None:
+                count += existing[0]
+                price_sum += existing[1]
+                latency_sketch.merge(QuantileSketch.from_dict(json.loads(existing[2])))
+                price_sketch.merge(QuantileSketch.from_dict(json.loads(existing[3])))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO prediction_buckets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, count, price_sum, json.dumps(latency_sketch.to_dict()), json.dumps(price_sketch.to_dict())),
+            )
+
+    def _drop_outdated_buckets(self):
+        """
+        Supprime une table de buckets sans sketch de prix (reconstruite ensuite par _backfill_buckets)
+        """
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(prediction_buckets)")]
+        if columns and "price_sketch" not in columns:
+            with self._connection:
+                self._connection.execute("DROP TABLE prediction_buckets")
+
+    def _init_total(self):
+        """
+        Initialise le compteur total d'un journal créé avant son introduction (un seul COUNT(*))
+        """
+        with self._lock:
+            if self._connection.execute("SELECT 1 FROM prediction_totals").fetchone():
+                return
+            # Verrou d'écriture : aucun autre worker ne peut ajouter de prédictions entre le COUNT et l'INSERT
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO prediction_totals SELECT 1, COUNT(*) FROM predictions"
+                )
+                self._connection.commit()
+            except Exception:
+                self._connection.rollback()
+                raise
+
+    def _backfill_buckets(self):
+        """
+        Construit les buckets d'un journal créé avant leur introduction
+        Les prédictions sont relues par lots de BACKFILL_BATCH_SIZE (ordre des id), en une transaction
+        """
+        with self._lock:
+            if self._connection.execute("SELECT 1 FROM prediction_buckets LIMIT 1").fetchone():
+                return
+            with self._connection:
+                last_id = 0
+                while True:
+                    rows = self._connection.execute(
+                        "SELECT id, ts, fuel, model_key, car_type, predicted_price, processing_time_ms "
+                        "FROM predictions WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, BACKFILL_BATCH_SIZE),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    self._merge_buckets(aggregate_buckets(row[1:] for row in rows))
+
+    def _where(self, since=None, until=None, **segments):
+        """
+        Clause WHERE + paramètres pour une fenêtre de temps et des filtres de segment
+        """
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        for column in SEGMENT_FILTERS:
+            if segments.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(segments[column])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _window_buckets(self, since=None, until=None, **segments):
+        """
+        Buckets d'une minute restreints exactement à [since, until), comme les filtres de query_stats :
+        les minutes entières de la fenêtre sont lues dans prediction_buckets, les minutes partielles
+        des bords (au plus deux) sont ré-agrégées depuis les prédictions (index sur ts)
+        Retourne [(bucket_start, count, price_sum, sketch de latence, sketch de prix)]
+        """
+        first_full = None if since is None else math.ceil(since / BASE_BUCKET_SECONDS) * BASE_BUCKET_SECONDS
+        end_full = None if until is None else math.floor(until / BASE_BUCKET_SECONDS) * BASE_BUCKET_SECONDS
+
+        clauses, params = [], []
+        if first_full is not None:
+            clauses.append("bucket_start >= ?")
+            params.append(first_full)
+        if end_full is not None:
+            clauses.append("bucket_start < ?")
+            params.append(end_full)
+        for column in SEGMENT_FILTERS:
+            if segments.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(segments[column])
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        buckets = [
+            (bucket_start, count, price_sum,
+             QuantileSketch.from_dict(json.loads(latency_sketch)), QuantileSketch.from_dict(json.loads(price_sketch)))
+            for bucket_start, count, price_sum, latency_sketch, price_sketch in self._query(
+                f"SELECT bucket_start, count, price_sum, latency_sketch, price_sketch FROM prediction_buckets{where}",
+                params,
+            )
+        ]
+
+        # ✂️ Minutes partielles : prédictions de la fenêtre avant la première minute entière ou après la dernière
+        edges = [clause for clause, bound in (("ts < ?", first_full), ("ts >= ?", end_full)) if bound is not None]
+        if edges:
+            where, params = self._where(since, until, **segments)
+            rows = self._query(
+                f"SELECT ts, fuel, model_key, car_type, predicted_price, processing_time_ms FROM predictions"
+                f"{where} AND ({' OR '.join(edges)})",
+                params + [bound for bound in (first_full, end_full) if bound is not None],
+            )
+            buckets.extend((key[0], *aggregate) for key, aggregate in aggregate_buckets(rows).items())
+        return buckets
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def query_stats(self, since=None, until=None, **segments):
+        """
+        Agrégats des prédictions d'une fenêtre de temps / d'un segment
+        Même structure que /mlflow-stats ; None si aucune prédiction ne correspond
+        """
+        where, params = self._where(since, until, **segments)
+
+        count, avg_price, min_price, max_price, avg_confidence, high_count, first_ts, last_ts = self._query(
+            f"SELECT COUNT(*), AVG(predicted_price), MIN(predicted_price), MAX(predicted_price), "
+            f"AVG({CONFIDENCE_SCORE_SQL}), SUM(confidence = 'high'), MIN(ts), MAX(ts) FROM predictions{where}",
+            params,
+        )[0]
+        if not count:
+            return None
+
+        # Médiane lue dans les sketches de prix des buckets (à 1 % près), sans trier les prédictions
+        price_sketch = QuantileSketch()
+        for *_, sketch in self._window_buckets(since, until, **segments):
+            price_sketch.merge(sketch)
+        median_price = price_sketch.quantile(0.5)
+        fuel_types = dict(self._query(
+            f"SELECT COALESCE(fuel, 'unknown'), COUNT(*) FROM predictions{where} GROUP BY fuel", params
+        ))
+        brands = dict(self._query(
+            f"SELECT COALESCE(model_key, 'unknown'), COUNT(*) AS n FROM predictions{where} "
+            f"GROUP BY model_key ORDER BY n DESC", params
+        ))
+
+        return {
+            "total_predictions": count,
+            "price_stats": {
+                "avg_price": round(avg_price, 2),
+                "min_price": round(min_price, 2),
+                "max_price": round(max_price, 2),
+                "median_price": _round_or_none(median_price, 2),
+            },
+            "confidence_stats": {
+                "avg_confidence": round(avg_confidence, 2),
+                "high_confidence_ratio": high_count / count,
+            },
+            "fuel_distribution": fuel_types,
+            "brand_distribution": brands,
+            "first_prediction": _isoformat(first_ts),
+            "last_prediction": _isoformat(last_ts),
+        }
+
+    def query_series(self, since=None, until=None, bucket="5m", **segments):
+        """
+        Série temporelle (nombre, prix moyen, percentiles de latence) par bucket
+        Calculée à partir des buckets d'une minute, sur la même fenêtre exacte [since, until) que
+        query_stats : la somme des count est égale à total_predictions
+        """
+        bucket_seconds = BUCKET_SIZES[bucket]
+
+        series = {}
+        for bucket_start, count, price_sum, latency_sketch, _ in self._window_buckets(since, until, **segments):
+            start = bucket_start // bucket_seconds * bucket_seconds
+            point = series.get(start)
+            if point is None:
+                point = series[start] = [0, 0.0, QuantileSketch()]
+            point[0] += count
+            point[1] += price_sum
+            point[2].merge(latency_sketch)
+
+        return [
+            {
+                "bucket_start": _isoformat(start),
+                "count": count,
+                "avg_price": round(price_sum / count, 2),
+                **{
+                    f"latency_p{int(q * 100)}_ms": _round_or_none(sketch.quantile(q))
+                    for q in LATENCY_QUANTILES
+                },
+            }
+            for start, (count, price_sum, sketch) in sorted(series.items())
+        ]
+
+    def count(self):
+        """
+        Nombre total de prédictions stockées (compteur mis à jour à chaque écriture)
+        """
+        return self._query("SELECT count FROM prediction_totals", [])[0][0]
+
+
+def aggregate_buckets(rows):
+    """
+    Agrège des prédictions (ts, fuel, model_key, car_type, prix, latence ms) par bucket d'une minute
+    Retourne {(bucket_start, fuel, model_key, car_type): [count, price_sum, sketch de latence, sketch de prix]}
+    """
+    buckets = {}
+    for ts, fuel, model_key, car_type, price, latency in rows:
+        key = (int(ts // BASE_BUCKET_SECONDS) * BASE_BUCKET_SECONDS,
+               fuel or "unknown", model_key or "unknown", car_type or "unknown")
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0, 0.0, QuantileSketch(), QuantileSketch()]
+        bucket[0] += 1
+        bucket[1] += price
+        if latency is not None:
+            bucket[2].add(latency)
+        bucket[3].add(price)
+    return buckets
+
+
+def _round_or_none(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+
+def _to_sql(value):
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat()
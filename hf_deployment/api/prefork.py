@@ -0,0 +1,117 @@
+# prefork.py - Mode multi-workers pre-fork
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Le processus maître importe app.py, charge le modèle une seule fois et ouvre
+# la socket d'écoute, puis fork N workers uvicorn qui partagent cette socket.
+# Les tableaux du modèle restent partagés en copy-on-write entre les workers
+# (gc.freeze évite que le ramasse-miettes ne touche les pages héritées).
+# Un worker qui s'arrête de façon inattendue est relancé (son instantané de
+# statistiques est supprimé, et il ne relogue pas le démarrage dans MLflow).
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from worker_stats import remove_worker_snapshot
+
+
+def create_listening_socket(host, port, backlog=2048):
+    """
+    Socket TCP partagée par tous les workers (héritée au fork)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock, worker_id, log_level, restarted=False):
+    """
+    Corps d'un worker : un serveur uvicorn sur la socket héritée
+    """
+    import uvicorn
+
+    os.environ["GETAROUND_WORKER_ID"] = str(worker_id)
+    if restarted:
+        os.environ["GETAROUND_WORKER_RESTARTED"] = "1"
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    config = uvicorn.Config(app_module.app, log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app_module, sock, worker_id, log_level, restarted=False):
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            run_worker(app_module, sock, worker_id, log_level, restarted)
+        except Exception as e:
+            print(f"❌ Worker {worker_id} arrêté sur erreur : {e}")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    print(f"👷 Worker {worker_id} démarré (pid {pid})")
+    return pid
+
+
+def serve_prefork(app_module, host="0.0.0.0", port=7860, workers=2, log_level="info"):
+    """
+    Précharge le modèle dans le maître, fork les workers et les supervise
+    app_module doit exposer app et preload_for_workers()
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Mode pre-fork indisponible sur cette plateforme (os.fork absent)")
+
+    print(f"🚀 Mode pre-fork : {workers} workers sur {host}:{port}")
+    app_module.preload_for_workers()
+    sock = create_listening_socket(host, port)
+
+    # Objets déjà chargés exclus du ramasse-miettes : pages mémoire partagées intactes
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn_worker(app_module, sock, worker_id, log_level): worker_id for worker_id in range(workers)}
+    stopping = False
+
+    def handle_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        worker_id = children.pop(pid, None)
+        if worker_id is None:
+            continue
+        if not stopping:
+            print(f"⚠️ Worker {worker_id} (pid {pid}) arrêté (statut {status}), relance...")
+            stats_dir = os.getenv("GETAROUND_STATS_DIR")
+            if stats_dir:
+                remove_worker_snapshot(stats_dir, pid)
+            time.sleep(1)
+            children[spawn_worker(app_module, sock, worker_id, log_level, restarted=True)] = worker_id
+
+    sock.close()
+    print("🛑 Arrêt des workers terminé")
+    sys.exit(0)
@@ -0,0 +1,209 @@
+# price_index.py - Compilation exacte du modèle XGBoost en table de prix
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Chaque arbre est constant par morceaux entre ses seuils de split. Pour une
+# combinaison fixée des features catégorielles/booléennes, le prix ne dépend
+# donc que de l'intervalle où tombent mileage et engine_power parmi les seuils
+# du booster. On construit (à la demande) une grille 2-D par combinaison :
+# une prédiction devient deux searchsorted et une lecture de tableau, avec
+# exactement la même sortie que le booster.
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Features numériques continues indexées par la grille
+GRID_FEATURES = ('mileage', 'engine_power')
+
+
+def extract_split_thresholds(booster, feature_index):
+    """
+    Seuils de split (float32, triés, uniques) utilisés par le booster pour une feature
+    """
+    model = json.loads(booster.save_raw('json'))
+    thresholds = []
+    for tree in model['learner']['gradient_booster']['model']['trees']:
+        for split_index, condition, left in zip(tree['split_indices'], tree['split_conditions'], tree['left_children']):
+            if left != -1 and split_index == feature_index:
+                thresholds.append(condition)
+    return np.unique(np.asarray(thresholds, dtype=np.float32))
+
+
+def interval_representatives(thresholds):
+    """
+    Une valeur par intervalle [t(i-1), t(i)) : XGBoost va à gauche si x < seuil
+    L'intervalle i correspond à searchsorted(thresholds, x, side='right') == i
+    """
+    below = np.nextafter(thresholds[:1], np.float32(-np.inf)) if len(thresholds) else np.zeros(1, np.float32)
+    return np.concatenate([below, thresholds]).astype(np.float32)
+
+
+class PriceLookupIndex:
+    """
+    Index de prix compilé au-dessus d'un FastPredictor
+    Les grilles sont construites à la première utilisation d'une combinaison et gardées en LRU
+    """
+
+    def __init__(self, predictor, max_combinations=512):
+        self.predictor = predictor
+        self.encoder = predictor.encoder
+        self.max_combinations = max_combinations
+
+        self.grid_columns = [self.encoder.numeric_features.index(f) for f in GRID_FEATURES]
+        self.combo_columns = [c for c in range(self.encoder.n_features) if c not in self.grid_columns]
+
+        # Forêt NumPy : seuils lus dans ses tableaux ; FastPredictor : dans le booster XGBoost
+        if hasattr(predictor, 'split_thresholds'):
+            self.thresholds = [predictor.split_thresholds(c) for c in self.grid_columns]
+        else:
+            self.thresholds = [extract_split_thresholds(predictor.booster, c) for c in self.grid_columns]
+        self.representatives = [interval_representatives(t) for t in self.thresholds]
+        self.grid_shape = tuple(len(r) for r in self.representatives)
+
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 📊 Compteurs exposés dans /health
+        self.compiled = 0
+        self.evictions = 0
+        self.lookups = 0
+
+    def _compile_grid(self, combo):
+        """
+        Évalue le booster sur un représentant de chaque cellule de la grille
+        """
+        n_first, n_second = self.grid_shape
+        encoded = np.empty((n_first * n_second, self.encoder.n_features), dtype=np.float32)
+        encoded[:, self.combo_columns] = combo
+        encoded[:, self.grid_columns[0]] = np.repeat(self.representatives[0], n_second)
+        encoded[:, self.grid_columns[1]] = np.tile(self.representatives[1], n_first)
+        return np.asarray(self.predictor.predict_encoded(encoded), dtype=np.float32).reshape(self.grid_shape)
+
+    def _grid(self, combo):
+        """
+        Grille de prix d'une combinaison (compilée au premier usage, LRU bornée)
+        """
+        key = combo.tobytes()
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self._grids.move_to_end(key)
+                return grid
+
+        grid = self._compile_grid(combo)
+
+        with self._lock:
+            self._grids[key] = grid
+            self.compiled += 1
+            while len(self._grids) > self.max_combinations:
+                self._grids.popitem(last=False)
+                self.evictions += 1
+        return grid
+
+    def predict_encoded(self, encoded):
+        """
+        Prédiction par lecture de grille pour une matrice déjà encodée
+        """
+        first = np.searchsorted(self.thresholds[0], encoded[:, self.grid_columns[0]], side='right')
+        second = np.searchsorted(self.thresholds[1], encoded[:, self.grid_columns[1]], side='right')
+        combos = np.ascontiguousarray(encoded[:, self.combo_columns])
+        self.lookups += len(encoded)
+
+        if len(encoded) == 1:
+            return self._grid(combos[0])[first, second]
+
+        prices = np.empty(len(encoded), dtype=np.float32)
+        unique_combos, inverse = np.unique(combos, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        # Lignes regroupées par combinaison : une grille par groupe
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(unique_combos)))])
+        for position, combo in enumerate(unique_combos):
+            rows = order[bounds[position]:bounds[position + 1]]
+            prices[rows] = self._grid(combo)[first[rows], second[rows]]
+        return prices
+
+    def predict_records(self, records):
+        """
+        Prédiction pour une liste de dictionnaires CarFeatures
+        """
+        return self.predict_encoded(self.encoder.encode_records(records))
+
+    def predict_columns(self, columns, n_rows=None):
+        """
+        Prédiction pour des données colonnaires {feature: valeurs}
+        """
+        return self.predict_encoded(self.encoder.encode_columns(columns, n_rows=n_rows))
+
+    def stats(self):
+        """
+        État de l'index pour le monitoring
+        """
+        return {
+            "grid_shape": list(self.grid_shape),
+            "cached_combinations": len(self._grids),
+            "max_combinations": self.max_combinations,
+            "compiled": self.compiled,
+            "evictions": self.evictions,
+            "lookups": self.lookups,
+            "memory_mb": round(len(self._grids) * self.grid_shape[0] * self.grid_shape[1] * 4 / 1e6, 2),
+        }
+
+
+# 🧪 Vérification d'exactitude contre le booster
+def check_exactness(index, csv_path, n_perturbations=5, seed=42):
+    """
+    Compare l'index et le booster sur le dataset de pricing, plus des variantes
+    aléatoires de mileage / engine_power (dont des valeurs exactement sur les seuils)
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    columns = {feature: df[feature].to_numpy() for feature in index.encoder.numeric_features + index.encoder.categorical_features}
+    encoded = index.encoder.encode_columns(columns, n_rows=len(df))
+
+    rng = np.random.default_rng(seed)
+    samples = [encoded]
+    for _ in range(n_perturbations):
+        variant = encoded.copy()
+        for column, thresholds in zip(index.grid_columns, index.thresholds):
+            on_threshold = rng.random(len(variant)) < 0.3
+            variant[:, column] = rng.normal(0, 1.5, len(variant)).astype(np.float32)
+            variant[on_threshold, column] = rng.choice(thresholds, on_threshold.sum())
+        samples.append(variant)
+    sample = np.vstack(samples)
+
+    expected = np.asarray(index.predictor.predict_encoded(sample), dtype=np.float32)
+    actual = index.predict_encoded(sample)
+    return {
+        "rows": int(len(sample)),
+        "n_mismatch": int((expected != actual).sum()),
+        "identical": bool((expected == actual).all()),
+        "compiled_combinations": index.compiled,
+    }
+
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+    from pathlib import Path
+
+    from fast_encoder import FastPredictor
+
+    model_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("trained_model.pkl")
+    csv_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("../../data/get_around_pricing_project.csv")
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+
+    index = PriceLookupIndex(FastPredictor.from_pipeline(model), max_combinations=100000)
+    print(f"🗺️ Grille {index.grid_shape[0]} x {index.grid_shape[1]} (mileage x engine_power)")
+    result = check_exactness(index, csv_path)
+    print(f"🧪 Exactitude PriceLookupIndex vs booster : {result}")
+    if not result["identical"]:
+        print("❌ Écart détecté entre l'index compilé et le booster")
+        sys.exit(1)
+    print("✅ Prédictions identiques")
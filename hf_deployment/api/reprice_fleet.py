@@ -0,0 +1,204 @@
+# reprice_fleet.py - Repricing hors ligne de toute la flotte (job batch, sans l'API HTTP)
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Lit un gros fichier de véhicules (CSV ou Parquet) par morceaux, applique le
+# même nettoyage que train_model.py (kilométrages négatifs, booléens en 1/0),
+# fait scorer les morceaux par un pool de processus (un modèle chargé par
+# processus, tous les cœurs par défaut) et écrit un Parquet avec le prix prédit
+# et la confiance. Au plus 2 morceaux par processus sont en vol : la mémoire
+# reste bornée et l'ordre des lignes est conservé.
+# Avec --index, seules les annonces nouvelles, modifiées ou pricées par une
+# autre version du modèle sont rescorées (voir fingerprint_index.py).
+#
+# Usage : python reprice_fleet.py flotte.csv flotte_repricee.parquet [--chunk-size N] [--workers N]
+#                                 [--index empreintes.sqlite] [--key colonne_identifiant]
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fast_encoder import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from fingerprint_index import FingerprintIndex, row_fingerprints
+from model_loader import apply_price_rules, build_fast_predictor, compute_model_version, load_local_model
+
+API_DIR = Path(__file__).resolve().parent
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Identifiant d'annonce par défaut : colonne d'index de get_around_pricing_project.csv
+DEFAULT_KEY_COLUMN = "Unnamed: 0"
+
+# Colonnes booléennes converties comme dans train_model.py
+BOOL_COLUMNS = ['private_parking_available', 'has_gps', 'has_air_conditioning',
+                'automatic_car', 'has_getaround_connect', 'has_speed_regulator',
+                'winter_tires']
+
+# Modèle du processus de scoring (chargé une fois par processus par init_worker)
+_worker_model = None
+_worker_predictor = None
+
+
+def clean_chunk(df):
+    """
+    Nettoyage identique à train_model.py :
+    kilométrage négatif -> 0, booléens 'True'/'False' -> 1/0 (autre valeur -> NaN, imputé par le modèle)
+    """
+    features = df[NUMERIC_FEATURES + CATEGORICAL_FEATURES].copy()
+    features.loc[features['mileage'] < 0, 'mileage'] = 0
+    for col in BOOL_COLUMNS:
+        features[col] = features[col].astype(str).map({'True': 1, 'False': 0})
+    return features
+
+
+def load_serving_model():
+    """
+    Modèle de service (forêt NumPy à jour, sinon pickle) chargé depuis le dossier de l'API
+    """
+    model, source, metadata = load_local_model(directory=API_DIR)
+    if model is None:
+        raise RuntimeError("Aucun modèle disponible (trained_model_arrays.npz / trained_model.pkl)")
+    return model, source, compute_model_version(source, metadata, directory=API_DIR)
+
+
+def init_worker():
+    """
+    Initialisation d'un processus de scoring : modèle et encodeur rapide chargés une fois
+    """
+    global _worker_model, _worker_predictor
+    _worker_model, _, _ = load_serving_model()
+    _worker_predictor = build_fast_predictor(_worker_model)
+
+
+def score_chunk(features):
+    """
+    Prix bruts d'un morceau nettoyé (exécuté dans un processus du pool)
+    """
+    if _worker_predictor is not None:
+        columns = {feature: features[feature].to_numpy() for feature in features.columns}
+        return np.asarray(_worker_predictor.predict_columns(columns, n_rows=len(features)), dtype=np.float64)
+    return np.asarray(_worker_model.predict(features), dtype=np.float64)
+
+
+def iter_chunks(path, chunk_size):
+    """
+    Morceaux (DataFrame) d'un fichier CSV ou Parquet, sans le charger en entier
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def reprice_fleet(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+                  index_path=None, key_column=DEFAULT_KEY_COLUMN):
+    """
+    Reprice tout le fichier d'entrée et écrit le Parquet de sortie
+    Colonnes ajoutées : predicted_price, model_confidence, model_version
+    index_path : index des empreintes ; seules les lignes modifiées ou d'une ancienne version sont rescorées
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow est requis pour écrire la sortie Parquet (pip install pyarrow)")
+
+    workers = workers or os.cpu_count() or 1
+    _, source, model_version = load_serving_model()
+    print(f"🏷️ Modèle : {source} (version {model_version})")
+    print(f"🚀 Repricing de {input_path} : morceaux de {chunk_size} lignes, {workers} processus")
+
+    index = FingerprintIndex(index_path) if index_path else None
+    start_time = time.time()
+    rows = 0
+    rescored = 0
+    writer = None
+    pending = deque()
+
+    def submit_chunk(pool, chunk):
+        """
+        Nettoie un morceau et envoie au pool les lignes à rescorer
+        """
+        features = clean_chunk(chunk)
+        if index is None:
+            return {"future": pool.submit(score_chunk, features)}
+
+        listing_ids = chunk[key_column].to_numpy()
+        fingerprints = row_fingerprints(features)
+        stale, raw_prices = index.stale_rows(listing_ids, fingerprints, model_version)
+        future = pool.submit(score_chunk, features[stale]) if stale.any() else None
+        return {"future": future, "stale": stale, "raw_prices": raw_prices,
+                "listing_ids": listing_ids, "fingerprints": fingerprints}
+
+    def chunk_raw_prices(job):
+        """
+        Prix bruts du morceau : prix rescorés + prix en cache, index mis à jour
+        """
+        nonlocal rescored
+        if index is None:
+            rescored += len(job["future"].result())
+            return job["future"].result()
+
+        raw_prices, stale = job["raw_prices"], job["stale"]
+        if job["future"] is not None:
+            raw_prices[stale] = job["future"].result()
+            index.upsert(job["listing_ids"][stale], job["fingerprints"][stale], model_version, raw_prices[stale])
+            rescored += int(stale.sum())
+        return raw_prices
+
+    def write_result(chunk, job):
+        nonlocal writer, rows
+        prices, confidences = apply_price_rules(chunk_raw_prices(job))
+        output = chunk.assign(predicted_price=prices, model_confidence=confidences, model_version=model_version)
+        if writer is None:
+            table = pa.Table.from_pandas(output, preserve_index=False)
+            writer = pq.ParquetWriter(output_path, table.schema)
+        else:
+            # Types du premier morceau imposés (ex. colonne entière lue en float à cause d'un NaN)
+            table = pa.Table.from_pandas(output, schema=writer.schema, preserve_index=False)
+        writer.write_table(table)
+        rows += len(output)
+        print(f"📦 {rows} véhicules repricés ({rows / (time.time() - start_time):.0f} /s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            for chunk in iter_chunks(input_path, chunk_size):
+                pending.append((chunk, submit_chunk(pool, chunk)))
+                # Au plus 2 morceaux en vol par processus, écrits dans l'ordre de lecture
+                while len(pending) >= 2 * workers:
+                    write_result(*pending.popleft())
+            while pending:
+                write_result(*pending.popleft())
+    finally:
+        if writer is not None:
+            writer.close()
+        if index is not None:
+            index.close()
+
+    elapsed = time.time() - start_time
+    print(f"✅ {rows} véhicules repricés en {elapsed:.1f}s -> {output_path} ({rescored} rescorés, {rows - rescored} prix réutilisés)")
+    return {"rows": rows, "rescored": rescored, "reused": rows - rescored, "seconds": round(elapsed, 2),
+            "workers": workers, "model_version": model_version}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repricing hors ligne de la flotte (CSV / Parquet -> Parquet)")
+    parser.add_argument("input", type=Path, help="Fichier de la flotte (CSV ou Parquet)")
+    parser.add_argument("output", type=Path, help="Parquet de sortie")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Lignes par morceau")
+    parser.add_argument("--workers", type=int, default=None, help="Processus de scoring (défaut : tous les cœurs)")
+    parser.add_argument("--index", type=Path, default=None, help="Index des empreintes (repricing incrémental)")
+    parser.add_argument("--key", default=DEFAULT_KEY_COLUMN, help="Colonne identifiant l'annonce (avec --index)")
+    args = parser.parse_args()
+
+    reprice_fleet(
+        args.input.resolve(), args.output.resolve(), args.chunk_size, args.workers,
+        index_path=args.index.resolve() if args.index else None, key_column=args.key
+    )
@@ -0,0 +1,183 @@
+# shadow_scoring.py - Scoring fantôme des modèles challengers
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Les véhicules prédits par le modèle principal sont déposés dans une file
+# bornée ; un thread les regroupe en lots et les fait prédire par chaque
+# challenger (et par le modèle principal, pour des latences comparables).
+# Seuls des agrégats sont conservés : latence par véhicule, biais, MAE, RMSE,
+# quantiles de l'écart absolu et taux d'accord avec le modèle principal.
+# Aucune latence n'est ajoutée à /predict.
+
+import math
+import queue
+import threading
+import time
+
+import numpy as np
+
+from monitoring import QuantileSketch
+
+# Un challenger est "d'accord" si son prix est à moins de 5% du modèle principal
+AGREEMENT_TOLERANCE = 0.05
+
+PRIMARY_NAME = "primary"
+
+
+class ModelComparison:
+    """
+    Agrégats d'un modèle sur le trafic fantôme (latence + écart au modèle principal)
+    """
+
+    def __init__(self):
+        self.latency = QuantileSketch()
+        self.abs_diff = QuantileSketch(relative_accuracy=0.005)
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.diff_sum = 0.0
+        self.squared_diff_sum = 0.0
+        self.agreements = 0
+
+    def add_batch(self, prices, reference, seconds):
+        """
+        Ajoute un lot scoré : prix du modèle, prix du modèle principal, durée du lot
+        """
+        n_rows = len(prices)
+        diff = np.asarray(prices, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+        self.latency.add(seconds / n_rows, count=n_rows)
+        for value in np.abs(diff).tolist():
+            self.abs_diff.add(value)
+
+        self.rows += n_rows
+        self.batches += 1
+        self.diff_sum += float(diff.sum())
+        self.squared_diff_sum += float((diff ** 2).sum())
+        tolerance = AGREEMENT_TOLERANCE * np.maximum(np.abs(reference), 1.0)
+        self.agreements += int((np.abs(diff) <= tolerance).sum())
+
+    def snapshot(self):
+        if not self.rows:
+            return {"rows": 0, "batches": self.batches, "errors": self.errors}
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "latency_per_car_ms": {
+                "avg": round(self.latency.sum / self.latency.count * 1000, 4),
+                "p50": round(self.latency.quantile(0.5) * 1000, 4),
+                "p90": round(self.latency.quantile(0.9) * 1000, 4),
+                "p99": round(self.latency.quantile(0.99) * 1000, 4),
+            },
+            "vs_primary": {
+                "mean_diff": round(self.diff_sum / self.rows, 4),
+                "mae": round(self.abs_diff.sum / self.rows, 4),
+                "rmse": round(math.sqrt(self.squared_diff_sum / self.rows), 4),
+                "p90_abs_diff": round(self.abs_diff.quantile(0.9), 4),
+                "max_abs_diff": round(self.abs_diff.max, 4),
+                "agreement_ratio": round(self.agreements / self.rows, 4),
+            },
+        }
+
+
+class ShadowScorer:
+    """
+    File bornée + thread de scoring des challengers
+    challengers : {nom: fonction(records) -> prix bruts}
+    primary_fn : même signature pour le modèle principal (latences mesurées dans les mêmes conditions)
+    """
+
+    def __init__(self, challengers, primary_fn=None, max_queue_size=10000, batch_size=256, flush_interval=1.0):
+        self.challengers = dict(challengers)
+        self.primary_fn = primary_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.comparisons = {name: ModelComparison() for name in [PRIMARY_NAME, *self.challengers]}
+
+        # 📊 Compteurs exposés dans /shadow-stats
+        self.enqueued = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+        print(f"🕶️ Scoring fantôme actif : {', '.join(self.challengers)}")
+
+    def stop(self, timeout=10.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, records, primary_prices):
+        """
+        Dépose des véhicules déjà prédits par le modèle principal (non bloquant)
+        Si la file est pleine, les véhicules sont ignorés : le trafic client est prioritaire
+        """
+        for record, price in zip(records, primary_prices):
+            try:
+                self._queue.put_nowait((record, float(price)))
+                self.enqueued += 1
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._score(batch)
+
+    def _score(self, batch):
+        """
+        Prédit un lot avec chaque modèle et met à jour ses agrégats
+        """
+        records = [record for record, _ in batch]
+        reference = np.asarray([price for _, price in batch], dtype=np.float64)
+
+        models = dict(self.challengers)
+        if self.primary_fn is not None:
+            models[PRIMARY_NAME] = self.primary_fn
+
+        for name, predict_fn in models.items():
+            start = time.perf_counter()
+            try:
+                prices = predict_fn(records)
+            except Exception as e:
+                with self._lock:
+                    self.comparisons[name].errors += 1
+                print(f"⚠️ Erreur du challenger {name} (non critique) : {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.comparisons[name].add_batch(prices, reference, elapsed)
+
+    def stats(self):
+        """
+        Comparaison agrégée des modèles sur le trafic fantôme
+        """
+        with self._lock:
+            models = {name: comparison.snapshot() for name, comparison in self.comparisons.items()}
+        return {
+            "running": self._thread is not None,
+            "challengers": list(self.challengers),
+            "queue_size": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "models": models,
+        }
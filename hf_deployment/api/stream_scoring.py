@@ -0,0 +1,183 @@
+# stream_scoring.py - Lecture et écriture en flux pour le scoring de gros fichiers
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Le corps de la requête (NDJSON ou CSV aux colonnes de
+# data/get_around_pricing_project.csv) est lu morceau par morceau : seules les
+# lignes complètes sont décodées, le reste attend le morceau suivant (une ligne
+# trop longue ou mal encodée devient une erreur de ligne). app.py
+# regroupe les véhicules en lots de taille fixe, les prédit et renvoie chaque
+# lot dès qu'il est prêt : la mémoire reste bornée par la taille d'un lot,
+# quelle que soit la taille de l'envoi.
+
+import csv
+import io
+import json
+from collections import deque
+
+from fastapi.responses import StreamingResponse
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_OUTPUT_COLUMNS = ["row", "rental_price", "model_confidence", "error"]
+DEFAULT_MAX_LINE_BYTES = 1024 * 1024
+BOM = "\ufeff".encode("utf-8")
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse dont le générateur lit lui-même le corps de la requête
+    Pas de tâche d'écoute des déconnexions en parallèle : elle consommerait les morceaux
+    du corps. Une déconnexion du client interrompt la lecture (ClientDisconnect), donc le flux
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def detect_format(content_type):
+    """
+    Format d'entrée déduit du Content-Type (NDJSON par défaut)
+    """
+    if content_type and "csv" in content_type.lower():
+        return "csv"
+    return "ndjson"
+
+
+def decode_line(raw, max_line_bytes):
+    """
+    Ligne brute -> (texte, erreur) : une ligne trop longue ou mal encodée devient une erreur de ligne
+    """
+    if len(raw) > max_line_bytes:
+        return None, f"ligne de plus de {max_line_bytes} octets"
+    try:
+        return raw.decode("utf-8").rstrip("\r"), None
+    except UnicodeDecodeError as e:
+        return None, f"UTF-8 invalide : {e.reason} (octet {e.start})"
+
+
+async def iter_lines(chunks, max_line_bytes=DEFAULT_MAX_LINE_BYTES):
+    """
+    Lignes complètes d'un flux de morceaux d'octets : (texte, erreur), sans lire tout le corps
+    Une ligne de plus de max_line_bytes octets donne une erreur dès le dépassement,
+    sans être accumulée : la suite est ignorée jusqu'au prochain saut de ligne
+    """
+    pending = []
+    pending_size = 0
+    skipping = False
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        *ends, rest = chunk.split(b"\n")
+        for end in ends:
+            if skipping:
+                skipping = False
+            else:
+                raw = b"".join(pending) + end
+                yield decode_line(raw.removeprefix(BOM) if first else raw, max_line_bytes)
+            pending, pending_size, first = [], 0, False
+        if rest and not skipping:
+            pending.append(rest)
+            pending_size += len(rest)
+            if pending_size > max_line_bytes:
+                yield None, f"ligne de plus de {max_line_bytes} octets"
+                pending, pending_size, skipping, first = [], 0, True, False
+    if pending:
+        raw = b"".join(pending)
+        yield decode_line(raw.removeprefix(BOM) if first else raw, max_line_bytes)
+
+
+class LineFeed:
+    """
+    Itérateur de lignes alimenté au fil du flux : un seul csv.reader le lit d'un bout à l'autre
+    Vide, il arrête l'itération sans se terminer ; il reprend dès que des lignes sont ajoutées
+    """
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_rows(chunks, input_format, max_line_bytes=DEFAULT_MAX_LINE_BYTES):
+    """
+    Lignes de données du flux : (numéro de ligne, champs, erreur)
+    Numérotation à partir de 0, hors en-tête CSV et lignes vides
+    Une ligne illisible donne champs=None et un message d'erreur, sans arrêter le flux
+    En CSV, un champ entre guillemets peut contenir des sauts de ligne : les lignes physiques
+    sont accumulées jusqu'à fermeture des guillemets (max_line_bytes au total), puis lues
+    par le csv.reader unique du flux
+    """
+    header = None
+    row_number = 0
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    record, record_size, quotes = [], 0, 0
+
+    async for line, error in iter_lines(chunks, max_line_bytes):
+        if error is None and not record and not line.strip():
+            continue
+
+        if error is None and input_format == "csv":
+            record.append(line + "\n")
+            record_size += len(line.encode("utf-8")) + 1
+            quotes += line.count('"')
+            # Nombre impair de guillemets : champ entre guillemets encore ouvert
+            if quotes % 2:
+                if record_size <= max_line_bytes:
+                    continue
+                error = f"enregistrement CSV de plus de {max_line_bytes} octets"
+            else:
+                feed.lines.extend(record)
+                try:
+                    values = next(reader)
+                except csv.Error as e:
+                    error = f"CSV invalide : {e}"
+            record, record_size, quotes = [], 0, 0
+
+        if error is not None:
+            # Enregistrement CSV en cours abandonné avec la ligne illisible
+            record, record_size, quotes = [], 0, 0
+            fields = None
+        elif input_format == "csv":
+            if header is None:
+                header = values
+                continue
+            if len(values) != len(header):
+                fields, error = None, f"{len(values)} colonnes au lieu de {len(header)}"
+            else:
+                fields, error = dict(zip(header, values)), None
+        else:
+            try:
+                fields, error = json.loads(line), None
+                if not isinstance(fields, dict):
+                    fields, error = None, "objet JSON attendu"
+            except ValueError as e:
+                fields, error = None, f"JSON invalide : {e}"
+
+        yield row_number, fields, error
+        row_number += 1
+
+    if record:
+        yield row_number, None, "guillemet CSV non fermé en fin de flux"
+
+
+def format_results(results, output_format, header=False):
+    """
+    Sérialise un lot de résultats ({row, rental_price, model_confidence} ou {row, error})
+    """
+    if output_format == "csv":
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=CSV_OUTPUT_COLUMNS, lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows(results)
+        return output.getvalue()
+    return "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
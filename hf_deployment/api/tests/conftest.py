@@ -0,0 +1,97 @@
+# conftest.py - Fixtures partagées des tests de parité (dataset de pricing, Pipeline entraîné)
+# Les tests se lancent depuis la racine du dépôt ou depuis hf_deployment/api : python -m pytest
+
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parents[1]
+REPO_DIR = API_DIR.parents[1]
+sys.path.insert(0, str(API_DIR))
+
+# Configuration de l'API lue à l'import de app.py : posée avant la collecte des tests
+API_TEST_ENV = {
+    "GETAROUND_MLFLOW": "0",
+    "GETAROUND_MODEL_WATCH_INTERVAL": "0",
+    "GETAROUND_WARMUP": "0",
+    "GETAROUND_PREDICTION_STORE": str(Path(tempfile.mkdtemp(prefix="getaround_tests_")) / "predictions.sqlite"),
+}
+for name, value in API_TEST_ENV.items():
+    os.environ.setdefault(name, value)
+
+PRICING_CSV_CANDIDATES = [
+    REPO_DIR / "data" / "get_around_pricing_project.csv",
+    REPO_DIR / "hf_deployment" / "get_around_pricing_project.csv",
+]
+
+
+@pytest.fixture(scope="session")
+def pricing_csv():
+    """
+    Dataset de pricing complet (data/get_around_pricing_project.csv)
+    """
+    for candidate in PRICING_CSV_CANDIDATES:
+        if candidate.exists():
+            return candidate
+    pytest.skip("get_around_pricing_project.csv introuvable")
+
+
+@pytest.fixture(scope="session")
+def pricing_features(pricing_csv):
+    """
+    Features du dataset, comme les reçoit Pipeline.predict
+    """
+    pd = pytest.importorskip("pandas")
+    df = pd.read_csv(pricing_csv)
+    return df.drop(columns=[c for c in ["rental_price_per_day", "Unnamed: 0"] if c in df.columns])
+
+
+@pytest.fixture(scope="session")
+def pickle_path():
+    return API_DIR / "trained_model.pkl"
+
+
+@pytest.fixture(scope="session")
+def pipeline(pickle_path):
+    """
+    Pipeline entraîné (preprocessor + XGBRegressor) de trained_model.pkl
+    """
+    pytest.importorskip("sklearn")
+    pytest.importorskip("xgboost")
+    with open(pickle_path, "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope="session")
+def pricing_sample_csv(pricing_csv, tmp_path_factory):
+    """
+    200 premières annonces du dataset (l'index compile une grille par combinaison rencontrée)
+    """
+    pd = pytest.importorskip("pandas")
+    path = tmp_path_factory.mktemp("pricing") / "get_around_pricing_sample.csv"
+    pd.read_csv(pricing_csv).head(200).to_csv(path, index=False)
+    return path
+
+
+
+@pytest.fixture(scope="session")
+def api_client():
+    """
+    TestClient de l'API lancé depuis hf_deployment/api (sans MLflow, watcher ni warm-up, voir API_TEST_ENV)
+    """
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    previous_dir = os.getcwd()
+    os.chdir(API_DIR)
+    try:
+        from fastapi.testclient import TestClient
+
+        import app
+        with TestClient(app.app) as client:
+            yield client
+    finally:
+        os.chdir(previous_dir)
@@ -0,0 +1,72 @@
+# test_columnar_validation.py - Validation colonnaire : mêmes décisions que Pydantic, ligne par ligne
+
+import numpy as np
+import pytest
+
+from columnar_validation import ColumnarValidator
+
+app = pytest.importorskip("app")
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return ColumnarValidator(app.CarFeatures)
+
+
+def make_columns(n_rows, **overrides):
+    columns = {field: [value] * n_rows for field, value in app.EXAMPLE_CAR.items()}
+    columns.update(overrides)
+    return columns
+
+
+def accepted_by_pydantic(**fields):
+    try:
+        app.CarFeatures(**dict(app.EXAMPLE_CAR, **fields))
+        return True
+    except Exception:
+        return False
+
+
+@pytest.mark.parametrize("value", [5000, 5000.0, 5000.5, "5000", " 5_000 ", "5000.0", "5000.", "1e3", "abc",
+                                   None, True, -1, 600000, float("nan"), 10 ** 400, [1], "٥"])
+def test_integer_decision_does_not_depend_on_other_rows(validator, value):
+    expected = accepted_by_pydantic(mileage=value)
+    for others in ([12000, 13000], ["12000", None], [value, value]):
+        valid, _, _ = validator.validate(make_columns(3, mileage=[value, *others]))
+        assert valid[0] == expected
+
+
+def test_flags_must_be_json_booleans(validator):
+    valid, errors, _ = validator.validate(make_columns(4, has_gps=[True, 1, "true", False]))
+
+    assert valid.tolist() == [True, False, False, True]
+    assert [(error["row"], error["field"]) for error in errors] == [(1, "has_gps"), (2, "has_gps")]
+
+
+@pytest.mark.parametrize("column", [[[False], [True]], [[True], [True, False]], [{"a": 1}, [True]]])
+def test_nested_flag_column_gives_row_errors(validator, column):
+    valid, errors, values = validator.validate(make_columns(2, winter_tires=column))
+
+    assert not valid.any()
+    assert {error["row"] for error in errors} == {0, 1}
+    assert values["winter_tires"].shape == (2,)
+
+
+def test_structure_errors_raise_value_error(validator):
+    columns = make_columns(2)
+    del columns["fuel"]
+    with pytest.raises(ValueError):
+        validator.validate(columns)
+    with pytest.raises(ValueError):
+        validator.validate(make_columns(2, mileage=[1]))
+
+
+def test_malformed_column_is_a_row_error_not_a_500(api_client):
+    response = api_client.post("/predict/columnar", json=make_columns(3, winter_tires=[[False], [True], False]))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["valid_count"] == 1
+    assert body["rental_price"][:2] == [None, None] and body["rental_price"][2] is not None
+    assert [error["row"] for error in body["errors"]] == [0, 1]
+    assert np.isfinite(body["rental_price"][2])
@@ -0,0 +1,35 @@
+# test_comparables.py - Index des comparables : construit au premier appel, mêmes voisins que la recherche exhaustive
+
+import numpy as np
+import pytest
+
+from comparables import BruteForceNeighbors, build_tree
+
+
+def test_brute_force_matches_exhaustive_distances():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(300, 5))
+    queries = rng.normal(size=(4, 5))
+
+    distances, neighbours = BruteForceNeighbors(points).query(queries, k=7)
+
+    expected = np.sort(np.linalg.norm(points[None, :, :] - queries[:, None, :], axis=2), axis=1)[:, :7]
+    np.testing.assert_allclose(distances, expected, atol=1e-9)
+    np.testing.assert_allclose(np.linalg.norm(points[neighbours] - queries[:, None, :], axis=2), distances, atol=1e-9)
+
+
+def test_build_tree_defaults_to_numpy_without_explicit_kdtree():
+    assert isinstance(build_tree(np.zeros((3, 2)), kdtree=False), BruteForceNeighbors)
+
+
+def test_index_is_built_on_first_call(api_client):
+    app = pytest.importorskip("app")
+    if app.find_pricing_dataset() is None:
+        pytest.skip("get_around_pricing_project.csv introuvable")
+    assert app.comparables_index is None or app.comparables_index.model_version == app.serving_model.version
+
+    response = api_client.post("/predict/comparables?k=5", json=app.EXAMPLE_CAR)
+
+    assert response.status_code == 200
+    assert len(response.json()["comparables"]) == 5
+    assert app.comparables_index.model_version == app.serving_model.version
@@ -0,0 +1,46 @@
+# test_fast_encoder.py - Parité de l'encodeur rapide avec le Pipeline sur tout le dataset
+
+import numpy as np
+
+from fast_encoder import FastPredictor, check_parity
+
+
+def test_encoded_matrix_matches_preprocessor(pipeline, pricing_features):
+    predictor = FastPredictor.from_pipeline(pipeline)
+    columns = {feature: pricing_features[feature].to_numpy() for feature in pricing_features.columns}
+
+    expected = np.asarray(pipeline.named_steps["preprocessor"].transform(pricing_features), dtype=np.float32)
+    actual = predictor.encoder.encode_columns(columns, n_rows=len(pricing_features))
+
+    assert actual.shape == expected.shape
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_encode_records_matches_encode_columns(pipeline, pricing_features):
+    encoder = FastPredictor.from_pipeline(pipeline).encoder
+    sample = pricing_features.head(500)
+    columns = {feature: sample[feature].to_numpy() for feature in sample.columns}
+
+    np.testing.assert_array_equal(
+        encoder.encode_records(sample.to_dict("records")),
+        encoder.encode_columns(columns, n_rows=len(sample)),
+    )
+
+
+def test_predictions_match_pipeline(pipeline, pricing_csv):
+    result = check_parity(pipeline, pricing_csv)
+
+    assert result["rows"] > 0
+    assert result["identical"], result
+
+
+def test_reused_buffer_gives_same_matrix_for_each_batch_size(pipeline, pricing_features):
+    encoder = FastPredictor.from_pipeline(pipeline).encoder
+    records = pricing_features.head(300).to_dict("records")
+
+    large = encoder.encode_records(records, reuse_buffer=True)
+    np.testing.assert_array_equal(large, encoder.encode_records(records))
+    # Lot plus petit : même mémoire, aucune colonne one-hot du lot précédent ne subsiste
+    small = encoder.encode_records(records[-7:], reuse_buffer=True)
+    assert np.shares_memory(small, large)
+    np.testing.assert_array_equal(small, encoder.encode_records(records[-7:]))
@@ -0,0 +1,61 @@
+# test_fingerprint_index.py - Repricing incrémental : lignes à rescorer selon l'empreinte et la version du modèle
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from fast_encoder import CATEGORICAL_FEATURES, NUMERIC_FEATURES
+from fingerprint_index import FingerprintIndex, row_fingerprints
+
+
+def make_features(n_rows=4):
+    return pd.DataFrame({
+        **{feature: np.arange(n_rows, dtype=np.int64) + position for position, feature in enumerate(NUMERIC_FEATURES)},
+        **{feature: [f"{feature}_{i}" for i in range(n_rows)] for feature in CATEGORICAL_FEATURES},
+    })
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FingerprintIndex(tmp_path / "fingerprints.sqlite")
+    yield index
+    index.close()
+
+
+def test_fingerprint_ignores_numeric_dtype_but_not_values():
+    features = make_features()
+    as_float = features.astype({feature: np.float64 for feature in NUMERIC_FEATURES})
+    changed = features.copy()
+    changed.loc[2, "mileage"] += 1
+
+    np.testing.assert_array_equal(row_fingerprints(features), row_fingerprints(as_float))
+    assert (row_fingerprints(features) != row_fingerprints(changed)).tolist() == [False, False, True, False]
+
+
+def test_only_new_and_changed_rows_are_stale(index):
+    ids = ["a", "b", "c", "d"]
+    features = make_features()
+    index.upsert(ids[:3], row_fingerprints(features)[:3], "v1", [10.0, 20.0, 30.0])
+
+    features.loc[1, "fuel"] = "electro"
+    stale, raw_prices = index.stale_rows(ids, row_fingerprints(features), "v1")
+
+    assert stale.tolist() == [False, True, False, True]
+    assert raw_prices[~stale].tolist() == [10.0, 30.0]
+    assert np.isnan(raw_prices[stale]).all()
+
+
+def test_new_model_version_makes_every_row_stale(index):
+    ids = ["a", "b"]
+    fingerprints = row_fingerprints(make_features(2))
+    index.upsert(ids, fingerprints, "v1", [10.0, 20.0])
+
+    stale, _ = index.stale_rows(ids, fingerprints, "v2")
+    assert stale.all()
+
+    index.upsert(ids, fingerprints, "v2", [11.0, 21.0])
+    stale, raw_prices = index.stale_rows(ids, fingerprints, "v2")
+    assert not stale.any()
+    assert raw_prices.tolist() == [11.0, 21.0]
+    assert index.stats() == {"listings": 2, "by_model_version": {"v2": 2}}
@@ -0,0 +1,34 @@
+# test_market_index.py - Index de marché : percentiles (rang moyen des ex aequo) et repli vers les segments larges
+
+from market_index import SEGMENT_LEVELS, MarketPriceIndex
+
+
+def listing(price, model_key="Renault", car_type="sedan", fuel="diesel"):
+    return {"model_key": model_key, "car_type": car_type, "fuel": fuel, "rental_price_per_day": str(price)}
+
+
+def test_percentile_counts_ties_half():
+    index = MarketPriceIndex([listing(price) for price in [100, 110, 110, 120]], min_segment_size=2)
+
+    result = index.position(listing(0), 110)
+
+    assert result["percentile"] == 50.0
+    assert (result["cheaper_listings"], result["pricier_listings"]) == (1, 1)
+    assert result["fallback_level"] == 0
+
+
+def test_small_segment_falls_back_to_wider_one():
+    rows = [listing(100 + i, model_key="Peugeot") for i in range(5)] + [listing(500, model_key="Ferrari")]
+    index = MarketPriceIndex(rows, min_segment_size=3)
+
+    result = index.position(listing(0, model_key="Ferrari"), 500)
+
+    assert result["segment"] == {"car_type": "sedan", "fuel": "diesel"}
+    assert result["segment_size"] == 6
+    assert result["fallback_level"] == SEGMENT_LEVELS.index(("car_type", "fuel"))
+
+
+def test_rows_without_a_valid_price_are_skipped():
+    rows = [listing(100), listing("nan"), listing("abc"), {"model_key": "Renault"}]
+
+    assert MarketPriceIndex(rows).n_rows == 1
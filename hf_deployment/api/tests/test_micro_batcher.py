@@ -0,0 +1,78 @@
+# test_micro_batcher.py - Regroupement des /predict : un sous-lot par modèle, arrêt sans appelant bloqué
+
+import asyncio
+import threading
+
+from micro_batcher import MicroBatcher
+
+
+class Model:
+    def __init__(self, offset):
+        self.offset = offset
+
+
+def test_batch_is_split_by_model_across_a_reload():
+    calls = []
+
+    def predict(records, model):
+        calls.append((model, [record["x"] for record in records]))
+        return [record["x"] + model.offset for record in records]
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=64, max_wait_ms=50)
+        await batcher.start()
+        old, new = Model(100), Model(1000)
+        # Rechargement au milieu de la fenêtre : les deux modèles arrivent dans la même collecte
+        prices = await asyncio.gather(*(batcher.submit({"x": i}, old if i < 3 else new) for i in range(6)))
+        await batcher.stop()
+        return old, new, prices, batcher.stats()
+
+    old, new, prices, stats = asyncio.run(run())
+
+    assert prices == [100.0, 101.0, 102.0, 1003.0, 1004.0, 1005.0]
+    assert calls == [(old, [0, 1, 2]), (new, [3, 4, 5])]
+    assert (stats["batches"], stats["items"], stats["max_observed_batch"]) == (2, 6, 3)
+
+
+def test_prediction_error_only_fails_its_model_group():
+    def predict(records, model):
+        if model.offset < 0:
+            raise ValueError("modèle cassé")
+        return [model.offset] * len(records)
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(batcher.submit({}, Model(-1)), batcher.submit({}, Model(7)),
+                                       return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    failed, priced = asyncio.run(run())
+
+    assert isinstance(failed, ValueError)
+    assert priced == 7.0
+
+
+def test_stop_fails_callers_of_the_batch_being_predicted():
+    started, release = threading.Event(), threading.Event()
+
+    def predict(records, model):
+        started.set()
+        release.wait(5)
+        return [1.0] * len(records)
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait_ms=1)
+        await batcher.start()
+        in_flight = asyncio.ensure_future(batcher.submit({}))
+        await asyncio.to_thread(started.wait, 5)
+        queued = asyncio.ensure_future(batcher.submit({}))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        release.set()
+        return await asyncio.gather(in_flight, queued, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
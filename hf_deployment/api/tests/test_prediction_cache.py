@@ -0,0 +1,73 @@
+# test_prediction_cache.py - Cache des prédictions : expiration (TTL), LRU et clés par version du modèle
+
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache, make_cache_key
+
+CAR = {"model_key": "Renault", "mileage": 100_000, "fuel": "diesel"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put("key", 42.0)
+
+    clock[0] += 60
+    assert cache.get("key") == 42.0
+    clock[0] += 0.001
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_put_refreshes_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put("key", 1.0)
+    clock[0] += 50
+    cache.put("key", 2.0)
+    clock[0] += 50
+
+    assert cache.get("key") == 2.0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    cache.get("a")
+    cache.put("c", 3.0)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1.0, 3.0)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_key_ignores_field_order_but_not_model_version():
+    reordered = dict(reversed(list(CAR.items())))
+
+    assert make_cache_key(CAR, "v1") == make_cache_key(reordered, "v1")
+    assert make_cache_key(CAR, "v1") != make_cache_key(CAR, "v2")
+    assert make_cache_key(CAR, "v1").startswith("v1:")
+    assert make_cache_key(CAR) != make_cache_key({**CAR, "mileage": 100_001})
+
+
+def test_price_of_previous_model_is_never_served(clock):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put(make_cache_key(CAR, "old"), 80.0)
+
+    assert cache.get(make_cache_key(CAR, "new")) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(max_size=0)
+    cache.put("key", 1.0)
+
+    assert cache.get("key") is None
+    assert cache.stats()["enabled"] is False
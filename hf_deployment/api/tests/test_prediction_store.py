@@ -0,0 +1,114 @@
+# test_prediction_store.py - Journal SQLite : compteur total, buckets reconstruits, médiane lue dans les agrégats
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from prediction_store import FEATURE_COLUMNS, PredictionStore
+
+BASE_TS = 1_700_000_040.0  # début d'une minute
+
+
+def prediction(ts, price, fuel="diesel", latency=2.0):
+    return {
+        "input": {"model_key": "Renault", "fuel": fuel, "car_type": "sedan", "mileage": 100_000, "has_gps": True},
+        "prediction": price,
+        "confidence": "high",
+        "processing_time": latency,
+        "timestamp": ts,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionStore(tmp_path / "predictions.sqlite")
+    yield store
+    store.close()
+
+
+def test_count_follows_appends(store):
+    assert store.count() == 0
+    store.append_many([prediction(BASE_TS + i, 100.0) for i in range(3)])
+    store.append_many([prediction(BASE_TS + 10, 120.0)])
+
+    assert store.count() == 4
+
+
+def test_existing_journal_gets_total_and_buckets(tmp_path):
+    path = tmp_path / "predictions.sqlite"
+    PredictionStore(path).close()
+    # Journal d'avant le compteur et les buckets : prédictions brutes seulement
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO predictions (ts, fuel, model_key, car_type, predicted_price, confidence, processing_time_ms) "
+        "VALUES (?, 'petrol', 'Audi', 'suv', ?, 'high', 1.0)",
+        [(BASE_TS + 30 * i, 50.0 + i) for i in range(10)],
+    )
+    connection.execute("DROP TABLE prediction_totals")
+    connection.execute("DROP TABLE prediction_buckets")
+    connection.commit()
+    connection.close()
+
+    store = PredictionStore(path)
+    try:
+        assert store.count() == 10
+        assert sum(point["count"] for point in store.query_series(bucket="1m")) == 10
+        assert store.query_stats()["price_stats"]["avg_price"] == 54.5
+    finally:
+        store.close()
+
+
+def test_median_from_buckets_within_one_percent(store):
+    prices = np.random.default_rng(0).uniform(20, 400, size=500)
+    store.append_many([prediction(BASE_TS + i, float(price)) for i, price in enumerate(prices)])
+
+    median = store.query_stats()["price_stats"]["median_price"]
+
+    assert median == pytest.approx(float(np.median(prices)), rel=0.01)
+
+
+def test_features_are_stored_as_sql_values(store):
+    store.append_many([prediction(BASE_TS, 100.0)])
+
+    row = store._query(f"SELECT {', '.join(FEATURE_COLUMNS)} FROM predictions", [])[0]
+
+    assert dict(zip(FEATURE_COLUMNS, row))["has_gps"] == 1
+
+
+@pytest.mark.parametrize("since, until", [
+    (BASE_TS + 15, BASE_TS + 200),   # minutes partielles aux deux bords
+    (BASE_TS + 60, BASE_TS + 180),   # bornes sur des minutes entières
+    (BASE_TS + 20, BASE_TS + 40),    # fenêtre dans une seule minute
+    (None, BASE_TS + 95),
+    (BASE_TS + 95, None),
+])
+def test_series_covers_exactly_the_stats_window(store, since, until):
+    store.append_many([prediction(BASE_TS + 5 * i, 100.0 + i, fuel=("diesel", "petrol")[i % 2]) for i in range(60)])
+
+    stats = store.query_stats(since, until)
+    series = store.query_series(since, until, bucket="1m")
+
+    assert sum(point["count"] for point in series) == stats["total_predictions"]
+    assert store.query_stats(since, until, fuel="petrol")["total_predictions"] == sum(
+        point["count"] for point in store.query_series(since, until, bucket="1m", fuel="petrol")
+    )
+
+
+def test_window_is_half_open(store):
+    store.append_many([prediction(BASE_TS, 10.0), prediction(BASE_TS + 60, 20.0), prediction(BASE_TS + 90, 30.0)])
+
+    # since inclus, until exclu, y compris quand la borne tombe sur un début de minute
+    assert store.query_stats(BASE_TS, BASE_TS + 60)["total_predictions"] == 1
+    assert [point["count"] for point in store.query_series(BASE_TS + 60, BASE_TS + 90, bucket="1m")] == [1]
+    assert store.query_stats(BASE_TS + 90, BASE_TS + 90) is None
+
+
+def test_partial_minute_median_only_uses_the_window(store):
+    store.append_many([prediction(BASE_TS + i, 10.0) for i in range(30)] +
+                      [prediction(BASE_TS + 30 + i, 500.0) for i in range(30)])
+
+    stats = store.query_stats(BASE_TS + 30, BASE_TS + 60)
+
+    assert stats["total_predictions"] == 30
+    assert stats["price_stats"]["median_price"] == pytest.approx(500.0, rel=0.01)
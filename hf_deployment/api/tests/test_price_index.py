@@ -0,0 +1,32 @@
+# test_price_index.py - Index de prix compilé : mêmes prédictions que le booster et la forêt NumPy
+
+from pathlib import Path
+
+from fast_encoder import FastPredictor
+from price_index import PriceLookupIndex, check_exactness
+from tree_engine import ARRAYS_FILENAME, ArrayForestModel
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_index_matches_booster(pipeline, pricing_sample_csv):
+    index = PriceLookupIndex(FastPredictor.from_pipeline(pipeline), max_combinations=100_000)
+
+    result = check_exactness(index, pricing_sample_csv)
+    assert result["identical"], result
+
+
+def test_index_matches_array_forest(pricing_sample_csv):
+    forest = ArrayForestModel.load(API_DIR / ARRAYS_FILENAME)
+    index = PriceLookupIndex(forest, max_combinations=100_000)
+
+    result = check_exactness(index, pricing_sample_csv, n_perturbations=1)
+    assert result["identical"], result
+
+
+def test_small_lru_gives_same_predictions(pipeline, pricing_sample_csv):
+    index = PriceLookupIndex(FastPredictor.from_pipeline(pipeline), max_combinations=4)
+
+    result = check_exactness(index, pricing_sample_csv, n_perturbations=1)
+    assert result["identical"], result
+    assert index.evictions > 0
@@ -0,0 +1,85 @@
+# test_stream_scoring.py - Lecture du flux : CSV multiligne, lignes trop longues, UTF-8 invalide
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from stream_scoring import iter_lines, iter_rows
+
+
+async def as_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(generator):
+    async def run():
+        return [item async for item in generator]
+    return asyncio.run(run())
+
+
+def rows(chunks, input_format, **kwargs):
+    return collect(iter_rows(as_chunks(chunks), input_format, **kwargs))
+
+
+def test_quoted_csv_field_spans_lines_and_chunks():
+    body = b'\xef\xbb\xbfmodel_key,paint_color\nRenault,"black\nwith ""stripes""\n"\nPeugeot,red\n'
+
+    result = rows([body[:25], body[25:31], body[31:]], "csv")
+
+    assert result == [
+        (0, {"model_key": "Renault", "paint_color": 'black\nwith "stripes"\n'}, None),
+        (1, {"model_key": "Peugeot", "paint_color": "red"}, None),
+    ]
+
+
+def test_unclosed_quote_is_a_row_error():
+    result = rows([b'model_key,paint_color\nRenault,"black\n'], "csv")
+
+    assert result == [(0, None, "guillemet CSV non fermé en fin de flux")]
+
+
+def test_long_line_is_an_error_and_is_not_buffered():
+    chunks = [b'{"a": 1}\n{"b": "', b"x" * 40, b"x" * 40, b'"}\n{"c": 3}\n']
+
+    lines = collect(iter_lines(as_chunks(chunks), max_line_bytes=32))
+
+    assert lines == [('{"a": 1}', None), (None, "ligne de plus de 32 octets"), ('{"c": 3}', None)]
+    assert rows(chunks, "ndjson", max_line_bytes=32) == [
+        (0, {"a": 1}, None),
+        (1, None, "ligne de plus de 32 octets"),
+        (2, {"c": 3}, None),
+    ]
+
+
+def test_invalid_utf8_is_a_row_error():
+    result = rows([b'{"a": 1}\n{"b": "\xff"}\n{"c": 3}'], "ndjson")
+
+    assert result[0] == (0, {"a": 1}, None)
+    assert result[1][1] is None and result[1][2].startswith("UTF-8 invalide")
+    assert result[2] == (2, {"c": 3}, None)
+
+
+
+def test_endpoint_scores_around_bad_lines(api_client):
+    app = pytest.importorskip("app")
+    car = json.dumps(app.EXAMPLE_CAR).encode()
+    body = car + b"\n" + b'{"model_key": "\xff"}\n' + b'{"x": "' + b"y" * 2048 + b'"}\n' + car + b"\n"
+
+    original = app.STREAM_MAX_LINE_BYTES
+    app.STREAM_MAX_LINE_BYTES = 1024
+    try:
+        response = api_client.post("/predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    finally:
+        app.STREAM_MAX_LINE_BYTES = original
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert [line.get("row") for line in lines[:4]] == [0, 1, 2, 3]
+    assert "rental_price" in lines[0] and "rental_price" in lines[3]
+    assert lines[1]["error"].startswith("UTF-8 invalide")
+    assert lines[2]["error"] == "ligne de plus de 1024 octets"
+    assert lines[-1]["status"] == "completed" and lines[-1]["errors"] == 2
@@ -0,0 +1,34 @@
+# test_tree_engine.py - Forêt NumPy exportée : parité avec Pipeline.predict et empreinte du pickle source
+
+from pathlib import Path
+
+from tree_engine import ARRAYS_FILENAME, ArrayForestModel, check_parity, export_pipeline_arrays
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_exported_forest_matches_pipeline(pipeline, pickle_path, pricing_csv, tmp_path):
+    path = tmp_path / ARRAYS_FILENAME
+    export_pipeline_arrays(pipeline, path, source_path=pickle_path)
+    forest = ArrayForestModel.load(path)
+
+    result = check_parity(pipeline, forest, pricing_csv)
+    assert result["identical"], result
+    assert forest.matches_source(pickle_path)
+
+
+def test_committed_artifact_is_current(pipeline, pickle_path, pricing_csv):
+    forest = ArrayForestModel.load(API_DIR / ARRAYS_FILENAME)
+
+    assert forest.matches_source(pickle_path), "trained_model_arrays.npz à réexporter : python tree_engine.py"
+    result = check_parity(pipeline, forest, pricing_csv)
+    assert result["identical"], result
+
+
+def test_digest_mismatch_is_detected(pipeline, pickle_path, tmp_path):
+    path = tmp_path / ARRAYS_FILENAME
+    export_pipeline_arrays(pipeline, path, source_path=pickle_path)
+    retrained = tmp_path / "trained_model.pkl"
+    retrained.write_bytes(pickle_path.read_bytes() + b"\n")
+
+    assert not ArrayForestModel.load(path).matches_source(retrained)
@@ -0,0 +1,63 @@
+# test_worker_stats.py - Instantanés des workers : processus morts ignorés, remise à zéro complète
+
+import json
+import os
+import subprocess
+import sys
+
+from worker_stats import (WorkerStatsPublisher, prepare_stats_dir, read_worker_snapshots, remove_worker_snapshot,
+                          request_reset, snapshot_path)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, pid, predictions):
+    snapshot_path(directory, pid).write_text(json.dumps({"pid": pid, "counters": {"predictions": predictions}}))
+
+
+def test_snapshots_of_dead_workers_are_skipped(tmp_path):
+    directory = prepare_stats_dir(tmp_path)
+    gone = dead_pid()
+    write_snapshot(directory, gone, 10)
+    write_snapshot(directory, os.getppid(), 5)
+
+    assert [snapshot["pid"] for snapshot in read_worker_snapshots(directory)] == [os.getppid()]
+
+    remove_worker_snapshot(directory, gone)
+    assert not snapshot_path(directory, gone).exists()
+
+
+def test_own_snapshot_is_excluded(tmp_path):
+    directory = prepare_stats_dir(tmp_path)
+    write_snapshot(directory, os.getpid(), 3)
+
+    assert read_worker_snapshots(directory, exclude_pid=os.getpid()) == []
+    assert len(read_worker_snapshots(directory)) == 1
+
+
+def test_reset_clears_every_snapshot_and_resets_workers(tmp_path):
+    directory = prepare_stats_dir(tmp_path)
+    resets = []
+    publisher = WorkerStatsPublisher(directory, lambda: {"counters": {"predictions": 7 - 7 * len(resets)}},
+                                     on_reset=lambda: resets.append(True), interval=0.05)
+    publisher.publish()
+    write_snapshot(directory, dead_pid(), 10)
+
+    request_reset(directory)
+    assert list(directory.glob("worker-*.json")) == []
+
+    publisher.start()
+    try:
+        for _ in range(100):
+            if resets and publisher.path.exists():
+                break
+            publisher._stop.wait(0.05)
+    finally:
+        publisher.stop()
+
+    assert resets
+    assert read_worker_snapshots(directory)[0]["counters"]["predictions"] == 0
@@ -0,0 +1,323 @@
+# tree_engine.py - Moteur d'inférence NumPy pour la forêt XGBoost
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Exporte le Pipeline entraîné (preprocessor + XGBRegressor) en tableaux plats :
+# paramètres de l'encodeur + une seule table de noeuds pour toute la forêt
+# (feature, seuil, fils gauche/droit, valeur de feuille). L'évaluateur parcourt
+# tous les arbres niveau par niveau pour un lot entier, sans importer
+# xgboost, sklearn ni pandas au démarrage de l'API.
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from fast_encoder import FastEncoder
+
+ARRAYS_FILENAME = "trained_model_arrays.npz"
+
+# Taille des blocs de lignes pour borner la mémoire (lignes x arbres)
+ROW_BLOCK_SIZE = 8192
+
+
+def file_digest(path):
+    """
+    Empreinte SHA-256 d'un fichier (pickle source de l'artefact)
+    """
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class ArrayForestModel:
+    """
+    Modèle complet (encodeur + forêt) stocké en tableaux NumPy
+    Même interface que FastPredictor : encoder, predict_encoded, predict_records, predict_columns
+    """
+
+    def __init__(self, encoder, feature, threshold, left, right, default_left, value,
+                 roots, base_score, max_depth, source_digest=None):
+        self.encoder = encoder
+        # Empreinte du trained_model.pkl exporté (None pour un artefact sans empreinte)
+        self.source_digest = source_digest
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_score = np.float32(base_score)
+        self.max_depth = int(max_depth)
+
+        # Les feuilles bouclent sur elles-mêmes : le parcours par niveau reste uniforme
+        leaves = self.left < 0
+        node_ids = np.arange(len(self.left), dtype=np.int32)
+        self._next_left = np.where(leaves, node_ids, self.left)
+        self._next_right = np.where(leaves, node_ids, self.right)
+        self._feature = np.where(leaves, 0, self.feature)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.left)
+
+    # 🌲 Évaluation vectorisée
+    def predict_encoded(self, encoded):
+        """
+        Prédiction sur une matrice encodée float32 (lignes x features)
+        """
+        encoded = np.asarray(encoded, dtype=np.float32)
+        output = np.empty(len(encoded), dtype=np.float32)
+        for start in range(0, len(encoded), ROW_BLOCK_SIZE):
+            block = encoded[start:start + ROW_BLOCK_SIZE]
+            output[start:start + len(block)] = self._predict_block(block)
+        return output
+
+    def _predict_block(self, encoded):
+        """
+        Parcours niveau par niveau de tous les arbres pour un bloc de lignes
+        """
+        n_rows = len(encoded)
+        rows = np.arange(n_rows)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+
+        for _ in range(self.max_depth):
+            values = encoded[rows, self._feature[nodes]]
+            # XGBoost : gauche si x < seuil, valeur manquante -> direction par défaut
+            go_left = np.where(np.isnan(values), self.default_left[nodes], values < self.threshold[nodes])
+            nodes = np.where(go_left, self._next_left[nodes], self._next_right[nodes])
+
+        # Somme des arbres dans l'ordre, en float32 comme XGBoost
+        leaf_values = self.value[nodes]
+        output = np.full(n_rows, self.base_score, dtype=np.float32)
+        for tree in range(self.n_trees):
+            output += leaf_values[:, tree]
+        return output
+
+    def predict_records(self, records):
+        """
+        Prédiction pour une liste de dictionnaires CarFeatures
+        """
+        return self.predict_encoded(self.encoder.encode_records(records))
+
+    def predict_columns(self, columns, n_rows=None):
+        """
+        Prédiction pour des données colonnaires {feature: valeurs}
+        """
+        return self.predict_encoded(self.encoder.encode_columns(columns, n_rows=n_rows))
+
+    def predict(self, X):
+        """
+        Compatibilité Pipeline.predict : DataFrame (ou mapping colonne -> valeurs) ou liste de dictionnaires
+        """
+        if isinstance(X, list):
+            return self.predict_records(X)
+        features = self.encoder.numeric_features + self.encoder.categorical_features
+        return self.predict_columns({feature: np.asarray(X[feature]) for feature in features}, n_rows=len(X))
+
+    def split_thresholds(self, feature_index):
+        """
+        Seuils de split (triés, uniques) utilisés par la forêt pour une feature
+        """
+        splits = (self.left >= 0) & (self.feature == feature_index)
+        return np.unique(self.threshold[splits])
+
+    # 💾 Sérialisation
+    def save(self, path):
+        """
+        Sauvegarde l'encodeur et la forêt dans un fichier .npz (sans pickle)
+        """
+        encoder_params = {
+            "numeric_features": self.encoder.numeric_features,
+            "categorical_features": self.encoder.categorical_features,
+            "categories": [self.encoder.categories[f] for f in self.encoder.categorical_features],
+            "drop_idx": [self.encoder.drop_idx[f] for f in self.encoder.categorical_features],
+        }
+        np.savez_compressed(
+            path,
+            encoder_params=np.array(json.dumps(encoder_params, ensure_ascii=False)),
+            impute_values=self.encoder.impute_values,
+            means=self.encoder.means,
+            scales=self.encoder.scales,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            default_left=self.default_left,
+            value=self.value,
+            roots=self.roots,
+            base_score=np.array(self.base_score),
+            max_depth=np.array(self.max_depth),
+            source_digest=np.array(self.source_digest or ""),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge un modèle exporté par export_pipeline_arrays()
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            encoder_params = json.loads(str(arrays["encoder_params"]))
+            # Artefacts exportés avant l'enregistrement de l'empreinte : source inconnue
+            source_digest = str(arrays["source_digest"]) if "source_digest" in arrays.files else ""
+            encoder = FastEncoder(
+                numeric_features=encoder_params["numeric_features"],
+                impute_values=arrays["impute_values"],
+                means=arrays["means"],
+                scales=arrays["scales"],
+                categorical_features=encoder_params["categorical_features"],
+                categories=encoder_params["categories"],
+                drop_idx=encoder_params["drop_idx"],
+            )
+            return cls(
+                encoder=encoder,
+                feature=arrays["feature"],
+                threshold=arrays["threshold"],
+                left=arrays["left"],
+                right=arrays["right"],
+                default_left=arrays["default_left"],
+                value=arrays["value"],
+                roots=arrays["roots"],
+                base_score=arrays["base_score"],
+                max_depth=arrays["max_depth"],
+                source_digest=source_digest or None,
+            )
+
+    def matches_source(self, pickle_path):
+        """
+        Vrai si l'artefact a été exporté depuis ce trained_model.pkl (empreinte identique)
+        """
+        return self.source_digest is not None and self.source_digest == file_digest(pickle_path)
+
+
+def _parse_base_score(raw):
+    """
+    base_score XGBoost : '1.2E2' ou '[1.2E2]' selon la version
+    """
+    return float(str(raw).strip("[]").split(",")[0])
+
+
+def _tree_depth(left, right):
+    """
+    Profondeur maximale d'un arbre à partir de ses tableaux de fils
+    """
+    depth = 0
+    level = [0]
+    while level:
+        level = [child for node in level for child in (left[node], right[node]) if child >= 0]
+        if level:
+            depth += 1
+    return depth
+
+
+def forest_from_booster(booster, encoder, n_trees=None):
+    """
+    Aplatit les arbres d'un booster XGBoost (régression, sans splits catégoriels natifs)
+    """
+    model = json.loads(booster.save_raw("json"))
+    learner = model["learner"]
+    trees = learner["gradient_booster"]["model"]["trees"]
+    if n_trees is not None:
+        trees = trees[:n_trees]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Splits catégoriels natifs non supportés")
+
+        tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+        tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+        is_leaf = tree_left < 0
+
+        roots.append(offset)
+        feature.append(np.asarray(tree["split_indices"], dtype=np.int32))
+        # Pour une feuille, split_conditions contient la valeur de la feuille
+        threshold.append(np.where(is_leaf, 0, np.asarray(tree["split_conditions"], dtype=np.float32)))
+        value.append(np.where(is_leaf, np.asarray(tree["base_weights"], dtype=np.float32), 0))
+        left.append(np.where(is_leaf, -1, tree_left + offset))
+        right.append(np.where(is_leaf, -1, tree_right + offset))
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        offset += len(tree_left)
+
+    return ArrayForestModel(
+        encoder=encoder,
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left),
+        right=np.concatenate(right),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.int32),
+        base_score=_parse_base_score(learner["learner_model_param"]["base_score"]),
+        max_depth=max_depth,
+    )
+
+
+def export_pipeline_arrays(pipeline, path=ARRAYS_FILENAME, source_path=None):
+    """
+    Exporte un Pipeline create_pipeline() + XGBRegressor en artefact .npz
+    source_path : pickle du Pipeline, dont l'empreinte est enregistrée dans l'artefact
+    """
+    encoder = FastEncoder.from_pipeline(pipeline)
+    regressor = pipeline.steps[-1][1]
+    if not hasattr(regressor, "get_booster"):
+        raise ValueError(f"Régresseur non supporté : {type(regressor).__name__}")
+
+    best_iteration = getattr(regressor, "best_iteration", None)
+    n_trees = best_iteration + 1 if best_iteration is not None else None
+
+    forest = forest_from_booster(regressor.get_booster(), encoder, n_trees=n_trees)
+    forest.source_digest = file_digest(source_path) if source_path is not None else None
+    forest.save(path)
+    print(f"💾 Forêt exportée : {forest.n_trees} arbres, {forest.n_nodes} noeuds -> {path}")
+    return forest
+
+
+# 🧪 Vérification de parité avec Pipeline.predict
+def check_parity(pipeline, forest, csv_path):
+    """
+    Compare la forêt NumPy et Pipeline.predict sur tout le dataset de pricing
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    X = df.drop(columns=[c for c in ["rental_price_per_day", "Unnamed: 0"] if c in df.columns])
+
+    expected = np.asarray(pipeline.predict(X), dtype=np.float32)
+    actual = forest.predict(X)
+    diff = np.abs(expected.astype(np.float64) - actual.astype(np.float64))
+    return {
+        "rows": int(len(X)),
+        "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+        "n_mismatch": int((diff > 0).sum()),
+        "identical": bool((diff == 0).all()),
+    }
+
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+
+    model_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("trained_model.pkl")
+    output_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(ARRAYS_FILENAME)
+    csv_path = Path(sys.argv[3]) if len(sys.argv) > 3 else Path("../../data/get_around_pricing_project.csv")
+
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    export_pipeline_arrays(model, output_path, source_path=model_path)
+    forest = ArrayForestModel.load(output_path)
+
+    result = check_parity(model, forest, csv_path)
+    print(f"🧪 Parité forêt NumPy vs Pipeline.predict : {result}")
+    if result["max_abs_diff"] > 1e-3:
+        print("❌ Écart trop important entre la forêt NumPy et le Pipeline")
+        sys.exit(1)
+    print("✅ Artefact prêt pour le déploiement")
@@ -0,0 +1,145 @@
+# worker_stats.py - Partage des statistiques entre workers (mode pre-fork)
+# 🚀 À placer dans hf_deployment/api/ à côté de app.py
+#
+# Chaque worker écrit périodiquement un instantané JSON de ses agrégats
+# (PredictionStats sérialisé, compteurs de santé) dans un dossier commun.
+# N'importe quel worker peut alors répondre /health et /mlflow-stats pour
+# l'ensemble des processus en fusionnant ces instantanés avec les siens.
+# Seuls les instantanés de processus vivants sont lus : le maître supprime celui
+# d'un worker mort quand il le relance, et une remise à zéro les efface tous.
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+RESET_MARKER = "reset"
+
+
+def prepare_stats_dir(directory):
+    """
+    Crée le dossier des instantanés et supprime ceux d'un lancement précédent
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("worker-*.json"):
+        path.unlink()
+    (directory / RESET_MARKER).unlink(missing_ok=True)
+    return directory
+
+
+def snapshot_path(directory, pid):
+    return Path(directory) / f"worker-{pid}.json"
+
+
+def remove_worker_snapshot(directory, pid):
+    """
+    Supprime l'instantané d'un worker arrêté (appelé par le maître avant de le relancer)
+    """
+    snapshot_path(directory, pid).unlink(missing_ok=True)
+
+
+def is_alive(pid):
+    """
+    Le processus pid existe-t-il encore ? (signal 0 : aucun signal envoyé)
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_worker_snapshots(directory, exclude_pid=None):
+    """
+    Instantanés publiés par les workers encore vivants
+    (un worker mort puis relancé n'est pas compté deux fois)
+    """
+    snapshots = []
+    for path in sorted(Path(directory).glob("worker-*.json")):
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            # Fichier en cours de remplacement ou supprimé : ignoré pour cette lecture
+            continue
+        pid = snapshot.get("pid")
+        if pid != exclude_pid and isinstance(pid, int) and is_alive(pid):
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def request_reset(directory):
+    """
+    Demande à tous les workers de remettre leurs statistiques à zéro
+    Les instantanés existants sont effacés : chaque worker republie ses stats remises à zéro
+    """
+    directory = Path(directory)
+    (directory / RESET_MARKER).write_text(str(time.time()), encoding="utf-8")
+    for path in directory.glob("worker-*.json"):
+        path.unlink(missing_ok=True)
+
+
+class WorkerStatsPublisher:
+    """
+    Thread qui publie l'instantané du worker toutes les interval secondes
+    snapshot_fn() -> dict JSON-compatible ; on_reset() appelé après un request_reset()
+    """
+
+    def __init__(self, directory, snapshot_fn, on_reset=None, interval=2.0):
+        self.directory = Path(directory)
+        self.snapshot_fn = snapshot_fn
+        self.on_reset = on_reset
+        self.interval = interval
+        self.pid = os.getpid()
+        self.path = snapshot_path(self.directory, self.pid)
+        self._last_reset = self._reset_time() or 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="worker-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Arrête le thread et publie un dernier instantané (stats finales du worker)
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.publish()
+
+    def publish(self):
+        """
+        Écriture atomique de l'instantané (fichier temporaire puis remplacement)
+        """
+        snapshot = {"pid": self.pid, "updated_at": time.time(), **self.snapshot_fn()}
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporary, self.path)
+
+    def _reset_time(self):
+        try:
+            return float((self.directory / RESET_MARKER).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            reset_time = self._reset_time()
+            if reset_time is not None and reset_time > self._last_reset:
+                self._last_reset = reset_time
+                if self.on_reset is not None:
+                    self.on_reset()
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"⚠️ Erreur publication des stats du worker {self.pid} (non critique) : {e}")
@@ -4,6 +4,7 @@
 import streamlit as st
 import pandas as pd
 import requests
+from datetime import datetime, timedelta
 #import plotly.express as px
 #import plotly.graph_objects as go
 
@@ -22,6 +23,7 @@ API_BASE = API_URL.replace("/predict", "")
 HEALTH_URL = f"{API_BASE}/health"
 MLFLOW_STATS_URL = f"{API_BASE}/mlflow-stats"
 MODEL_INFO_URL = f"{API_BASE}/model-info"
+SURFACE_URL = f"{API_BASE}/predict/surface"
 
 # Affichage des infos de connexion
 st.sidebar.info("🔗 **API Endpoint:** " + API_URL)
@@ -47,6 +49,14 @@ categorical_features = {
     'car_type': ['sedan', 'hatchback', 'estate', 'convertible', 'coupe', 'subcompact']
 }
 
+# Périodes proposées pour les statistiques de production
+STATS_PERIODS = {
+    "Depuis le démarrage": None,
+    "Dernière heure": timedelta(hours=1),
+    "Dernières 24h": timedelta(days=1),
+    "7 derniers jours": timedelta(days=7),
+}
+
 # -------------------
 # Sidebar - Paramètres véhicule - ✅ GARDÉE IDENTIQUE
 # -------------------
@@ -166,6 +176,35 @@ if st.button("Prédire le prix", type="primary"):
     except Exception as e:
         st.error(f"❌ Erreur lors de l'appel API : {e}")
 
+# 📉 NOUVEAU : Courbe de prix du véhicule de la sidebar (un seul appel à /predict/surface)
+st.markdown("### 📉 Prix selon le kilométrage ou la puissance")
+swept_feature = st.radio("Paramètre à faire varier", list(numeric_features), horizontal=True)
+
+if st.button("Tracer la courbe de prix"):
+    min_val, max_val, _ = numeric_features[swept_feature]
+    surface_request = {
+        "car": user_input,
+        swept_feature: {"start": min_val, "stop": max_val, "steps": 100},
+    }
+    try:
+        with st.spinner("🔄 Calcul de la courbe de prix..."):
+            response = requests.post(SURFACE_URL, json=surface_request, timeout=30)
+
+        if response.status_code == 200:
+            surface = response.json()
+            curve_df = pd.DataFrame({"Prix (€ / jour)": surface["prices"]}, index=surface[swept_feature])
+            curve_df.index.name = swept_feature
+            st.line_chart(curve_df)
+            st.caption(
+                f"{surface['points']} points : de {surface['min_price']:.2f}€ à {surface['max_price']:.2f}€ "
+                f"(calculés en {surface['processing_time_ms']:.0f} ms)"
+            )
+        else:
+            st.error(f"❌ Erreur {response.status_code}")
+            st.code(response.text)
+    except requests.exceptions.RequestException:
+        st.error("❌ Impossible de contacter l'API")
+
 # -------------------
 # Section exemples de données - 🔄 NOUVEAU pour faciliter les tests
 # -------------------
@@ -352,9 +391,22 @@ with tab1:
 with tab2:
     st.markdown("### 📊 Statistiques de Production (MLflow)")
     
+    # Filtres optionnels : requête sur le journal des prédictions de l'API
+    col_period, col_fuel = st.columns(2)
+    with col_period:
+        period = st.selectbox("Période", list(STATS_PERIODS.keys()))
+    with col_fuel:
+        fuel_filter = st.selectbox("Carburant", ["Tous"] + categorical_features['fuel'])
+
+    stats_params = {}
+    if STATS_PERIODS[period] is not None:
+        stats_params["since"] = (datetime.now() - STATS_PERIODS[period]).isoformat()
+    if fuel_filter != "Tous":
+        stats_params["fuel"] = fuel_filter
+
     if st.button("📈 Récupérer les statistiques MLflow"):
         try:
-            response = requests.get(MLFLOW_STATS_URL, timeout=15)
+            response = requests.get(MLFLOW_STATS_URL, params=stats_params, timeout=15)
             if response.status_code == 200:
                 stats = response.json()
                 
@@ -418,14 +470,48 @@ with tab2:
 
 with tab3:
     st.markdown("### 📈 Visualisations")
+
+    # Évolution des prédictions dans le temps (buckets pré-agrégés côté API)
+    st.markdown("#### ⏱️ Évolution des prédictions dans le temps")
+    col_period, col_bucket = st.columns(2)
+    with col_period:
+        series_period = st.selectbox("Période ", list(STATS_PERIODS.keys())[1:])
+    with col_bucket:
+        bucket = st.selectbox("Pas de temps", ["1m", "5m", "1h"], index=1)
+
+    if st.button("📈 Afficher l'évolution"):
+        try:
+            series_params = {
+                "since": (datetime.now() - STATS_PERIODS[series_period]).isoformat(),
+                "bucket": bucket
+            }
+            response = requests.get(MLFLOW_STATS_URL, params=series_params, timeout=15)
+            if response.status_code == 200:
+                stats = response.json()
+                series = stats.get("time_series", [])
+                if series:
+                    series_df = pd.DataFrame(series)
+                    series_df["bucket_start"] = pd.to_datetime(series_df["bucket_start"])
+                    series_df = series_df.set_index("bucket_start")
+
+                    st.markdown("**Nombre de prédictions**")
+                    st.bar_chart(series_df[["count"]])
+                    st.markdown("**Prix moyen prédit (€/jour)**")
+                    st.line_chart(series_df[["avg_price"]])
+                    st.markdown("**Latence (ms)**")
+                    st.line_chart(series_df[["latency_p50_ms", "latency_p90_ms", "latency_p99_ms"]])
+                else:
+                    st.info("ℹ️ Aucune prédiction sur cette période")
+            else:
+                st.error(f"❌ Erreur API : {response.status_code}")
+        except Exception as e:
+            st.error(f"❌ Erreur : {e}")
+
     st.info("""
     🚧 **Section en développement**
     
-    Les graphiques apparaîtront ici une fois que des prédictions auront été faites.
-    
     **Graphiques prévus :**
     - Distribution des prix par marque
-    - Évolution des prédictions dans le temps  
     - Heatmap des caractéristiques populaires
     - Comparaison par type de carburant
     """)